@@ -0,0 +1,359 @@
+import threading
+import numpy as np
+
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Callable
+
+from td.client import TDClient
+from pyrobot.trades import Trade
+from pyrobot.stock_frame import StockFrame
+from pyrobot.order_tracker import OrderTracker
+from pyrobot.order_staging import round_prices
+
+
+class BracketEngine():
+
+    def __init__(self, td_client: TDClient, account: str, send_modifications: bool = True,
+                 order_tracker: OrderTracker = None) -> None:
+
+        self.td_client = td_client
+        self.account = account
+        self.send_modifications = send_modifications
+
+        # Follows the stop orders we replace, so it keeps polling the live ids.
+        self.order_tracker = order_tracker
+
+        # One row per trade, every level lives in these columns.
+        self._trades: List[Trade] = []
+        self._symbols: List[str] = []
+        self._stop_orders: List[List[dict]] = []
+        self._profit_orders: List[List[dict]] = []
+        self._stop_order_ids: List[str] = []
+
+        self._direction = np.zeros(shape=0)
+        self._stop = np.zeros(shape=0)
+        self._profit = np.zeros(shape=0)
+        self._limit_offset = np.zeros(shape=0)
+        self._trail_size = np.zeros(shape=0)
+        self._trail_percentage = np.zeros(shape=0, dtype=bool)
+        self._extreme = np.zeros(shape=0)
+        self._unsent = np.zeros(shape=0, dtype=bool)
+        self._filled = np.zeros(shape=0, dtype=bool)
+
+        self._callbacks: List[Callable[[Trade, str, float], None]] = []
+        self._last_version = None
+
+        # Orders are registered from the order threads, steps come from the bar loop.
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+
+        return len(self._trades)
+
+    def on_trigger(self, callback: Callable[[Trade, str, float], None]) -> None:
+
+        # Called as callback(trade, 'stop' or 'profit', level).
+        self._callbacks.append(callback)
+
+    def _child_orders(self, trade: Trade) -> Tuple[List[dict], List[dict]]:
+
+        stop_orders = []
+        profit_orders = []
+        orders = list(trade.order.get('childOrderStrategies', []))
+
+        while orders:
+
+            order = orders.pop()
+            orders += order.get('childOrderStrategies', [])
+
+            if order.get('orderType', None) in ['STOP', 'STOP_LIMIT']:
+                stop_orders.append(order)
+            elif order.get('orderType', None) == 'LIMIT':
+                profit_orders.append(order)
+
+        return stop_orders, profit_orders
+
+    def register(self, trade: Trade, trail_size: float = None, percentage: bool = False) -> bool:
+
+        with self._lock:
+
+            # Registering again replaces the old row, levels, order ids and all.
+            self.unregister(trade=trade)
+
+            stop_orders, profit_orders = self._child_orders(trade=trade)
+
+            if not stop_orders and not profit_orders:
+                return False
+
+            stop = stop_orders[0]['stopPrice'] if stop_orders else np.nan
+            profit = profit_orders[0]['price'] if profit_orders else np.nan
+
+            # A stop limit keeps its limit the same distance from the stop.
+            if stop_orders and stop_orders[0]['orderType'] == 'STOP_LIMIT':
+                limit_offset = stop_orders[0]['price'] - stop
+            else:
+                limit_offset = 0.0
+
+            self._trades.append(trade)
+            self._symbols.append(trade.symbol)
+            self._stop_orders.append(stop_orders)
+            self._profit_orders.append(profit_orders)
+            self._stop_order_ids.append(None)
+
+            self._direction = np.append(self._direction, 1.0 if trade.side == 'long' else -1.0)
+            self._stop = np.append(self._stop, stop)
+            self._profit = np.append(self._profit, profit)
+            self._limit_offset = np.append(self._limit_offset, limit_offset)
+            self._trail_size = np.append(self._trail_size, np.nan if trail_size is None else trail_size)
+            self._trail_percentage = np.append(self._trail_percentage, percentage)
+            self._extreme = np.append(self._extreme, np.nan)
+            self._unsent = np.append(self._unsent, False)
+
+            # Nothing to protect until the entry fills, see `fill`.
+            self._filled = np.append(self._filled, trade.order_status == 'FILLED')
+
+            trade._bracket_engine = self
+
+            if self._filled[-1]:
+                self._stop_order_id(row=len(self._trades) - 1)
+
+            return True
+
+    def fill(self, trade: Trade) -> None:
+
+        with self._lock:
+
+            for row, registered in enumerate(self._trades):
+                if registered is trade:
+                    self._filled[row] = True
+                    self._stop_order_id(row=row)
+
+    def unregister(self, trade: Trade) -> None:
+
+        with self._lock:
+
+            rows = [row for row, registered in enumerate(self._trades) if registered is trade]
+
+            if not rows:
+                return
+
+            keep = np.ones(shape=len(self._trades), dtype=bool)
+            keep[rows] = False
+
+            self._keep_rows(keep=keep)
+
+            trade._bracket_engine = None
+
+    def _keep_rows(self, keep: np.ndarray) -> None:
+
+        self._trades = [value for value, kept in zip(self._trades, keep) if kept]
+        self._symbols = [value for value, kept in zip(self._symbols, keep) if kept]
+        self._stop_orders = [value for value, kept in zip(self._stop_orders, keep) if kept]
+        self._profit_orders = [value for value, kept in zip(self._profit_orders, keep) if kept]
+        self._stop_order_ids = [value for value, kept in zip(self._stop_order_ids, keep) if kept]
+
+        self._direction = self._direction[keep]
+        self._stop = self._stop[keep]
+        self._profit = self._profit[keep]
+        self._limit_offset = self._limit_offset[keep]
+        self._trail_size = self._trail_size[keep]
+        self._trail_percentage = self._trail_percentage[keep]
+        self._extreme = self._extreme[keep]
+        self._unsent = self._unsent[keep]
+        self._filled = self._filled[keep]
+
+    def levels(self, trade: Trade) -> Dict[str, float]:
+
+        for row, registered in enumerate(self._trades):
+            if registered is trade:
+                return {
+                    'stop': float(self._stop[row]),
+                    'profit': float(self._profit[row]),
+                    'filled': bool(self._filled[row])
+                }
+
+        return {}
+
+    def trail_settings(self, trade: Trade) -> Tuple[float, bool]:
+
+        # (trail size, percentage) of a registered trade, so a new placement can keep them.
+        for row, registered in enumerate(self._trades):
+            if registered is trade and not np.isnan(self._trail_size[row]):
+                return float(self._trail_size[row]), bool(self._trail_percentage[row])
+
+        return None, False
+
+    def apply_levels(self, trade: Trade) -> None:
+
+        with self._lock:
+
+            # Write the levels we're holding into the trade's child orders, no quotes needed.
+            for row, registered in enumerate(self._trades):
+                if registered is trade:
+                    self._set_levels(row=row)
+
+    def _set_levels(self, row: int) -> None:
+
+        if not np.isnan(self._stop[row]):
+            for order in self._stop_orders[row]:
+                order['stopPrice'] = float(self._stop[row])
+                if order['orderType'] == 'STOP_LIMIT':
+                    order['price'] = float(round_prices(self._stop[row] + self._limit_offset[row]))
+
+        if not np.isnan(self._profit[row]):
+            for order in self._profit_orders[row]:
+                order['price'] = float(self._profit[row])
+
+    def update(self, stock_frame: StockFrame) -> Dict[str, List]:
+
+        results = {'triggered': [], 'modified': []}
+
+        # Nothing new since the last step, nothing to do.
+        if not self._trades or stock_frame.version == self._last_version:
+            return results
+
+        self._last_version = stock_frame.version
+
+        # The latest bar of every symbol, lined up with the rows.
+        symbols = list(stock_frame.symbol_slices.keys())
+
+        if not symbols:
+            return results
+
+        bars = stock_frame.frame[['high', 'low']].to_numpy(dtype='float64')[stock_frame.last_row_positions]
+        symbol_rows = {symbol: row for row, symbol in enumerate(symbols)}
+
+        has_bar = np.array([symbol in symbol_rows for symbol in self._symbols], dtype=bool)
+        bar_rows = np.array([symbol_rows.get(symbol, 0) for symbol in self._symbols], dtype='int64')
+
+        high = np.where(has_bar, bars[bar_rows, 0], np.nan)
+        low = np.where(has_bar, bars[bar_rows, 1], np.nan)
+
+        return self.step(high=high, low=low, results=results)
+
+    def step(self, high: np.ndarray, low: np.ndarray, results: Dict[str, List] = None) -> Dict[str, List]:
+
+        with self._lock:
+
+            if results is None:
+                results = {'triggered': [], 'modified': []}
+
+            # Only open positions are managed, an entry still working has nothing to stop out.
+            long = self._direction > 0
+            active = self._filled & ~np.isnan(high) & ~np.isnan(low)
+
+            # Triggers are checked against the levels that were standing during the bar.
+            with np.errstate(invalid='ignore'):
+                stop_hit = active & np.where(long, low <= self._stop, high >= self._stop)
+                profit_hit = active & ~stop_hit & np.where(long, high >= self._profit, low <= self._profit)
+
+            triggered = stop_hit | profit_hit
+
+            # Trailing stops follow the best price seen, and only ever tighten.
+            trailing = active & ~triggered & ~np.isnan(self._trail_size) & ~np.isnan(self._stop)
+
+            self._extreme = np.where(
+                trailing,
+                np.where(long, np.fmax(self._extreme, high), np.fmin(self._extreme, low)),
+                self._extreme
+            )
+
+            with np.errstate(invalid='ignore'):
+                trail = round_prices(np.where(
+                    self._trail_percentage,
+                    self._extreme * (1.0 - self._direction * self._trail_size),
+                    self._extreme - self._direction * self._trail_size
+                ))
+
+                new_stop = np.where(long, np.fmax(self._stop, trail), np.fmin(self._stop, trail))
+                changed = trailing & (new_stop != self._stop)
+
+            self._stop = np.where(changed, new_stop, self._stop)
+
+            # A change that couldn't be sent yet goes out with this one.
+            self._unsent = (self._unsent | changed) & ~triggered
+
+            for row in np.flatnonzero(triggered).tolist():
+
+                kind = 'stop' if stop_hit[row] else 'profit'
+                level = float(self._stop[row] if stop_hit[row] else self._profit[row])
+                results['triggered'].append((self._trades[row], kind, level))
+
+                for callback in self._callbacks:
+                    callback(self._trades[row], kind, level)
+
+            for row in np.flatnonzero(changed).tolist():
+                self._set_levels(row=row)
+
+            # Only the levels that actually moved go to the broker.
+            for row in np.flatnonzero(self._unsent).tolist():
+                if self._send(row=row):
+                    self._unsent[row] = False
+                    results['modified'].append((self._trades[row], float(self._stop[row])))
+
+            # A bracket that fired is done, it's not scanned again.
+            if triggered.any():
+
+                for row in np.flatnonzero(triggered).tolist():
+                    self._trades[row]._bracket_engine = None
+
+                self._keep_rows(keep=~triggered)
+
+            return results
+
+    def _stop_order_id(self, row: int) -> str:
+
+        if self._stop_order_ids[row] is not None:
+            return self._stop_order_ids[row]
+
+        # Child order ids only show up once the broker has the order, see `OrderTracker`.
+        orders = [self._trades[row].order_response or {}]
+
+        while orders:
+
+            order = orders.pop()
+            orders += order.get('childOrderStrategies', [])
+
+            if order.get('orderType', None) in ['STOP', 'STOP_LIMIT'] and order.get('orderId', None):
+
+                self._stop_order_ids[row] = str(order['orderId'])
+
+                # Track the stop too, once it's gone at the broker the bracket is done.
+                if self.order_tracker is not None and not self.order_tracker.is_tracked(order_id=order['orderId']):
+                    self.order_tracker.track(
+                        trade=self._trades[row],
+                        order_id=order['orderId'],
+                        state=order.get('status', None)
+                    )
+
+                return self._stop_order_ids[row]
+
+        return None
+
+    def _send(self, row: int) -> bool:
+
+        if not self.send_modifications:
+            return True
+
+        order_id = self._stop_order_id(row=row)
+
+        if order_id is None:
+            return False
+
+        response = self.td_client.modify_order(
+            account=self.account,
+            order=self._stop_orders[row][0],
+            order_id=order_id
+        )
+
+        # A replaced order comes back with a new id, the next change goes to that one.
+        if isinstance(response, dict) and response.get('order_id', None):
+
+            self._stop_order_ids[row] = str(response['order_id'])
+
+            if self.order_tracker is not None:
+                self.order_tracker.replace(old_order_id=order_id, new_order_id=self._stop_order_ids[row])
+
+        return True
@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import shutil
+import pathlib
+import threading
+import numpy as np
+
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+from td.client import TDClient
+
+
+class CandleCache():
+
+    columns = ['open', 'close', 'high', 'low', 'volume']
+
+    # How long one bar lasts, in milliseconds. A month is taken at its longest.
+    bar_lengths = {
+        'minute': 60000,
+        'daily': 86400000,
+        'weekly': 7 * 86400000,
+        'monthly': 31 * 86400000
+    }
+
+    def __init__(self, folder: Union[str, pathlib.Path] = None) -> None:
+
+        # Default to the same data folder the orders go in.
+        if folder is None:
+            folder = pathlib.Path(__file__).parents[1].joinpath('data', 'candles')
+
+        self.folder = pathlib.Path(folder)
+
+        # One lock per series, so concurrent fetches of different symbols don't block.
+        self._locks: Dict[Tuple[str, int, str], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _series_folder(self, symbol: str, bar_size: int, bar_type: str) -> pathlib.Path:
+
+        return self.folder.joinpath(
+            '{bar_type}_{bar_size}'.format(bar_type=bar_type, bar_size=bar_size),
+            symbol
+        )
+
+    def _lock(self, symbol: str, bar_size: int, bar_type: str) -> threading.Lock:
+
+        with self._locks_lock:
+            return self._locks.setdefault((symbol, bar_size, bar_type), threading.Lock())
+
+    def _current_folder(self, symbol: str, bar_size: int, bar_type: str) -> pathlib.Path:
+
+        series_folder = self._series_folder(symbol, bar_size, bar_type)
+        current_path = series_folder.joinpath('CURRENT')
+
+        # Each store writes a whole new generation, CURRENT names the live one.
+        # Series written before generations existed live in the folder itself.
+        if not current_path.exists():
+            return series_folder
+
+        with open(file=current_path, mode='r') as current_file:
+            return series_folder.joinpath(current_file.read().strip())
+
+    def coverage(self, symbol: str, bar_size: int, bar_type: str) -> List[List[int]]:
+
+        folder = self._current_folder(symbol, bar_size, bar_type)
+        file_path = folder.joinpath('coverage.json')
+
+        # Columns that don't agree mean a torn write, so nothing is covered.
+        if not file_path.exists() or not self._is_consistent(folder=folder):
+            return []
+
+        with open(file=file_path, mode='r') as coverage_json:
+            return json.load(coverage_json)
+
+    def _is_consistent(self, folder: pathlib.Path) -> bool:
+
+        lengths = set()
+
+        for column in ['datetime'] + self.columns:
+
+            file_path = folder.joinpath(column + '.npy')
+
+            if not file_path.exists():
+                return False
+
+            lengths.add(np.load(file=file_path, mmap_mode='r').shape[0])
+
+        return len(lengths) == 1
+
+    def missing_ranges(self, symbol: str, bar_size: int, bar_type: str, start: int, end: int) -> List[Tuple[int, int]]:
+
+        missing = []
+        cursor = start
+
+        # Walk the covered ranges (sorted, non-overlapping) and collect the holes.
+        for covered_start, covered_end in self.coverage(symbol, bar_size, bar_type):
+
+            if covered_end < cursor:
+                continue
+
+            if covered_start > end:
+                break
+
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+
+            cursor = max(cursor, covered_end)
+
+        if cursor < end:
+            missing.append((cursor, end))
+
+        return missing
+
+    def load(self, symbol: str, bar_size: int, bar_type: str, memory_map: bool = True) -> Dict[str, np.ndarray]:
+
+        folder = self._current_folder(symbol, bar_size, bar_type)
+        mmap_mode = 'r' if memory_map else None
+
+        if not self._is_consistent(folder=folder):
+            return {
+                column: np.zeros(shape=0, dtype='int64' if column == 'datetime' else 'float64')
+                for column in ['datetime'] + self.columns
+            }
+
+        return {
+            column: np.load(file=folder.joinpath(column + '.npy'), mmap_mode=mmap_mode)
+            for column in ['datetime'] + self.columns
+        }
+
+    def candles(self, symbol: str, bar_size: int, bar_type: str, start: int, end: int) -> List[dict]:
+
+        arrays = self.load(symbol, bar_size, bar_type)
+
+        # The datetimes are sorted, so slice instead of scanning.
+        first = int(np.searchsorted(arrays['datetime'], start, side='left'))
+        last = int(np.searchsorted(arrays['datetime'], end, side='right'))
+
+        columns = {column: arrays[column][first:last].tolist() for column in arrays}
+
+        return [
+            {
+                'open': columns['open'][i],
+                'close': columns['close'][i],
+                'high': columns['high'][i],
+                'low': columns['low'][i],
+                'volume': columns['volume'][i],
+                'datetime': columns['datetime'][i]
+            }
+            for i in range(last - first)
+        ]
+
+    def settled_until(self, bar_size: int, bar_type: str) -> int:
+
+        # Bars that start after this one may still be forming, so they can still change.
+        return int(time.time() * 1000) - self.bar_lengths.get(bar_type, 86400000) * int(bar_size)
+
+    def store(self, symbol: str, bar_size: int, bar_type: str, candles: List[dict],
+              ranges: List[Tuple[int, int]]) -> None:
+
+        # Whatever was asked for is known, empty or not, as long as it can't change anymore.
+        settled = self.settled_until(bar_size, bar_type)
+        covered = [
+            [range_start, min(range_end, settled)]
+            for range_start, range_end in ranges
+            if range_start <= min(range_end, settled)
+        ]
+
+        if not candles and not covered:
+            return
+
+        series_folder = self._series_folder(symbol, bar_size, bar_type)
+        series_folder.mkdir(parents=True, exist_ok=True)
+
+        old_folder = self._current_folder(symbol, bar_size, bar_type)
+        existing = self.load(symbol, bar_size, bar_type, memory_map=False)
+        coverage = self.coverage(symbol, bar_size, bar_type)
+
+        # New candles go last, so they win when we drop duplicate timestamps.
+        merged = {
+            column: np.concatenate([
+                existing[column],
+                np.array([candle[column] for candle in candles], dtype=existing[column].dtype)
+            ])
+            for column in existing
+        }
+
+        reversed_datetimes = merged['datetime'][::-1]
+        unique_datetimes, first_seen = np.unique(reversed_datetimes, return_index=True)
+        keep = merged['datetime'].shape[0] - 1 - first_seen
+
+        coverage = coverage + covered
+
+        # Write the new generation off to the side, then swap it in with one rename.
+        generation = self._next_generation(series_folder=series_folder)
+        temporary_folder = series_folder.joinpath(generation + '.tmp')
+        shutil.rmtree(temporary_folder, ignore_errors=True)
+        temporary_folder.mkdir()
+
+        for column in merged:
+            np.save(file=temporary_folder.joinpath(column + '.npy'), arr=merged[column][keep])
+
+        self._write_coverage(file_path=temporary_folder.joinpath('coverage.json'), coverage=coverage)
+
+        os.replace(temporary_folder, series_folder.joinpath(generation))
+        self._write_current(series_folder=series_folder, generation=generation)
+
+        # The old generation is unreachable now. Readers may still have it mapped, so don't insist.
+        if old_folder != series_folder:
+            shutil.rmtree(old_folder, ignore_errors=True)
+        else:
+            for file_name in [column + '.npy' for column in ['datetime'] + self.columns] + ['coverage.json']:
+                self._remove(file_path=old_folder.joinpath(file_name))
+
+    def _next_generation(self, series_folder: pathlib.Path) -> str:
+
+        generations = [
+            int(path.name) for path in series_folder.iterdir()
+            if path.is_dir() and path.name.isdigit()
+        ]
+
+        return '{generation:08d}'.format(generation=max(generations, default=0) + 1)
+
+    def _write_current(self, series_folder: pathlib.Path, generation: str) -> None:
+
+        temporary_path = series_folder.joinpath('CURRENT.tmp')
+
+        with open(file=temporary_path, mode='w') as current_file:
+            current_file.write(generation)
+            current_file.flush()
+            os.fsync(current_file.fileno())
+
+        os.replace(temporary_path, series_folder.joinpath('CURRENT'))
+
+    def _remove(self, file_path: pathlib.Path) -> None:
+
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    def _write_coverage(self, file_path: pathlib.Path, coverage: List[List[int]]) -> None:
+
+        merged = []
+
+        for range_start, range_end in sorted(coverage):
+            if merged and range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+
+        with open(file=file_path, mode='w') as coverage_json:
+            json.dump(obj=merged, fp=coverage_json)
+
+    def grab(self, td_client: TDClient, symbol: str, period_type: str, bar_size: int, bar_type: str,
+             start: int, end: int, extended_hours: bool = True) -> List[dict]:
+
+        with self._lock(symbol, bar_size, bar_type):
+
+            missing = self.missing_ranges(symbol, bar_size, bar_type, start, end)
+            candles = []
+
+            # Only go to the broker for the ranges we don't have.
+            for missing_start, missing_end in missing:
+
+                historical_prices_response = td_client.get_price_history(
+                    symbol=symbol,
+                    period_type=period_type,
+                    start_date=str(missing_start),
+                    end_date=str(missing_end),
+                    frequency_type=bar_type,
+                    frequency=bar_size,
+                    extended_hours=extended_hours
+                )
+
+                candles += historical_prices_response['candles']
+
+            # Every range goes in with one write of the series.
+            if missing:
+                self.store(
+                    symbol=symbol,
+                    bar_size=bar_size,
+                    bar_type=bar_type,
+                    candles=candles,
+                    ranges=missing
+                )
+
+            return self.candles(symbol, bar_size, bar_type, start, end)
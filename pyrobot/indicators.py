@@ -8,23 +8,68 @@ from typing import Dict
 from typing import Union
 from typing import Optional
 from typing import Tuple
+from typing import Callable
 
 from pyrobot.stock_frame import StockFrame
+from pyrobot.signals import SignalEngine
+from pyrobot.kernels import SegmentLayout
+from pyrobot.kernels import segment_diff
+from pyrobot.kernels import split_up_down
+from pyrobot.kernels import segment_rolling_mean
+from pyrobot.kernels import segment_ewm_mean
+from pyrobot.kernels import segment_rsi
+from pyrobot.kernels import ewm_lookback
+from pyrobot.kernels import relative_strength_index
+from pyrobot.streaming import IndicatorState
+from pyrobot.streaming import DifferenceState
+from pyrobot.streaming import RollingMeanState
+from pyrobot.streaming import EwmMeanState
+from pyrobot.streaming import RsiState
 
 
 class Indicators():
 
-    def __init__(self, price_data_frame: StockFrame) -> None:
+    # The intermediate series indicators share, and what each is built from.
+    intermediate_graph = {
+        'close': [],
+        'change_in_price': ['close'],
+        'up_day': ['change_in_price'],
+        'down_day': ['change_in_price'],
+        'ewma_up': ['up_day'],
+        'ewma_down': ['down_day'],
+        'ewma_close': ['close']
+    }
+
+    def __init__(self, price_data_frame: StockFrame, mode: str = 'batch') -> None:
+
+        if mode not in ['batch', 'streaming', 'tail']:
+            raise ValueError("Invalid mode, choose either batch, streaming or tail.")
+
         self._stock_frame: StockFrame = price_data_frame
         self._price_groups = self._stock_frame.symbol_groups
         self._current_indicators = {}
         self._indicator_signals = {}
+        self._signal_logic = {'buy': 'and', 'sell': 'and'}
+        self._signal_engine: SignalEngine = None
         self._frame = self._stock_frame.frame
+        self._mode = mode
+        self._streaming_states: Dict[str, Dict[str, IndicatorState]] = {}
+        self._streaming_outputs: Dict[str, Dict[str, np.ndarray]] = {}
+        self._streaming_frames: Dict[str, pd.DataFrame] = {}
+        self._layout: SegmentLayout = None
+        self._layout_version = None
+        self._indicator_columns: Dict[Tuple[str, Tuple], str] = {}
+        self._intermediates: Dict[Tuple[str, int], np.ndarray] = {}
+        self._intermediates_version = None
+
+    @property
+    def mode(self) -> str:
+        return self._mode
 
     def set_indicator_signals(self, indicator: str, buy: float, sell: float, condition_buy: Any,
                               condition_sell: Any) -> None:
 
-        if indicator in self._indicator_signals:
+        if indicator not in self._indicator_signals:
             self._indicator_signals[indicator] = {}
 
         self._indicator_signals[indicator]['buy'] = buy
@@ -32,6 +77,34 @@ class Indicators():
         self._indicator_signals[indicator]['buy_operator'] = condition_buy
         self._indicator_signals[indicator]['sell_operator'] = condition_sell
 
+        # The rules changed, so compile them again on the next check.
+        self._signal_engine = None
+
+    def set_signal_logic(self, buy: str = 'and', sell: str = 'and') -> None:
+
+        if buy not in ['and', 'or'] or sell not in ['and', 'or']:
+            raise ValueError("Invalid signal logic, choose either and or or.")
+
+        self._signal_logic = {'buy': buy, 'sell': sell}
+        self._signal_engine = None
+
+    def set_signal_engine(self, signal_engine: SignalEngine) -> None:
+
+        self._signal_engine = signal_engine
+
+    @property
+    def signal_engine(self) -> SignalEngine:
+
+        # Compile the rules once, and reuse them until they change.
+        if self._signal_engine is None:
+            self._signal_engine = SignalEngine.compile(
+                indicator_signals=self._indicator_signals,
+                buy_logic=self._signal_logic['buy'],
+                sell_logic=self._signal_logic['sell']
+            )
+
+        return self._signal_engine
+
     def get_indicator_signals(self, indicator: Optional[str]) -> Dict:
 
         if indicator and indicator in self._indicator_signals:
@@ -48,94 +121,225 @@ class Indicators():
     def price_data_frame(self, price_data_frame: pd.DataFrame) -> None:
         self._frame = price_data_frame
 
-    def change_in_price(self) -> pd.DataFrame:
-        locals_data = locals()
-        del locals_data['self']
+    def _segment_layout(self) -> SegmentLayout:
 
-        column_name = 'change_in_price'
-        self._current_indicators[column_name] = {}
-        self._current_indicators[column_name]['args'] = locals_data
-        self._current_indicators[column_name]['func'] = self.change_in_price
+        # Keep our frame in step with the StockFrame, and only rebuild the
+        # layout when its data changed.
+        self._frame = self._stock_frame.frame
 
-        self._frame[column_name] = self._price_groups['close'].transform(
-            lambda x: x.diff()
-        )
+        if self._layout is None or self._layout_version != self._stock_frame.version:
+            self._layout = SegmentLayout.from_slices(
+                symbol_slices=self._stock_frame.symbol_slices
+            )
+            self._layout_version = self._stock_frame.version
 
-    def rsi(self, period: int, method: str = 'wilders') -> pd.DataFrame:
-        locals_data = locals()
-        del locals_data['self']
+        return self._layout
+
+    def _intermediate(self, name: str, span: int = None) -> np.ndarray:
+
+        layout = self._segment_layout()
+
+        # Intermediates live as long as the data they were built from.
+        if self._intermediates_version != self._stock_frame.version:
+            self._intermediates = {}
+            self._intermediates_version = self._stock_frame.version
+
+        key = (name, span)
+
+        if key in self._intermediates:
+            return self._intermediates[key]
+
+        # Build the dependencies first, each one only once.
+        dependencies = [
+            self._intermediate(name=dependency)
+            for dependency in self.intermediate_graph[name]
+        ]
+
+        if name == 'close':
+            values = self._frame['close'].to_numpy(dtype='float64')
+        elif name == 'change_in_price':
+            values = segment_diff(values=dependencies[0], layout=layout)
+        elif name == 'up_day':
+            values = split_up_down(change=dependencies[0])[0]
+        elif name == 'down_day':
+            values = split_up_down(change=dependencies[0])[1]
+        else:
+            values = segment_ewm_mean(values=dependencies[0], layout=layout, span=span)
+
+        self._intermediates[key] = values
+
+        return values
+
+    def _parameters(self, args: Dict) -> Tuple:
+
+        return tuple(sorted(
+            (key, value) for key, value in args.items() if key != 'column_name'
+        ))
+
+    def _default_column(self, indicator: str, args: Dict, numbered_name: str) -> str:
+
+        # Parameters we've seen before keep their column.
+        parameters = self._parameters(args=args)
+
+        if (indicator, parameters) in self._indicator_columns:
+            return self._indicator_columns[(indicator, parameters)]
+
+        # The first one gets the plain name signal setups already use,
+        # other parameters get their own numbered column.
+        if indicator not in self._current_indicators:
+            return indicator
+
+        return numbered_name
+
+    def _register_indicator(self, indicator: str, column_name: str, args: Dict,
+                            func: Callable, state: Tuple, kernel: Tuple, lookback: int) -> None:
+
+        # One column per indicator and set of parameters.
+        self._indicator_columns[(indicator, self._parameters(args=args))] = column_name
 
-        column_name = 'rsi'
         self._current_indicators[column_name] = {}
-        self._current_indicators[column_name]['args'] = locals_data
-        self._current_indicators[column_name]['func'] = self.rsi
+        self._current_indicators[column_name]['args'] = args
+        self._current_indicators[column_name]['func'] = func
+        self._current_indicators[column_name]['state'] = state
 
-        if 'change_in_price' not in self._frame.columns:
-            self.change_in_price()
+        # What tail mode needs: the kernel, and how many bars it looks back.
+        self._current_indicators[column_name]['kernel'] = kernel
+        self._current_indicators[column_name]['lookback'] = lookback
 
-        self._frame['up_day'] = self._price_groups['change_in_price'].transform(
-            lambda x: np.where(x >= 0, x, 0)
-        )
+    def indicator_column(self, indicator: str, **parameters) -> str:
 
-        self._frame['down_day'] = self._price_groups['change_in_price'].transform(
-            lambda x: np.where(x < 0, x.abs(), 0)
-        )
+        for (name, registered_parameters), column_name in self._indicator_columns.items():
+
+            registered_parameters = dict(registered_parameters)
 
-        self._frame['ewma_up'] = self._price_groups['up_day'].transform(
-            lambda x: x.ewm(span=period).mean()
+            if name == indicator and all(
+                key in registered_parameters and registered_parameters[key] == value
+                for key, value in parameters.items()
+            ):
+                return column_name
+
+        raise KeyError(
+            "No {indicator} indicator with parameters {parameters} has been added.".format(
+                indicator=indicator,
+                parameters=parameters
+            )
         )
 
-        self._frame['ewma_down'] = self._price_groups['down_day'].transform(
-            lambda x: x.ewm(span=period).mean()
+    def change_in_price(self, column_name: str = None) -> pd.DataFrame:
+        locals_data = locals()
+        del locals_data['self']
+
+        column_name = column_name or 'change_in_price'
+        self._register_indicator(
+            indicator='change_in_price',
+            column_name=column_name,
+            args=locals_data,
+            func=self.change_in_price,
+            state=(DifferenceState, {}),
+            kernel=(segment_diff, {}),
+            lookback=2
         )
 
-        relative_strength = self._frame['ewma_up'] / self._frame['ewma_down']
-        relative_strength_index = 100.0 - (100.0 / (1.0 + relative_strength))
+        self._frame[column_name] = self._intermediate(name='change_in_price').copy()
+
+        return self._frame
+
+    def rsi(self, period: int, method: str = 'wilders', column_name: str = None) -> pd.DataFrame:
+        locals_data = locals()
+        del locals_data['self']
 
-        self._frame['rsi'] = np.where(relative_strength_index == 0, 100, 100.0 - (100.0 / (1.0 + relative_strength)))
+        column_name = column_name or self._default_column(
+            indicator='rsi',
+            args=locals_data,
+            numbered_name='rsi_{period}'.format(period=period)
+        )
+        self._register_indicator(
+            indicator='rsi',
+            column_name=column_name,
+            args=locals_data,
+            func=self.rsi,
+            state=(RsiState, {'period': period}),
+            kernel=(segment_rsi, {'span': period}),
+            lookback=ewm_lookback(span=period) + 1
+        )
 
-        self._frame.drop(
-            labels=['ewma_up', 'ewma_down', 'up_day', 'down_day', 'change_in_price'],
-            axis=1,
-            inplace=True
+        self._frame[column_name] = relative_strength_index(
+            ewma_up=self._intermediate(name='ewma_up', span=period),
+            ewma_down=self._intermediate(name='ewma_down', span=period)
         )
 
         return self._frame
 
-    def sma(self, period: int) -> pd.DataFrame:
+    def sma(self, period: int, column_name: str = None) -> pd.DataFrame:
         locals_data = locals()
         del locals_data['self']
 
-        column_name = 'sma'
-        self._current_indicators[column_name] = {}
-        self._current_indicators[column_name]['args'] = locals_data
-        self._current_indicators[column_name]['func'] = self.sma
+        column_name = column_name or self._default_column(
+            indicator='sma',
+            args=locals_data,
+            numbered_name='sma_{period}'.format(period=period)
+        )
+        self._register_indicator(
+            indicator='sma',
+            column_name=column_name,
+            args=locals_data,
+            func=self.sma,
+            state=(RollingMeanState, {'period': period}),
+            kernel=(segment_rolling_mean, {'window': period}),
+            lookback=period
+        )
 
-        self._frame[column_name] = self._price_groups['close'].transform(
-            lambda x: x.rolling(window=period).mean()
+        self._frame[column_name] = segment_rolling_mean(
+            values=self._intermediate(name='close'),
+            layout=self._segment_layout(),
+            window=period
         )
 
         return self._frame
 
-    def ema(self, period: int, alpha: float = 0.0) -> pd.DataFrame:
+    def ema(self, period: int, alpha: float = 0.0, column_name: str = None) -> pd.DataFrame:
         locals_data = locals()
         del locals_data['self']
 
-        column_name = 'ema'
-        self._current_indicators[column_name] = {}
-        self._current_indicators[column_name]['args'] = locals_data
-        self._current_indicators[column_name]['func'] = self.ema
+        if not 0.0 <= alpha <= 1.0:
+            raise ValueError("Invalid alpha, it has to be between 0 and 1.")
+
+        # An alpha overrides the period, as the span with the same decay.
+        span = 2.0 / alpha - 1.0 if alpha > 0.0 else period
 
-        self._frame[column_name] = self._price_groups['close'].transform(
-            lambda x: x.ewm(span=period).mean()
+        column_name = column_name or self._default_column(
+            indicator='ema',
+            args=locals_data,
+            numbered_name='ema_{period}'.format(period=period) if alpha == 0.0 else 'ema_alpha_{alpha}'.format(alpha=alpha)
+        )
+        self._register_indicator(
+            indicator='ema',
+            column_name=column_name,
+            args=locals_data,
+            func=self.ema,
+            state=(EwmMeanState, {'span': span}),
+            kernel=(segment_ewm_mean, {'span': span}),
+            lookback=ewm_lookback(span=span)
         )
 
+        self._frame[column_name] = self._intermediate(name='ewma_close', span=span).copy()
+
         return self._frame
 
     def refresh(self):
 
+        # The StockFrame may have swapped its frame while adding rows.
+        self._frame = self._stock_frame.frame
         self._price_groups = self._stock_frame.symbol_groups
 
+        if self._mode == 'streaming':
+            self._refresh_streaming()
+            return
+
+        if self._mode == 'tail':
+            self._refresh_tail()
+            return
+
         for indicator in self._current_indicators:
             indicator_arguments = self._current_indicators[indicator]['args']
 
@@ -143,8 +347,108 @@ class Indicators():
 
             indicator_function(**indicator_arguments)
 
+    def _refresh_streaming(self) -> None:
+
+        closes = self._frame['close'].to_numpy(dtype='float64')
+        timestamps = np.asarray(self._frame.index.get_level_values(1), dtype='datetime64[ns]').view('int64')
+        symbol_slices = self._stock_frame.symbol_slices
+
+        # Copy the keys, the batch functions can register new indicators.
+        for column_name in list(self._current_indicators):
+
+            state_class, state_args = self._current_indicators[column_name]['state']
+            states = self._streaming_states.setdefault(column_name, {})
+            outputs = self._streaming_outputs.setdefault(column_name, {})
+
+            positions = []
+            values = []
+
+            for symbol, (start, stop) in symbol_slices.items():
+
+                state = states.get(symbol, None)
+                symbol_closes = closes[start:stop]
+                symbol_timestamps = timestamps[start:stop]
+
+                # New symbol, or its history changed under us, so seed it again.
+                if state is None or not state.is_continuation(values=symbol_closes, timestamps=symbol_timestamps):
+                    state = state_class(**state_args)
+                    states[symbol] = state
+                    outputs[symbol] = state.seed(values=symbol_closes)
+                    positions.append(np.arange(start, stop))
+                    values.append(outputs[symbol])
+
+                # Otherwise only run the bars we haven't seen.
+                elif state.count < stop - start:
+                    new_positions = np.arange(start + state.count, stop)
+                    new_values = np.array([state.update(value=closes[position]) for position in new_positions])
+                    outputs[symbol] = np.concatenate([outputs[symbol], new_values])
+                    positions.append(new_positions)
+                    values.append(new_values)
+
+                state.mark_seen(values=symbol_closes, timestamps=symbol_timestamps)
+
+            # Symbols that left the frame take their state with them.
+            for symbol in set(states) - set(symbol_slices):
+                del states[symbol]
+                del outputs[symbol]
+
+            # A frame we haven't written to (the StockFrame rebuilt or merged
+            # it) gets the whole column, the one we wrote to only the new bars.
+            if self._streaming_frames.get(column_name, None) is not self._frame or column_name not in self._frame.columns:
+                column = np.full(shape=closes.shape[0], fill_value=np.nan)
+
+                for symbol, (start, stop) in symbol_slices.items():
+                    column[start:stop] = outputs[symbol]
+
+                self._frame[column_name] = column
+                self._streaming_frames[column_name] = self._frame
+
+            elif positions:
+                self._frame.iloc[
+                    np.concatenate(positions),
+                    self._frame.columns.get_loc(column_name)
+                ] = np.concatenate(values)
+
+    def _refresh_tail(self) -> None:
+
+        layout = self._segment_layout()
+        closes = self._intermediate(name='close')
+        last_positions = self._stock_frame.last_row_positions
+
+        # Indicators with the same lookback share the same window.
+        tails = {}
+
+        for column_name, indicator in self._current_indicators.items():
+
+            kernel, kernel_args = indicator['kernel']
+            lookback = indicator['lookback']
+
+            if lookback not in tails:
+                tails[lookback] = layout.tail(lookback=lookback)
+
+            positions, tail_layout = tails[lookback]
+
+            # Run the kernel over the window, and keep each symbol's last value.
+            values = kernel(values=closes[positions], layout=tail_layout, **kernel_args)
+
+            if column_name not in self._frame.columns:
+                self._frame[column_name] = np.nan
+
+            self._frame.iloc[
+                last_positions,
+                self._frame.columns.get_loc(column_name)
+            ] = values[tail_layout.stops - 1]
+
     def check_signals(self) -> Union[pd.DataFrame, None]:
 
-        signals_df = self._stock_frame._check_signals(indicators=self._indicator_signals)
+        indicators_comp_key = [key for key in self._indicator_signals if '_comp_' in key]
+        indicators_key = [key for key in self._indicator_signals if '_comp_' not in key]
+
+        signals_df = self._stock_frame._check_signals(
+            indicators=self._indicator_signals,
+            indciators_comp_key=indicators_comp_key,
+            indicators_key=indicators_key,
+            signal_engine=self.signal_engine
+        )
 
         return signals_df
@@ -0,0 +1,216 @@
+import numpy as np
+
+from typing import Dict
+from typing import Tuple
+
+
+class SegmentLayout():
+
+    def __init__(self, starts: np.ndarray, stops: np.ndarray) -> None:
+
+        self.starts = np.asarray(starts, dtype='int64')
+        self.stops = np.asarray(stops, dtype='int64')
+        self.lengths = self.stops - self.starts
+        self.size = int(self.lengths.sum())
+        self.max_length = int(self.lengths.max()) if self.lengths.shape[0] > 0 else 0
+
+        # When every segment has the same length (the usual case), the flat
+        # array is just a reshaped matrix and we can skip the scatter.
+        self.is_uniform = bool(
+            self.lengths.shape[0] > 0 and
+            (self.lengths == self.max_length).all() and
+            (self.starts == np.arange(self.lengths.shape[0]) * self.max_length).all()
+        )
+
+        # Otherwise, the flat position of every value once laid out as a
+        # time-major matrix (bar number within the segment, segment).
+        if not self.is_uniform:
+            segments = np.repeat(np.arange(self.lengths.shape[0]), self.lengths)
+            positions = np.arange(self.size) - np.repeat(self.starts, self.lengths)
+            self.matrix_positions = positions * self.lengths.shape[0] + segments
+
+    @classmethod
+    def from_slices(cls, symbol_slices: Dict[str, Tuple[int, int]]) -> 'SegmentLayout':
+
+        bounds = np.array(list(symbol_slices.values()), dtype='int64').reshape(-1, 2)
+
+        return cls(starts=bounds[:, 0], stops=bounds[:, 1])
+
+    def tail(self, lookback: int) -> Tuple[np.ndarray, 'SegmentLayout']:
+
+        # Only the last `lookback` values of each segment, packed together.
+        lengths = np.minimum(self.lengths, lookback)
+        stops = np.cumsum(lengths)
+        starts = stops - lengths
+
+        # Where each packed value sits in the original flat array.
+        size = int(lengths.sum())
+        positions = np.repeat(self.stops - lengths - starts, lengths) + np.arange(size)
+
+        return positions, SegmentLayout(starts=starts, stops=stops)
+
+    def to_matrix(self, values: np.ndarray) -> np.ndarray:
+
+        if self.is_uniform:
+            return values.reshape(self.lengths.shape[0], self.max_length).T
+
+        # Left align each segment in its own column, padding with NaN.
+        matrix = np.full(
+            shape=(self.max_length, self.lengths.shape[0]),
+            fill_value=np.nan
+        )
+        matrix.ravel()[self.matrix_positions] = values
+
+        return matrix
+
+    def from_matrix(self, matrix: np.ndarray) -> np.ndarray:
+
+        if self.is_uniform:
+            return matrix.T.ravel()
+
+        return matrix.ravel()[self.matrix_positions]
+
+
+def segment_diff(values: np.ndarray, layout: SegmentLayout) -> np.ndarray:
+
+    difference = np.empty(shape=values.shape[0])
+    difference[1:] = values[1:] - values[:-1]
+
+    # The first bar of every segment has nothing to compare against.
+    difference[layout.starts[layout.lengths > 0]] = np.nan
+
+    return difference
+
+
+def split_up_down(change: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+
+    # NaN falls through to zero on both sides.
+    with np.errstate(invalid='ignore'):
+        up_day = np.where(change >= 0, change, 0.0)
+        down_day = np.where(change < 0, np.abs(change), 0.0)
+
+    return up_day, down_day
+
+
+def segment_rolling_mean(values: np.ndarray, layout: SegmentLayout, window: int) -> np.ndarray:
+
+    matrix = layout.to_matrix(values=values)
+    is_missing = np.isnan(matrix)
+    has_missing = is_missing.any()
+
+    # Running sums down each column, with a leading row of zeros.
+    padding = np.zeros(shape=(1, matrix.shape[1]))
+
+    if has_missing:
+        matrix = np.where(is_missing, 0.0, matrix)
+
+    totals = np.concatenate([padding, np.cumsum(matrix, axis=0)])
+
+    means = np.full(shape=matrix.shape, fill_value=np.nan)
+
+    if window <= matrix.shape[0]:
+
+        means[window - 1:] = (totals[window:] - totals[:-window]) / window
+
+        # Like pandas, a window with any missing value has no mean.
+        if has_missing:
+            missing = np.concatenate([padding, np.cumsum(is_missing, axis=0)])
+            means[window - 1:][(missing[window:] - missing[:-window]) > 0] = np.nan
+
+    return layout.from_matrix(matrix=means)
+
+
+def segment_ewm_mean(values: np.ndarray, layout: SegmentLayout, span: int) -> np.ndarray:
+
+    # Rows are read one at a time below, so make them contiguous.
+    matrix = np.ascontiguousarray(layout.to_matrix(values=values))
+
+    decay = 1.0 - 2.0 / (span + 1.0)
+
+    averages = np.empty(shape=matrix.shape)
+
+    if matrix.shape[0] == 0:
+        return layout.from_matrix(matrix=averages)
+
+    # Step every segment forward one bar at a time, following pandas'
+    # adjusted `ewm(span=span).mean()` recurrence.
+    if not np.isnan(values).any():
+
+        # Every segment starts on row zero with a real value (padding only
+        # trails), so they all carry the same weight.
+        weighted_average = matrix[0].copy()
+        old_weight = 1.0
+        averages[0] = weighted_average
+
+        for row in range(1, matrix.shape[0]):
+
+            current = matrix[row]
+            old_weight *= decay
+
+            weighted_average = np.where(
+                weighted_average != current,
+                ((old_weight * weighted_average) + current) / (old_weight + 1.0),
+                weighted_average
+            )
+            old_weight += 1.0
+
+            averages[row] = weighted_average
+
+        return layout.from_matrix(matrix=averages)
+
+    weighted_average = np.full(shape=matrix.shape[1], fill_value=np.nan)
+    old_weight = np.ones(shape=matrix.shape[1])
+
+    for row in range(matrix.shape[0]):
+
+        current = matrix[row]
+        is_observation = ~np.isnan(current)
+        has_average = ~np.isnan(weighted_average)
+
+        # Existing averages decay, and take in the new observation.
+        old_weight = np.where(has_average, old_weight * decay, old_weight)
+
+        update = has_average & is_observation & (weighted_average != current)
+        weighted_average = np.where(
+            update,
+            ((old_weight * weighted_average) + current) / (old_weight + 1.0),
+            weighted_average
+        )
+        old_weight = np.where(has_average & is_observation, old_weight + 1.0, old_weight)
+
+        # Segments without an average yet start from the first observation.
+        weighted_average = np.where(~has_average & is_observation, current, weighted_average)
+
+        averages[row] = weighted_average
+
+    return layout.from_matrix(matrix=averages)
+
+
+def segment_rsi(values: np.ndarray, layout: SegmentLayout, span: int) -> np.ndarray:
+
+    up_day, down_day = split_up_down(change=segment_diff(values=values, layout=layout))
+
+    return relative_strength_index(
+        ewma_up=segment_ewm_mean(values=up_day, layout=layout, span=span),
+        ewma_down=segment_ewm_mean(values=down_day, layout=layout, span=span)
+    )
+
+
+def ewm_lookback(span: int, tolerance: float = 1e-10) -> int:
+
+    # Bars needed before the weight left on older bars drops below the tolerance.
+    decay = 1.0 - 2.0 / (span + 1.0)
+
+    if decay <= 0.0:
+        return 1
+
+    return int(np.ceil(np.log(tolerance) / np.log(decay)))
+
+
+def relative_strength_index(ewma_up: np.ndarray, ewma_down: np.ndarray) -> np.ndarray:
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_strength = ewma_up / ewma_down
+        relative_strength_index = 100.0 - (100.0 / (1.0 + relative_strength))
+
+    return np.where(relative_strength_index == 0, 100, relative_strength_index)
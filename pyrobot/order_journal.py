@@ -0,0 +1,355 @@
+import os
+import json
+import bisect
+import pathlib
+import threading
+
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+from typing import Optional
+
+
+class OrderJournal():
+
+    def __init__(self, folder: Union[str, pathlib.Path] = None, max_bytes: int = 50 * 1024 * 1024,
+                 max_segments: int = None) -> None:
+
+        # Same folder the old orders.json lived in.
+        if folder is None:
+            folder = pathlib.Path(__file__).parents[1].joinpath('data')
+
+        if max_segments is not None and max_segments < 1:
+            raise ValueError("max_segments has to be at least 1, or None to keep every segment.")
+
+        self.folder = pathlib.Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        # How many segments to keep, the oldest go first. None keeps the whole history.
+        self.max_segments = max_segments
+
+        # Where each record lives, as (segment, byte offset).
+        self._by_order_id: Dict[str, Tuple[int, int]] = {}
+        self._by_symbol: Dict[str, List[Tuple[int, int]]] = {}
+        self._by_timestamp: List[Tuple[str, int, int]] = []
+
+        # What the live segment holds, saved next to it once it's sealed.
+        self._segment_entries: List[dict] = []
+
+        # Group commit: writers queue lines, whoever gets there first writes
+        # and syncs the whole queue, the rest just wait for it.
+        self._condition = threading.Condition()
+        self._pending: List[Tuple[dict, bytes]] = []
+        self._appended = 0
+        self._committed = 0
+        self._committing = False
+
+        self._migrate()
+        self._build_index()
+        self._prune()
+
+        segments = self.segments()
+        self._segment = segments[-1] if segments else 1
+        self._file = open(self._segment_path(segment=self._segment), mode='ab')
+        self._size = self._file.tell()
+
+    def _segment_path(self, segment: int) -> pathlib.Path:
+
+        return self.folder.joinpath('orders-{segment:05d}.jsonl'.format(segment=segment))
+
+    def _segment_index_path(self, segment: int) -> pathlib.Path:
+
+        return self.folder.joinpath('orders-{segment:05d}.index.json'.format(segment=segment))
+
+    def segments(self) -> List[int]:
+
+        return sorted(
+            int(file_path.stem.split('-')[1])
+            for file_path in self.folder.glob('orders-*.jsonl')
+        )
+
+    def _encode(self, record: dict) -> bytes:
+
+        def default(obj):
+
+            if isinstance(obj, bytes):
+                return str(obj)
+
+        return (json.dumps(obj=record, default=default) + '\n').encode('utf-8')
+
+    def _migrate(self) -> None:
+
+        old_path = self.folder.joinpath('orders.json')
+
+        # One time: carry the old orders over, then move the file out of the way.
+        if not old_path.exists() or self.segments():
+            return
+
+        with open(file=old_path, mode='r') as order_json:
+            orders_list = json.load(order_json)
+
+        temporary_path = self._segment_path(segment=1).with_suffix('.tmp')
+
+        with open(file=temporary_path, mode='wb') as journal_file:
+            journal_file.write(b''.join(self._encode(record=record) for record in orders_list))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+        os.replace(temporary_path, self._segment_path(segment=1))
+        os.replace(old_path, old_path.with_suffix('.json.migrated'))
+
+    def _build_index(self) -> None:
+
+        segments = self.segments()
+
+        for segment in segments:
+
+            # Sealed segments saved their index, only the live one is read through.
+            entries = None if segment == segments[-1] else self._load_segment_index(segment=segment)
+
+            if entries is None:
+                entries = self._scan(segment=segment)
+
+                if segment != segments[-1]:
+                    self._save_segment_index(segment=segment, entries=entries)
+
+            for entry in entries:
+                self._index(entry=entry, segment=segment)
+
+            if segment == segments[-1]:
+                self._segment_entries = entries
+
+    def _scan(self, segment: int) -> List[dict]:
+
+        segment_path = self._segment_path(segment=segment)
+        entries = []
+
+        with open(file=segment_path, mode='rb') as journal_file:
+
+            offset = 0
+
+            for line in journal_file:
+
+                # A torn last line from a crash is dropped, everything before it is intact.
+                if not line.endswith(b'\n'):
+                    break
+
+                entries.append(self._entry(record=json.loads(line), offset=offset))
+                offset += len(line)
+
+        if segment_path.stat().st_size > offset:
+            os.truncate(segment_path, offset)
+
+        return entries
+
+    def _load_segment_index(self, segment: int) -> Optional[List[dict]]:
+
+        index_path = self._segment_index_path(segment=segment)
+
+        if not index_path.exists():
+            return None
+
+        with open(file=index_path, mode='r') as index_json:
+            segment_index = json.load(index_json)
+
+        # A segment that changed since it was sealed gets read through again.
+        if segment_index['size'] != self._segment_path(segment=segment).stat().st_size:
+            return None
+
+        return segment_index['entries']
+
+    def _save_segment_index(self, segment: int, entries: List[dict]) -> None:
+
+        index_path = self._segment_index_path(segment=segment)
+        temporary_path = index_path.with_suffix('.tmp')
+
+        with open(file=temporary_path, mode='w') as index_json:
+            json.dump(obj={'size': self._segment_path(segment=segment).stat().st_size, 'entries': entries}, fp=index_json)
+
+        os.replace(temporary_path, index_path)
+
+    def _entry(self, record: dict, offset: int) -> dict:
+
+        # Only what the indexes need, so a sealed segment never has to be parsed again.
+        return {
+            'offset': offset,
+            'order_id': None if record.get('order_id', None) is None else str(record['order_id']),
+            'symbols': self._record_symbols(record=record),
+            'timestamp': record.get('timestamp', None)
+        }
+
+    def _index(self, entry: dict, segment: int) -> None:
+
+        location = (segment, entry['offset'])
+
+        if entry['order_id'] is not None:
+            self._by_order_id[entry['order_id']] = location
+
+        for symbol in entry['symbols']:
+            self._by_symbol.setdefault(symbol, []).append(location)
+
+        if entry['timestamp']:
+            bisect.insort(self._by_timestamp, (entry['timestamp'], segment, entry['offset']))
+
+    def _record_symbols(self, record: dict) -> List[str]:
+
+        request_body = record.get('request_body', None) or {}
+
+        if not isinstance(request_body, dict):
+            return []
+
+        return [
+            leg['instrument']['symbol']
+            for leg in request_body.get('orderLegCollection', [])
+            if 'instrument' in leg and 'symbol' in leg['instrument']
+        ]
+
+    def append(self, records: List[dict]) -> None:
+
+        if not records:
+            return
+
+        with self._condition:
+
+            self._pending += [(record, self._encode(record=record)) for record in records]
+            self._appended += len(records)
+            ticket = self._appended
+
+            while self._committed < ticket:
+
+                if self._committing:
+                    self._condition.wait()
+                    continue
+
+                # Take everything queued so far and write it in one go.
+                self._committing = True
+                batch, self._pending = self._pending, []
+
+                self._condition.release()
+
+                try:
+                    locations = self._write(batch=batch)
+                except BaseException:
+                    # Put the batch back for the next writer, and let the caller know.
+                    self._condition.acquire()
+                    self._committing = False
+                    self._pending = batch + self._pending
+                    self._condition.notify_all()
+                    raise
+
+                self._condition.acquire()
+                self._committing = False
+
+                for (record, line), (segment, offset) in zip(batch, locations):
+                    entry = self._entry(record=record, offset=offset)
+                    self._segment_entries.append(entry)
+                    self._index(entry=entry, segment=segment)
+
+                # Past the size limit, later records go to a fresh segment.
+                if self._size >= self.max_bytes:
+                    self._rotate()
+
+                self._committed += len(batch)
+                self._condition.notify_all()
+
+    def _write(self, batch: List[Tuple[dict, bytes]]) -> List[Tuple[int, int]]:
+
+        locations = []
+
+        for record, line in batch:
+            locations.append((self._segment, self._size))
+            self._size += len(line)
+
+        self._file.write(b''.join(line for record, line in batch))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        return locations
+
+    def _rotate(self) -> None:
+
+        # Seal the segment with its index, so reopening doesn't read it through.
+        self._file.close()
+        self._save_segment_index(segment=self._segment, entries=self._segment_entries)
+
+        self._segment += 1
+        self._segment_entries = []
+        self._file = open(self._segment_path(segment=self._segment), mode='ab')
+        self._size = 0
+
+        self._prune()
+
+    def _prune(self) -> None:
+
+        segments = self.segments()
+
+        if self.max_segments is None or len(segments) <= self.max_segments:
+            return
+
+        dropped = set(segments[:len(segments) - self.max_segments])
+
+        for segment in dropped:
+            os.remove(self._segment_path(segment=segment))
+
+            if self._segment_index_path(segment=segment).exists():
+                os.remove(self._segment_index_path(segment=segment))
+
+        # Forget everything that pointed into them.
+        self._by_order_id = {
+            order_id: location for order_id, location in self._by_order_id.items()
+            if location[0] not in dropped
+        }
+        self._by_symbol = {
+            symbol: [location for location in locations if location[0] not in dropped]
+            for symbol, locations in self._by_symbol.items()
+        }
+        self._by_timestamp = [location for location in self._by_timestamp if location[1] not in dropped]
+
+    def _read(self, location: Tuple[int, int]) -> dict:
+
+        segment, offset = location
+
+        with open(file=self._segment_path(segment=segment), mode='rb') as journal_file:
+            journal_file.seek(offset)
+            return json.loads(journal_file.readline())
+
+    def get(self, order_id: Union[str, int]) -> Optional[dict]:
+
+        location = self._by_order_id.get(str(order_id), None)
+
+        if location is None:
+            return None
+
+        return self._read(location=location)
+
+    def by_symbol(self, symbol: str) -> List[dict]:
+
+        return [self._read(location=location) for location in self._by_symbol.get(symbol, [])]
+
+    def between(self, start: str, end: str) -> List[dict]:
+
+        # ISO timestamps sort as strings.
+        first = bisect.bisect_left(self._by_timestamp, (start,))
+        last = bisect.bisect_right(self._by_timestamp, (end, float('inf'), float('inf')))
+
+        return [
+            self._read(location=(segment, offset))
+            for timestamp, segment, offset in self._by_timestamp[first:last]
+        ]
+
+    def records(self) -> List[dict]:
+
+        records = []
+
+        for segment in self.segments():
+            with open(file=self._segment_path(segment=segment), mode='rb') as journal_file:
+                records += [json.loads(line) for line in journal_file]
+
+        return records
+
+    def close(self) -> None:
+
+        with self._condition:
+            self._file.close()
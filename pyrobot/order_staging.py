@@ -0,0 +1,213 @@
+import copy
+import numpy as np
+
+from typing import List
+from typing import Dict
+from typing import Tuple
+
+from pyrobot.trades import Trade
+
+
+class OrderStager():
+
+    def __init__(self) -> None:
+
+        # (symbol, 'buy' or 'sell') -> everything needed to hand out an order.
+        self._staged: Dict[Tuple[str, str], dict] = {}
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+
+        return key in self._staged
+
+    def stage(self, trade: Trade, signal: str = 'buy', price: float = None, stop_size: float = None,
+              profit_size: float = None, percentage: bool = False) -> dict:
+
+        is_limit = trade.order.get('orderType', None) == 'LIMIT'
+
+        # Brackets are built here, off the hot path, from the price we're given.
+        if price is None and (stop_size is not None or profit_size is not None or is_limit):
+            price = trade.grab_price()
+
+        if stop_size is not None or profit_size is not None:
+
+            if profit_size is not None:
+                trade.add_take_profit(profit_size=profit_size, percentage=percentage, price=price)
+
+            if stop_size is not None:
+                trade.add_stop_loss(stop_size=stop_size, percentage=percentage, price=price)
+
+            if profit_size is not None and stop_size is not None:
+                trade.add_one_cancels_other()
+
+        # A limit entry keeps the distance the user chose from the price, one without a price sits on it.
+        if is_limit and trade.order.get('price', None):
+            entry_offset = trade.order['price'] - price
+        else:
+            entry_offset = 0.0
+
+        staged = {
+            'trade': trade,
+            'template': copy.deepcopy(trade.order),
+            'stop_size': stop_size,
+            'profit_size': profit_size,
+            'percentage': percentage,
+            'entry_offset': entry_offset,
+            'entry_price': None,
+            'stop_price': None,
+            'profit_price': None,
+            'ready': []
+        }
+
+        self._staged[(trade.symbol, signal)] = staged
+        self._prepare(staged=staged)
+
+        return staged['ready'][-1]['payload']
+
+    def unstage(self, symbol: str, signal: str = 'buy') -> None:
+
+        self._staged.pop((symbol, signal), None)
+
+    def _prepare(self, staged: dict) -> None:
+
+        payload = copy.deepcopy(staged['template'])
+
+        # Keep references to the fields we'll fill in, so firing is a handful of assignments.
+        legs = []
+        stop_orders = []
+        profit_orders = []
+        orders = [payload]
+
+        while orders:
+
+            order = orders.pop()
+            legs += order.get('orderLegCollection', [])
+            orders += order.get('childOrderStrategies', [])
+
+            if order is payload:
+                continue
+
+            if order.get('orderType', None) in ['STOP', 'STOP_LIMIT']:
+                stop_orders.append(order)
+            elif order.get('orderType', None) == 'LIMIT':
+                profit_orders.append(order)
+
+        # A stop limit keeps its limit the same distance from the stop, like in `BracketEngine`.
+        limit_offsets = [
+            order['price'] - order['stopPrice'] if order['orderType'] == 'STOP_LIMIT' else None
+            for order in stop_orders
+        ]
+
+        prepared = {
+            'payload': payload,
+            'legs': legs,
+            'stop_orders': stop_orders,
+            'limit_offsets': limit_offsets,
+            'profit_orders': profit_orders
+        }
+
+        # Bring it up to the latest levels we've worked out.
+        self._set_levels(staged=staged, prepared=prepared)
+        staged['ready'].append(prepared)
+
+    def _set_levels(self, staged: dict, prepared: dict) -> None:
+
+        # A limit entry moves with the price, so the bracket stays around it.
+        if staged['entry_price'] is not None and prepared['payload'].get('orderType', None) == 'LIMIT':
+            prepared['payload']['price'] = staged['entry_price']
+
+        if staged['stop_price'] is not None:
+            for order, limit_offset in zip(prepared['stop_orders'], prepared['limit_offsets']):
+                order['stopPrice'] = staged['stop_price']
+                if limit_offset is not None:
+                    order['price'] = float(round_prices(staged['stop_price'] + limit_offset))
+
+        if staged['profit_price'] is not None:
+            for order in prepared['profit_orders']:
+                order['price'] = staged['profit_price']
+
+    def _apply_prices(self, staged: List[dict], prices: List[float]) -> None:
+
+        # Every level in one pass.
+        price = np.array(prices, dtype='float64')
+        percentage = np.array([entry['percentage'] for entry in staged], dtype=bool)
+        stop_size = np.array([entry['stop_size'] or 0.0 for entry in staged], dtype='float64')
+        profit_size = np.array([entry['profit_size'] or 0.0 for entry in staged], dtype='float64')
+        entry_offset = np.array([entry['entry_offset'] for entry in staged], dtype='float64')
+
+        entry_price = round_prices(price + entry_offset)
+        stop_price = round_prices(np.where(percentage, price * (1.0 - stop_size), price - stop_size))
+        profit_price = round_prices(np.where(percentage, price * (1.0 + profit_size), price + profit_size))
+
+        for entry, new_entry, new_stop, new_profit in zip(
+                staged, entry_price.tolist(), stop_price.tolist(), profit_price.tolist()):
+
+            entry['entry_price'] = new_entry
+
+            if entry['stop_size'] is not None:
+                entry['stop_price'] = new_stop
+
+            if entry['profit_size'] is not None:
+                entry['profit_price'] = new_profit
+
+            for prepared in entry['ready']:
+                self._set_levels(staged=entry, prepared=prepared)
+
+    def reprice(self, prices: Dict[str, float]) -> None:
+
+        keys = [key for key in self._staged if key[0] in prices]
+
+        if keys:
+            self._apply_prices(
+                staged=[self._staged[key] for key in keys],
+                prices=[prices[key[0]] for key in keys]
+            )
+
+        # Orders handed out since the last bar get their replacements now.
+        self.refill()
+
+    def refill(self) -> None:
+
+        # The copying happens here, between signals, never in take().
+        for staged in self._staged.values():
+            if not staged['ready']:
+                self._prepare(staged=staged)
+
+    def take(self, symbol: str, signal: str = 'buy', quantity: int = None, price: float = None) -> Trade:
+
+        staged = self._staged[(symbol, signal)]
+
+        # The price the signal fired at sets the entry and the brackets around it.
+        if price is not None:
+            self._apply_prices(staged=[staged], prices=[price])
+
+        # Only when the same order is taken twice before a refill.
+        if not staged['ready']:
+            self._prepare(staged=staged)
+
+        prepared = staged['ready'].pop()
+        payload = prepared['payload']
+
+        # Only the last minute details, everything else is already built.
+        if quantity is not None:
+            for leg in prepared['legs']:
+                leg['quantity'] = quantity
+            staged['trade'].order_size = quantity
+
+        # The payload now belongs to the trade, the next one is built by refill().
+        trade = staged['trade']
+        trade.order = payload
+
+        if payload.get('orderType', None) == 'LIMIT':
+            trade.price = payload['price']
+
+        return trade
+
+    def staged_symbols(self, signal: str = 'buy') -> List[str]:
+
+        return [symbol for symbol, staged_signal in self._staged if staged_signal == signal]
+
+
+def round_prices(prices: np.ndarray) -> np.ndarray:
+
+    # Same tick rules as `Trade._calculate_new_price`.
+    return np.where(prices < 1, np.round(prices, 4), np.round(prices, 2))
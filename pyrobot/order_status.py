@@ -6,147 +6,87 @@ class OrderStatus():
     def __init__(self, trade_obj: Trade) -> None:
 
         self.trade_obj = trade_obj
-        self.order_status = self.trade_obj.order_status
 
     @property
-    def is_cancelled(self, refresh_order_info: bool = True) -> bool:
+    def order_status(self) -> str:
 
+        # Always the cached status, reading it never sends a request.
+        if self.trade_obj._order_tracker is not None:
+            return self.trade_obj._order_tracker.status(trade=self.trade_obj)
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
-
-        if self.order_status == 'FILLED':
-            return True
-        else:
-            return False
+        return self.trade_obj.order_status
 
     @property
-    def is_rejected(self, refresh_order_info: bool = True) -> bool:
-
+    def is_terminal(self) -> bool:
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
+        from pyrobot.order_tracker import TERMINAL_STATES
 
-        if self.order_status == 'REJECTED':
-            return True
-        else:
-            return False
+        return self.order_status in TERMINAL_STATES
 
-    @property
-    def is_expired(self, refresh_order_info: bool = True) -> bool:
+    def refresh(self) -> str:
 
+        # The one explicit way to go to the broker: a tracked trade takes part
+        # in the tracker's next batched poll, an untracked one asks for itself.
+        self.trade_obj._update_order_status()
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
-
-        if self.order_status == 'EXPIRED':
-            return True
-        else:
-            return False
+        return self.order_status
 
     @property
-    def is_replaced(self, refresh_order_info: bool = True) -> bool:
-
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
+    def is_cancelled(self) -> bool:
 
-        if self.order_status == 'REPLACED':
-            return True
-        else:
-            return False
+        return self.order_status == 'CANCELED'
 
     @property
-    def is_working(self, refresh_order_info: bool = True) -> bool:
+    def is_rejected(self) -> bool:
 
-
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
-
-        if self.order_status == 'WORKING':
-            return True
-        else:
-            return False
+        return self.order_status == 'REJECTED'
 
     @property
-    def is_pending_activation(self, refresh_order_info: bool = True) -> bool:
-
-
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
+    def is_expired(self) -> bool:
 
-        if self.order_status == 'PENDING_ACTIVATION':
-            return True
-        else:
-            return False
+        return self.order_status == 'EXPIRED'
 
     @property
-    def is_pending_cancel(self, refresh_order_info: bool = True) -> bool:
+    def is_replaced(self) -> bool:
 
-
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
-
-        if self.order_status == 'PENDING_CANCEL':
-            return True
-        else:
-            return False
+        return self.order_status == 'REPLACED'
 
     @property
-    def is_pending_replace(self, refresh_order_info: bool = True) -> bool:
-
+    def is_working(self) -> bool:
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
-
-        if self.order_status == 'PENDING_REPLACE':
-            return True
-        else:
-            return False
+        return self.order_status == 'WORKING'
 
     @property
-    def is_queued(self, refresh_order_info: bool = True) -> bool:
-
+    def is_pending_activation(self) -> bool:
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
-
-        if self.order_status == 'QUEUED':
-            return True
-        else:
-            return False
+        return self.order_status == 'PENDING_ACTIVATION'
 
     @property
-    def is_accepted(self, refresh_order_info: bool = True) -> bool:
+    def is_pending_cancel(self) -> bool:
 
+        return self.order_status == 'PENDING_CANCEL'
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
+    @property
+    def is_pending_replace(self) -> bool:
 
-        if self.order_status == 'ACCEPTED':
-            return True
-        else:
-            return False
+        return self.order_status == 'PENDING_REPLACE'
 
     @property
-    def is_awaiting_parent_order(self, refresh_order_info: bool = True) -> bool:
+    def is_queued(self) -> bool:
 
+        return self.order_status == 'QUEUED'
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
+    @property
+    def is_accepted(self) -> bool:
 
-        if self.order_status == 'AWAITING_PARENT_ORDER':
-            return True
-        else:
-            return False
+        return self.order_status == 'ACCEPTED'
 
     @property
-    def is_awaiting_condition(self, refresh_order_info: bool = True) -> bool:
+    def is_awaiting_parent_order(self) -> bool:
 
+        return self.order_status == 'AWAITING_PARENT_ORDER'
 
-        if refresh_order_info:
-            self.trade_obj._update_order_status()
+    @property
+    def is_awaiting_condition(self) -> bool:
 
-        if self.order_status == 'AWAITING_CONDITION':
-            return True
-        else:
-            return False
\ No newline at end of file
+        return self.order_status == 'AWAITING_CONDITION'
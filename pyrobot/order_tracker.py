@@ -0,0 +1,280 @@
+import time
+import threading
+
+from datetime import datetime
+from datetime import timedelta
+from typing import List
+from typing import Dict
+from typing import Callable
+
+from td.client import TDClient
+from pyrobot.trades import Trade
+
+
+# Once an order lands in one of these, it doesn't move again.
+TERMINAL_STATES = {'FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'REPLACED'}
+
+# Before an order works the broker can report these in any order, and we only
+# guess QUEUED when we place it.
+WAITING_STATES = {
+    'AWAITING_PARENT_ORDER',
+    'AWAITING_CONDITION',
+    'AWAITING_MANUAL_REVIEW',
+    'ACCEPTED',
+    'PENDING_ACTIVATION',
+    'QUEUED'
+}
+
+# A cancel or replace we asked for, which the broker can still turn down.
+CHANGE_STATES = {'PENDING_CANCEL', 'PENDING_REPLACE', 'AWAITING_UR_OUT'}
+
+# Where each state can go next. Polls can skip states, so every later state is listed.
+TRANSITIONS = {
+    'NOT_PLACED': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'AWAITING_PARENT_ORDER': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'AWAITING_CONDITION': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'AWAITING_MANUAL_REVIEW': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'ACCEPTED': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'PENDING_ACTIVATION': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'QUEUED': WAITING_STATES | {'WORKING'} | CHANGE_STATES | TERMINAL_STATES,
+    'WORKING': CHANGE_STATES | TERMINAL_STATES,
+    'PENDING_CANCEL': {'WORKING', 'AWAITING_UR_OUT'} | TERMINAL_STATES,
+    'PENDING_REPLACE': {'WORKING', 'AWAITING_UR_OUT'} | TERMINAL_STATES,
+    'AWAITING_UR_OUT': {'WORKING'} | TERMINAL_STATES,
+    'FILLED': set(),
+    'CANCELED': set(),
+    'REJECTED': set(),
+    'EXPIRED': set(),
+    'REPLACED': set()
+}
+
+ORDER_STATES = set(TRANSITIONS)
+
+
+class OrderStateMachine():
+
+    def __init__(self, state: str = 'NOT_PLACED') -> None:
+
+        self.state = state
+        self.history = [(state, time.time())]
+
+    @property
+    def is_terminal(self) -> bool:
+
+        return self.state in TERMINAL_STATES
+
+    def can_advance(self, new_state: str) -> bool:
+
+        # A late or repeated poll can't move an order back, or repeat a state.
+        return new_state != self.state and new_state in TRANSITIONS.get(self.state, set())
+
+    def advance(self, new_state: str) -> bool:
+
+        if not self.can_advance(new_state=new_state):
+            return False
+
+        self.state = new_state
+        self.history.append((new_state, time.time()))
+
+        return True
+
+
+class OrderTracker():
+
+    def __init__(self, td_client: TDClient, account: str, poll_interval: float = 1.0) -> None:
+
+        self.td_client = td_client
+        self.account = account
+        self.poll_interval = poll_interval
+
+        self._trades: Dict[str, Trade] = {}
+        self._machines: Dict[str, OrderStateMachine] = {}
+        self._entered: Dict[str, datetime] = {}
+        self._callbacks: List[Callable[[Trade, str, str, str], None]] = []
+
+        self._lock = threading.Lock()
+        self._last_poll = -float('inf')
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread = None
+
+    def track(self, trade: Trade, order_id: str = None, state: str = None) -> None:
+
+        # A trade's child orders (its stop, say) can be tracked under their own ids.
+        if order_id is None:
+            order_id = trade.order_id
+            state = trade.order_status
+
+        if state not in ORDER_STATES:
+            state = 'NOT_PLACED'
+
+        with self._lock:
+            self._trades[str(order_id)] = trade
+            self._machines[str(order_id)] = OrderStateMachine(state=state)
+            self._entered[str(order_id)] = datetime.now()
+
+        trade._order_tracker = self
+
+    def untrack(self, trade: Trade) -> None:
+
+        with self._lock:
+
+            order_ids = [order_id for order_id, tracked in self._trades.items() if tracked is trade]
+
+            for order_id in order_ids:
+                self._trades.pop(order_id, None)
+                self._machines.pop(order_id, None)
+                self._entered.pop(order_id, None)
+
+    def replace(self, old_order_id: str, new_order_id: str) -> bool:
+
+        # A replaced order lives on under the id the broker gave its replacement,
+        # the old one only ever reports REPLACED from here on.
+        with self._lock:
+
+            trade = self._trades.pop(str(old_order_id), None)
+            self._machines.pop(str(old_order_id), None)
+            entered = self._entered.pop(str(old_order_id), None)
+
+            if trade is None:
+                return False
+
+            # The replacement is a new order, it hasn't been reported yet.
+            self._trades[str(new_order_id)] = trade
+            self._machines[str(new_order_id)] = OrderStateMachine()
+            self._entered[str(new_order_id)] = entered
+
+        if str(trade.order_id) == str(old_order_id):
+            trade.order_id = new_order_id
+
+        return True
+
+    def is_tracked(self, order_id: str) -> bool:
+
+        return str(order_id) in self._machines
+
+    def on_transition(self, callback: Callable[[Trade, str, str, str], None]) -> None:
+
+        # Called as callback(trade, old_state, new_state, order_id), the id tells
+        # the trade's own order apart from its tracked children.
+        self._callbacks.append(callback)
+
+    def status(self, trade: Trade) -> str:
+
+        # Cached, reading a status never goes to the broker.
+        machine = self._machines.get(str(trade.order_id), None)
+
+        return machine.state if machine else trade.order_status
+
+    def history(self, trade: Trade) -> List[tuple]:
+
+        machine = self._machines.get(str(trade.order_id), None)
+
+        return list(machine.history) if machine else []
+
+    @property
+    def open_orders(self) -> List[Trade]:
+
+        trades = []
+
+        # A trade with a working child is still open, but only listed once.
+        for order_id, machine in self._machines.items():
+            if not machine.is_terminal and not any(trade is self._trades[order_id] for trade in trades):
+                trades.append(self._trades[order_id])
+
+        return trades
+
+    def poll(self, force: bool = False) -> int:
+
+        now = time.monotonic()
+
+        # At most one request per interval, however many orders or readers there are.
+        if not force and now - self._last_poll < self.poll_interval:
+            return 0
+
+        self._last_poll = now
+
+        with self._lock:
+            open_ids = [order_id for order_id, machine in self._machines.items() if not machine.is_terminal]
+            earliest = min((self._entered[order_id] for order_id in open_ids), default=None)
+
+        if not open_ids:
+            return 0
+
+        # One query for every order on the account since the oldest open one.
+        orders = self.td_client.get_orders_query(
+            account=self.account,
+            from_entered_time=(earliest - timedelta(days=1)).strftime('%Y-%m-%d'),
+            to_entered_time=(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        )
+
+        return self.apply(orders=orders)
+
+    def apply(self, orders: List[dict]) -> int:
+
+        transitions = []
+
+        with self._lock:
+
+            # Child orders of brackets come back nested in their parents.
+            pending = list(orders or [])
+
+            while pending:
+
+                order = pending.pop()
+                pending += order.get('childOrderStrategies', [])
+
+                order_id = str(order.get('orderId', ''))
+                machine = self._machines.get(order_id, None)
+
+                if machine is None:
+                    continue
+
+                old_state = machine.state
+
+                if machine.advance(new_state=order.get('status', old_state)):
+
+                    trade = self._trades[order_id]
+
+                    # A child's status is its own, the trade keeps its entry's.
+                    if order_id == str(trade.order_id):
+                        trade.order_response = order
+                        trade.order_status = machine.state
+
+                    transitions.append((trade, old_state, machine.state, order_id))
+
+        # Callbacks run outside the lock, so they can read or track orders.
+        for trade, old_state, new_state, order_id in transitions:
+            for callback in self._callbacks:
+                callback(trade, old_state, new_state, order_id)
+
+        return len(transitions)
+
+    def start(self) -> None:
+
+        def run() -> None:
+
+            while not self._stop_event.wait(timeout=self.poll_interval):
+
+                # A failed poll is tried again on the next interval.
+                try:
+                    self.poll(force=True)
+                except Exception:
+                    continue
+
+        # Orders can be placed from several threads, only one poller gets started.
+        with self._lock:
+
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=run, name='order-tracker', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+
+        self._stop_event.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
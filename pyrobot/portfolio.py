@@ -1,13 +1,25 @@
 import numpy as np
 
 from pandas import DataFrame
+from datetime import datetime
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 from typing import List
+from typing import Dict
 from typing import Optional
 
 
 from pyrobot.stock_frame import StockFrame
+from pyrobot.candle_cache import CandleCache
+from pyrobot.quote_cache import QuoteCache
+from pyrobot.position_store import PositionStore
+from pyrobot.return_stats import RollingReturnStats
+from pyrobot.risk import MonteCarloRisk
 from td.client import TDClient
+from td.utils import TDUtilities
+
+milliseconds_since_epoch = TDUtilities().milliseconds_since_epoch
 
 
 class Portfolio():
@@ -15,7 +27,7 @@ class Portfolio():
     def __init__(self, account_number: Optional[str] = None) -> None:
 
 
-        self.positions = {}
+        self.positions: PositionStore = PositionStore()
         self.positions_count = 0
 
         self.profit_loss = 0.00
@@ -28,6 +40,20 @@ class Portfolio():
         self._td_client: TDClient = None
         self._stock_frame: StockFrame = None
         self._stock_frame_daily: StockFrame = None
+        self._quote_cache: QuoteCache = None
+        self._return_stats: RollingReturnStats = None
+        self._return_stats_last_date = None
+        self._daily_symbols = set()
+        self._daily_prices_date = None
+        self._daily_last_timestamps: Dict[str, int] = {}
+
+        # How many daily returns the metrics look back over, None for all of them.
+        self.returns_window: int = None
+
+        # Symbols with fewer daily bars than this are left out of the metrics and risk.
+        self.min_history_days: int = 20
+
+        self.candle_cache: CandleCache = None
 
     def add_positions(self, positions: List[dict]) -> dict:
 
@@ -54,19 +80,15 @@ class Portfolio():
     def add_position(self, symbol: str, asset_type: str, purchase_date: Optional[str] = None, quantity: int = 0, purchase_price: float = 0.0) -> dict:
 
 
-        self.positions[symbol] = {}
-        self.positions[symbol]['symbol'] = symbol
-        self.positions[symbol]['quantity'] = quantity
-        self.positions[symbol]['purchase_price'] = purchase_price
-        self.positions[symbol]['purchase_date'] = purchase_date
-        self.positions[symbol]['asset_type'] = asset_type
-
-        if purchase_date:
-            self.positions[symbol]['ownership_status'] = True
-        else:
-            self.positions[symbol]['ownership_status'] = False
-
-        return self.positions[symbol]
+        # Owning it means we know when we bought it.
+        return self.positions.add(
+            symbol=symbol,
+            asset_type=asset_type,
+            quantity=quantity,
+            purchase_price=purchase_price,
+            purchase_date=purchase_date,
+            ownership_status=bool(purchase_date)
+        )
 
     def remove_position(self, symbol: str) -> Tuple[bool, str]:
 
@@ -86,9 +108,21 @@ class Portfolio():
             'furex': []
         }
 
-        if len(self.positions.keys()) > 0:
-            for symbol in self.positions:
-                total_allocation[self.positions[symbol]['asset_type']].append(self.positions[symbol])
+        # The store already knows which rows belong to each asset type.
+        for asset_type, symbols in self.positions.group_by_asset_type().items():
+            total_allocation.setdefault(asset_type, []).extend(
+                dict(self.positions[symbol]) for symbol in symbols
+            )
+
+        return total_allocation
+
+    def total_exposure(self, current_prices: np.ndarray = None) -> dict:
+
+        # Prices lined up with the positions, from the quote cache if not given.
+        if current_prices is None:
+            current_prices = self.quote_cache.prices(instruments=self.positions.symbols)
+
+        return self.positions.exposure_by_asset_type(prices=current_prices)
 
     def portfolio_variance(self, weights: dict, covariance_matrix: DataFrame) -> dict:
 
@@ -106,104 +140,186 @@ class Portfolio():
     def portfolio_metrics(self) -> dict:
 
 
-        if not self._stock_frame_daily:
-            self._grab_daily_historical_prices()
+        # Brings the daily bars up to date, at most once a day.
+        self._grab_daily_historical_prices()
 
         # Calculate the weights.
         porftolio_weights = self.portfolio_weights()
 
-        # Calculate the Daily Returns (%)
-        self._stock_frame_daily.frame['daily_returns_pct'] = self._stock_frame_daily.symbol_groups['close'].transform(
-            lambda x: x.pct_change()
-        )
-
-        # Calculate the Daily Returns (Mean)
-        self._stock_frame_daily.frame['daily_returns_avg'] = self._stock_frame_daily.symbol_groups['daily_returns_pct'].transform(
-            lambda x: x.mean()
-        )
+        # Keep the return statistics up to date with the daily bars.
+        return_stats = self._update_return_stats()
 
-        # Calculate the Daily Returns (Standard Deviation)
-        self._stock_frame_daily.frame['daily_returns_std'] = self._stock_frame_daily.symbol_groups['daily_returns_pct'].transform(
-            lambda x: x.std()
-        )
+        if return_stats is None or not return_stats.symbols:
+            return {}
 
-        # Calculate the Covariance.
-        returns_cov = self._stock_frame_daily.frame.unstack(
-            level=0)['daily_returns_pct'].cov()
+        # A symbol the quotes left out has no weight, so it sits out like a short history.
+        rows = [row for row, symbol in enumerate(return_stats.symbols) if symbol in porftolio_weights]
+        symbols = [return_stats.symbols[row] for row in rows]
 
-        # Take the other columns and get ready to add them to our dictionary.
-        returns_avg = self._stock_frame_daily.symbol_groups['daily_returns_avg'].tail(
-            n=1
-        ).to_dict()
+        if not symbols:
+            return {}
 
-        returns_std = self._stock_frame_daily.symbol_groups['daily_returns_std'].tail(
-            n=1
-        ).to_dict()
+        returns_cov = DataFrame(data=return_stats.covariance[np.ix_(rows, rows)], index=symbols, columns=symbols)
+        returns_avg = dict(zip(symbols, return_stats.mean[rows].tolist()))
+        returns_std = dict(zip(symbols, return_stats.std[rows].tolist()))
 
         metrics_dict = {}
 
         portfolio_variance = self.portfolio_variance(
-            weights=porftolio_weights,
+            weights={symbol: porftolio_weights[symbol] for symbol in symbols},
             covariance_matrix=returns_cov
         )
 
-        for index_tuple in returns_std:
+        for symbol in returns_std:
 
-            symbol = index_tuple[0]
             metrics_dict[symbol] = {}
             metrics_dict[symbol]['weight'] = porftolio_weights[symbol]
-            metrics_dict[symbol]['average_returns'] = returns_avg[index_tuple]
-            metrics_dict[symbol]['weighted_returns'] = returns_avg[index_tuple] * \
+            metrics_dict[symbol]['average_returns'] = returns_avg[symbol]
+            metrics_dict[symbol]['weighted_returns'] = returns_avg[symbol] * \
                 metrics_dict[symbol]['weight']
-            metrics_dict[symbol]['standard_deviation_of_returns'] = returns_std[index_tuple]
-            metrics_dict[symbol]['variance_of_returns'] = returns_std[index_tuple] ** 2
+            metrics_dict[symbol]['standard_deviation_of_returns'] = returns_std[symbol]
+            metrics_dict[symbol]['variance_of_returns'] = returns_std[symbol] ** 2
             metrics_dict[symbol]['covariance_of_returns'] = returns_cov.loc[[
                 symbol]].to_dict()
 
         metrics_dict['portfolio'] = {}
         metrics_dict['portfolio']['variance'] = portfolio_variance
+        metrics_dict['portfolio']['excluded_symbols'] = sorted(set(self.positions) - set(symbols))
 
         return metrics_dict
 
-    def portfolio_weights(self) -> dict:
+    def portfolio_risk(self, confidence_levels: List[float] = (0.95, 0.99), horizons: List[int] = (1, 10),
+                       paths: int = 100000, degrees_of_freedom: float = None) -> dict:
+
+        # Brings the daily bars up to date, at most once a day.
+        self._grab_daily_historical_prices()
+
+        return_stats = self._update_return_stats()
+        symbols = return_stats.symbols if return_stats else []
+
+        # Weights and values lined up with the symbols the statistics cover.
+        current_prices = self.quote_cache.prices(instruments=symbols)
+        valuation = self.position_valuation(symbols=symbols, current_prices=current_prices)
+
+        # Without a price a position can't be valued, so it sits out like a short history.
+        priced = ~np.isnan(valuation['total_market_value'])
+        included = [symbol for symbol, is_priced in zip(symbols, priced) if is_priced]
+        portfolio_value = float(valuation['total_market_value'][priced].sum())
+
+        risk_dict = {
+            'symbols': included,
+            'excluded_symbols': sorted(set(self.positions) - set(included)),
+            'portfolio_value': portfolio_value,
+            'horizons': {}
+        }
+
+        if not included or portfolio_value == 0.0:
+            return risk_dict
+
+        risk_engine = MonteCarloRisk(
+            mean=return_stats.mean[priced],
+            covariance=return_stats.covariance[np.ix_(priced, priced)],
+            paths=paths,
+            degrees_of_freedom=degrees_of_freedom
+        )
+
+        risk_dict['horizons'] = risk_engine.value_at_risk(
+            weights=valuation['total_market_value'][priced] / portfolio_value,
+            confidence_levels=confidence_levels,
+            horizons=horizons,
+            portfolio_value=portfolio_value
+        )
+
+        return risk_dict
+
+    def _update_return_stats(self) -> RollingReturnStats:
+
+        if self._stock_frame_daily is None:
+            return None
+
+        closes = self._stock_frame_daily.frame['close']
+        dates = closes.index.get_level_values(1)
+
+        # A short history would cut every other symbol's returns down to its length.
+        symbols = sorted(
+            symbol for symbol, (start, stop) in self._stock_frame_daily.symbol_slices.items()
+            if stop - start >= self.min_history_days
+        )
+
+        # New symbols, or a new window, means starting over from the full history.
+        if (self._return_stats is None or self._return_stats.symbols != symbols or
+                self._return_stats.window != self.returns_window):
+
+            self._return_stats = RollingReturnStats(symbols=symbols, window=self.returns_window)
+            self._return_stats.seed(closes=closes.unstack(level=0)[symbols].to_numpy())
+            self._return_stats_last_date = dates.max() if len(dates) > 0 else None
+
+            return self._return_stats
+
+        # The refetch starts at the last bar we used, and it may have been revised since.
+        last_closes = closes[dates == self._return_stats_last_date]
+
+        if not last_closes.empty:
+
+            last_row = last_closes.unstack(level=0).reindex(columns=symbols).to_numpy()[0]
+
+            if not np.array_equal(last_row, self._return_stats.last_closes, equal_nan=True):
+                self._return_stats.revise(closes=last_row)
+
+        # Then only the bars after the last one we've seen.
+        new_closes = closes[dates > self._return_stats_last_date]
 
-        weights = {}
+        if not new_closes.empty:
+
+            for row in new_closes.unstack(level=0).reindex(columns=symbols).to_numpy():
+                self._return_stats.update(closes=row)
+
+            self._return_stats_last_date = new_closes.index.get_level_values(1).max()
+
+        return self._return_stats
+
+    def portfolio_weights(self) -> dict:
 
         # First grab all the symbols.
         symbols = self.positions.keys()
 
         # Grab the quotes.
-        quotes = self.td_client.get_quotes(instruments=list(symbols))
+        quotes = self.quote_cache.get_quotes(instruments=list(symbols))
 
         # Grab the projected market value.
-        projected_market_value_dict = self.projected_market_value(
-            current_prices=quotes
+        valuation = self.projected_market_value(
+            current_prices=quotes,
+            as_dict=False
         )
 
-        # Loop through each symbol.
-        for symbol in projected_market_value_dict:
-
-            # Calculate the weights.
-            if symbol != 'total':
-                weights[symbol] = projected_market_value_dict[symbol]['total_market_value'] / \
-                    projected_market_value_dict['total']['total_market_value']
+        # Calculate the weights.
+        weights = dict(zip(
+            valuation['symbols'],
+            (valuation['total_market_value'] / valuation['total']['total_market_value']).tolist()
+        ))
 
         return weights
 
-    def portfolio_summary(self):
+    def portfolio_summary(self, include_risk: bool = True):
 
         # First grab all the symbols.
         symbols = self.positions.keys()
 
         # Grab the quotes.
-        quotes = self.td_client.get_quotes(instruments=list(symbols))
+        quotes = self.quote_cache.get_quotes(instruments=list(symbols))
 
         portfolio_summary_dict = {}
         portfolio_summary_dict['projected_market_value'] = self.projected_market_value(
             current_prices=quotes
         )
         portfolio_summary_dict['portfolio_weights'] = self.portfolio_weights()
-        portfolio_summary_dict['portfolio_risk'] = ""
+
+        # The risk needs the daily history and a simulation, callers that only
+        # want the weights can skip it.
+        if include_risk:
+            portfolio_summary_dict['portfolio_risk'] = self.portfolio_risk()
+        else:
+            portfolio_summary_dict['portfolio_risk'] = ""
 
         return portfolio_summary_dict
 
@@ -247,66 +363,84 @@ class Portfolio():
         elif (purchase_price > current_price):
             return False
 
-    def projected_market_value(self, current_prices: dict) -> dict:
-
-
-        projected_value = {}
-        total_value = 0.0
-        total_invested_capital = 0.0
-        total_profit_or_loss = 0.0
+    def position_valuation(self, symbols: List[str], current_prices: np.ndarray) -> dict:
+
+        # Line the positions up with the prices, one slot per symbol.
+        rows = self.positions.rows(symbols=symbols)
+        quantity = self.positions.quantity[rows]
+        purchase_price = self.positions.purchase_price[rows]
+        current_price = np.asarray(current_prices, dtype='float64')
+
+        profit_or_loss = (current_price - purchase_price) * quantity
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_or_loss_percent = (current_price - purchase_price) / purchase_price
+
+        valuation = {
+            'symbols': list(symbols),
+            'purchase_price': purchase_price,
+            'current_price': current_price,
+            'quantity': quantity,
+            'is_profitable': purchase_price <= current_price,
+            'total_market_value': current_price * quantity,
+            'total_invested_capital': quantity * purchase_price,
+            'total_loss_or_gain_$': profit_or_loss,
+            'total_loss_or_gain_%': profit_or_loss_percent
+        }
 
-        position_count_profitable = 0
-        position_count_not_profitable = 0
-        position_count_break_even = 0
+        number_of_profitable_positions = int(np.count_nonzero(profit_or_loss > 0))
+        number_of_non_profitable_positions = int(np.count_nonzero(profit_or_loss < 0))
+
+        valuation['total'] = {
+            'total_positions': len(self.positions),
+            'total_market_value': float(valuation['total_market_value'].sum()),
+            'total_invested_capital': float(valuation['total_invested_capital'].sum()),
+            'total_profit_or_loss': float(profit_or_loss.sum()),
+            'number_of_profitable_positions': number_of_profitable_positions,
+            'number_of_non_profitable_positions': number_of_non_profitable_positions,
+            'number_of_breakeven_positions': (
+                len(valuation['symbols']) - number_of_profitable_positions - number_of_non_profitable_positions
+            )
+        }
 
-        for symbol in current_prices:
+        return valuation
 
-            if self.in_portfolio(symbol=symbol):
+    def projected_market_value(self, current_prices: dict, as_dict: bool = True) -> dict:
 
-                projected_value[symbol] = {}
-                current_quantity = self.positions[symbol]['quantity']
-                purchase_price = self.positions[symbol]['purchase_price']
-                current_price = current_prices[symbol]['lastPrice']
-                is_profitable = self.is_profitable(
-                    symbol=symbol, current_price=current_price)
 
-                projected_value[symbol]['purchase_price'] = purchase_price
-                projected_value[symbol]['current_price'] = current_prices[symbol]['lastPrice']
-                projected_value[symbol]['quantity'] = current_quantity
-                projected_value[symbol]['is_profitable'] = is_profitable
+        # Only the quotes for symbols we hold, in the order they came in.
+        symbols = [symbol for symbol in current_prices if self.in_portfolio(symbol=symbol)]
 
-                # Calculate total market value.
-                projected_value[symbol]['total_market_value'] = (
-                    current_price * current_quantity
-                )
+        valuation = self.position_valuation(
+            symbols=symbols,
+            current_prices=[current_prices[symbol]['lastPrice'] for symbol in symbols]
+        )
 
-                # Calculate total invested capital.
-                projected_value[symbol]['total_invested_capital'] = (
-                    current_quantity * purchase_price
-                )
+        if not as_dict:
+            return valuation
+
+        # The per symbol view, built from the arrays.
+        columns = [
+            'purchase_price',
+            'current_price',
+            'quantity',
+            'is_profitable',
+            'total_market_value',
+            'total_invested_capital',
+            'total_loss_or_gain_$',
+            'total_loss_or_gain_%'
+        ]
+        values = {column: valuation[column].tolist() for column in columns}
+        values['total_loss_or_gain_%'] = [round(percent, 4) for percent in values['total_loss_or_gain_%']]
+
+        projected_value = {
+            symbol: {
+                column: values[column][position] for column in columns
+            }
+            for position, symbol in enumerate(symbols)
+        }
 
-                projected_value[symbol]['total_loss_or_gain_$'] = ((current_price - purchase_price) * current_quantity)
-                projected_value[symbol]['total_loss_or_gain_%'] = round(((current_price - purchase_price) / purchase_price), 4)
-
-                total_value += projected_value[symbol]['total_market_value']
-                total_profit_or_loss += projected_value[symbol]['total_loss_or_gain_$']
-                total_invested_capital += projected_value[symbol]['total_invested_capital']
-
-                if projected_value[symbol]['total_loss_or_gain_$'] > 0:
-                    position_count_profitable += 1
-                elif projected_value[symbol]['total_loss_or_gain_$'] < 0:
-                    position_count_not_profitable += 1
-                else:
-                    position_count_break_even += 1
-
-        projected_value['total'] = {}
-        projected_value['total']['total_positions'] = len(self.positions)
-        projected_value['total']['total_market_value'] = total_value
-        projected_value['total']['total_invested_capital'] = total_invested_capital
-        projected_value['total']['total_profit_or_loss'] = total_profit_or_loss
-        projected_value['total']['number_of_profitable_positions'] = position_count_profitable
-        projected_value['total']['number_of_non_profitable_positions'] = position_count_not_profitable
-        projected_value['total']['number_of_breakeven_positions'] = position_count_break_even
+        projected_value['total'] = valuation['total']
 
         return projected_value
 
@@ -343,25 +477,92 @@ class Portfolio():
 
         self._td_client: TDClient = td_client
 
-    def _grab_daily_historical_prices(self) -> StockFrame:
+    @property
+    def quote_cache(self) -> QuoteCache:
+
+        # Fall back to a cache of our own if we weren't handed a shared one.
+        if self._quote_cache is None:
+            self._quote_cache = QuoteCache(td_client=self.td_client)
+
+        return self._quote_cache
+
+    @quote_cache.setter
+    def quote_cache(self, quote_cache: QuoteCache) -> None:
+
+        self._quote_cache: QuoteCache = quote_cache
+
+    def _grab_daily_historical_prices(self, max_workers: int = 8) -> StockFrame:
+
+        symbols = list(self.positions)
+        today = datetime.today()
+
+        # Dropped positions mean starting over, otherwise we add to what we have.
+        if self._stock_frame_daily and not self._daily_symbols <= set(symbols):
+            self._stock_frame_daily = None
+
+        # Already brought up to date today.
+        if (self._stock_frame_daily and self._daily_prices_date == today.date() and
+                set(symbols) <= self._daily_symbols):
+            return self._stock_frame_daily
+
+        # With a cache, ask for the same year as explicit dates so only the new days are fetched.
+        end = milliseconds_since_epoch(dt_object=today)
+        start = milliseconds_since_epoch(dt_object=today - timedelta(days=365))
+
+        def grab_symbol(symbol: str) -> List[dict]:
+
+            # Symbols we already hold only need the days since their last bar.
+            last_timestamp = self._daily_last_timestamps.get(symbol, None) if self._stock_frame_daily else None
+
+            if self.candle_cache:
+                return self.candle_cache.grab(
+                    td_client=self.td_client,
+                    symbol=symbol,
+                    period_type='year',
+                    bar_size=1,
+                    bar_type='daily',
+                    start=last_timestamp or start,
+                    end=end
+                )
+
+            if last_timestamp:
+                historical_prices_response = self.td_client.get_price_history(
+                    symbol=symbol,
+                    period_type='year',
+                    start_date=str(last_timestamp),
+                    end_date=str(end),
+                    frequency_type='daily',
+                    frequency=1,
+                    extended_hours=True
+                )
+            else:
+                historical_prices_response = self.td_client.get_price_history(
+                    symbol=symbol,
+                    period_type='year',
+                    period=1,
+                    frequency_type='daily',
+                    frequency=1,
+                    extended_hours=True
+                )
+
+            return historical_prices_response['candles']
+
+        # Fetch the positions concurrently, the client keeps us under the rate limit.
+        if max_workers > 1 and len(symbols) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                responses = list(executor.map(grab_symbol, symbols))
+        else:
+            responses = [grab_symbol(symbol) for symbol in symbols]
 
         new_prices = []
 
-        # Loop through each position.
-        for symbol in self.positions:
-
-            # Grab the historical prices.
-            historical_prices_response = self.td_client.get_price_history(
-                symbol=symbol,
-                period_type='year',
-                period=1,
-                frequency_type='daily',
-                frequency=1,
-                extended_hours=True
-            )
+        for symbol, candles in zip(symbols, responses):
+
+            if candles:
+                self._daily_last_timestamps[symbol] = max(candle['datetime'] for candle in candles)
 
             # Loop through the chandles.
-            for candle in historical_prices_response['candles']:
+            for candle in candles:
 
                 new_price_mini_dict = {}
                 new_price_mini_dict['symbol'] = symbol
@@ -373,8 +574,14 @@ class Portfolio():
                 new_price_mini_dict['datetime'] = candle['datetime']
                 new_prices.append(new_price_mini_dict)
 
-        # Create and set the StockFrame
-        self._stock_frame_daily = StockFrame(data=new_prices)
-        self._stock_frame_daily.create_frame()
+        # Add the new days to the frame we have, or create and set the StockFrame.
+        # With no history at all there's no frame to build.
+        if self._stock_frame_daily:
+            self._stock_frame_daily.add_rows(data=new_prices)
+        elif new_prices:
+            self._stock_frame_daily = StockFrame(data=new_prices)
+
+        self._daily_symbols = set(symbols)
+        self._daily_prices_date = today.date()
 
-        return self._stock_frame_daily
\ No newline at end of file
+        return self._stock_frame_daily
@@ -0,0 +1,245 @@
+import numpy as np
+
+from collections.abc import MutableMapping
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+
+
+class Position(MutableMapping):
+
+    # A live view of one row, so `positions[symbol]['quantity'] = 10` still works.
+    fields = ['symbol', 'quantity', 'purchase_price', 'purchase_date', 'asset_type', 'ownership_status']
+
+    def __init__(self, store: 'PositionStore', symbol: str) -> None:
+
+        self._store = store
+        self._symbol = symbol
+
+    def __getitem__(self, key: str) -> Any:
+
+        return self._store.get_field(symbol=self._symbol, field=key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+
+        self._store.set_field(symbol=self._symbol, field=key, value=value)
+
+    def __delitem__(self, key: str) -> None:
+
+        raise TypeError("Position fields can't be removed.")
+
+    def __iter__(self) -> Iterator[str]:
+
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+
+        return len(self.fields)
+
+    def __repr__(self) -> str:
+
+        return repr(dict(self))
+
+
+class PositionStore(MutableMapping):
+
+    def __init__(self, capacity: int = 64) -> None:
+
+        self.index: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.purchase_dates: List[Optional[str]] = []
+
+        # Asset types are stored as small codes, grouped with a bincount.
+        self.asset_types: List[str] = []
+        self._asset_type_codes: Dict[str, int] = {}
+
+        self._capacity = max(1, capacity)
+        self._quantity = np.zeros(shape=self._capacity, dtype='int64')
+        self._purchase_price = np.zeros(shape=self._capacity, dtype='float64')
+        self._ownership_status = np.zeros(shape=self._capacity, dtype=bool)
+        self._asset_type = np.zeros(shape=self._capacity, dtype='int16')
+
+    @property
+    def quantity(self) -> np.ndarray:
+
+        return self._quantity[:len(self.symbols)]
+
+    @property
+    def purchase_price(self) -> np.ndarray:
+
+        return self._purchase_price[:len(self.symbols)]
+
+    @property
+    def ownership_status(self) -> np.ndarray:
+
+        return self._ownership_status[:len(self.symbols)]
+
+    @property
+    def asset_type(self) -> np.ndarray:
+
+        return self._asset_type[:len(self.symbols)]
+
+    def __getitem__(self, symbol: str) -> Position:
+
+        if symbol not in self.index:
+            raise KeyError(symbol)
+
+        return Position(store=self, symbol=symbol)
+
+    def __setitem__(self, symbol: str, position: dict) -> None:
+
+        self.add(
+            symbol=symbol,
+            asset_type=position.get('asset_type', None),
+            quantity=position.get('quantity', 0),
+            purchase_price=position.get('purchase_price', 0.0),
+            purchase_date=position.get('purchase_date', None),
+            ownership_status=position.get('ownership_status', bool(position.get('purchase_date', None)))
+        )
+
+    def __delitem__(self, symbol: str) -> None:
+
+        row = self.index.pop(symbol)
+        last = len(self.symbols) - 1
+
+        # Move the last row into the gap, so a removal doesn't shift every row after it.
+        if row != last:
+
+            for column in [self._quantity, self._purchase_price, self._ownership_status, self._asset_type]:
+                column[row] = column[last]
+
+            self.symbols[row] = self.symbols[last]
+            self.purchase_dates[row] = self.purchase_dates[last]
+            self.index[self.symbols[row]] = row
+
+        self.symbols.pop()
+        self.purchase_dates.pop()
+
+    def __iter__(self) -> Iterator[str]:
+
+        return iter(list(self.symbols))
+
+    def __len__(self) -> int:
+
+        return len(self.symbols)
+
+    def __contains__(self, symbol: object) -> bool:
+
+        return symbol in self.index
+
+    def __repr__(self) -> str:
+
+        return repr({symbol: dict(self[symbol]) for symbol in self.symbols})
+
+    def _grow(self) -> None:
+
+        self._capacity *= 2
+
+        for name in ['_quantity', '_purchase_price', '_ownership_status', '_asset_type']:
+            old = getattr(self, name)
+            new = np.zeros(shape=self._capacity, dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+    def _asset_type_code(self, asset_type: str) -> int:
+
+        if asset_type not in self._asset_type_codes:
+            self._asset_type_codes[asset_type] = len(self.asset_types)
+            self.asset_types.append(asset_type)
+
+        return self._asset_type_codes[asset_type]
+
+    def add(self, symbol: str, asset_type: str, quantity: int = 0, purchase_price: float = 0.0,
+            purchase_date: Optional[str] = None, ownership_status: bool = False) -> Position:
+
+        # Adding an existing symbol overwrites its row in place.
+        if symbol in self.index:
+            row = self.index[symbol]
+            self.purchase_dates[row] = purchase_date
+
+        else:
+
+            if len(self.symbols) == self._capacity:
+                self._grow()
+
+            row = len(self.symbols)
+            self.index[symbol] = row
+            self.symbols.append(symbol)
+            self.purchase_dates.append(purchase_date)
+
+        self._quantity[row] = quantity
+        self._purchase_price[row] = purchase_price
+        self._ownership_status[row] = ownership_status
+        self._asset_type[row] = self._asset_type_code(asset_type=asset_type)
+
+        return Position(store=self, symbol=symbol)
+
+    def get_field(self, symbol: str, field: str) -> Any:
+
+        row = self.index[symbol]
+
+        if field == 'symbol':
+            return symbol
+        elif field == 'quantity':
+            return int(self._quantity[row])
+        elif field == 'purchase_price':
+            return float(self._purchase_price[row])
+        elif field == 'purchase_date':
+            return self.purchase_dates[row]
+        elif field == 'asset_type':
+            return self.asset_types[self._asset_type[row]]
+        elif field == 'ownership_status':
+            return bool(self._ownership_status[row])
+
+        raise KeyError(field)
+
+    def set_field(self, symbol: str, field: str, value: Any) -> None:
+
+        row = self.index[symbol]
+
+        if field == 'quantity':
+            self._quantity[row] = value
+        elif field == 'purchase_price':
+            self._purchase_price[row] = value
+        elif field == 'purchase_date':
+            self.purchase_dates[row] = value
+        elif field == 'asset_type':
+            self._asset_type[row] = self._asset_type_code(asset_type=value)
+        elif field == 'ownership_status':
+            self._ownership_status[row] = value
+        else:
+            raise KeyError(field)
+
+    def rows(self, symbols: List[str]) -> np.ndarray:
+
+        return np.array([self.index[symbol] for symbol in symbols], dtype='int64')
+
+    def market_value(self, prices: np.ndarray) -> np.ndarray:
+
+        # Prices lined up with the rows.
+        return self.quantity * np.asarray(prices, dtype='float64')
+
+    def exposure_by_asset_type(self, prices: np.ndarray) -> Dict[str, float]:
+
+        totals = np.bincount(
+            self.asset_type,
+            weights=self.market_value(prices=prices),
+            minlength=len(self.asset_types)
+        )
+
+        return dict(zip(self.asset_types, totals.tolist()))
+
+    def group_by_asset_type(self) -> Dict[str, List[str]]:
+
+        groups = {asset_type: [] for asset_type in self.asset_types}
+
+        # Stable sort keeps the row order within each type.
+        order = np.argsort(self.asset_type, kind='mergesort')
+        codes = self.asset_type[order]
+
+        for row, code in zip(order.tolist(), codes.tolist()):
+            groups[self.asset_types[code]].append(self.symbols[row])
+
+        return groups
@@ -0,0 +1,83 @@
+import time
+import threading
+import numpy as np
+
+from typing import List
+from typing import Dict
+
+from td.client import TDClient
+from pyrobot.quote_table import QuoteTable
+
+
+class QuoteCache():
+
+    def __init__(self, td_client: TDClient, ttl: float = 2.0) -> None:
+
+        self.td_client = td_client
+        self.ttl = ttl
+
+        # The numbers live in the table, the full responses stay around for dict readers.
+        self.table: QuoteTable = QuoteTable()
+        self._quotes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, instruments: List[str]) -> np.ndarray:
+
+        instruments = list(instruments)
+
+        with self._lock:
+
+            slots = self.table.slots_for(symbols=instruments)
+
+            now = time.monotonic()
+            fetched_at = self.table.column(column='fetched_at')
+            is_stale = fetched_at <= now - self.ttl
+
+            # Only go to the broker if something we were asked for is out of date,
+            # and while we're there, refresh everything else that went stale too.
+            if is_stale[slots].any():
+
+                stale_slots = np.flatnonzero(is_stale)
+                stale = [self.table.symbols[slot] for slot in stale_slots]
+                quotes = self.td_client.get_quotes(instruments=stale)
+                quotes = {symbol: quotes[symbol] for symbol in stale if symbol in quotes}
+
+                self.table.update(quotes=quotes, fetched_at=now)
+                self._quotes.update(quotes)
+
+                # Symbols the broker didn't know wait out the TTL too, instead of riding every request.
+                self.table.fetched_at[stale_slots] = now
+
+            return slots
+
+    def get_quotes(self, instruments: List[str]) -> Dict[str, dict]:
+
+        instruments = list(instruments)
+        self.refresh(instruments=instruments)
+
+        return {
+            symbol: self._quotes[symbol]
+            for symbol in instruments if symbol in self._quotes
+        }
+
+    def prices(self, instruments: List[str], column: str = 'last') -> np.ndarray:
+
+        slots = self.refresh(instruments=instruments)
+
+        return getattr(self.table, column)[slots]
+
+    def last_price(self, symbol: str) -> float:
+
+        return self.get_quotes(instruments=[symbol])[symbol]['lastPrice']
+
+    def invalidate(self, symbols: List[str] = None) -> None:
+
+        with self._lock:
+
+            # Still tracked, just refreshed on the next read.
+            if symbols is None:
+                self.table.fetched_at[:] = -np.inf
+            else:
+                for symbol in symbols:
+                    if symbol in self.table:
+                        self.table.fetched_at[self.table.slots[symbol]] = -np.inf
@@ -0,0 +1,104 @@
+import numpy as np
+
+from typing import List
+from typing import Dict
+
+
+class QuoteTable():
+
+    # Our column, and the field it comes from in a quote response.
+    fields = {
+        'last': 'lastPrice',
+        'bid': 'bidPrice',
+        'ask': 'askPrice',
+        'volume': 'totalVolume',
+        'timestamp': 'quoteTimeInLong'
+    }
+
+    def __init__(self, capacity: int = 64) -> None:
+
+        self.slots: Dict[str, int] = {}
+        self.symbols: List[str] = []
+
+        self._capacity = max(1, capacity)
+        self.last = np.full(shape=self._capacity, fill_value=np.nan)
+        self.bid = np.full(shape=self._capacity, fill_value=np.nan)
+        self.ask = np.full(shape=self._capacity, fill_value=np.nan)
+        self.volume = np.full(shape=self._capacity, fill_value=np.nan)
+        self.timestamp = np.zeros(shape=self._capacity, dtype='int64')
+
+        # When we last heard about each slot, on the monotonic clock.
+        self.fetched_at = np.full(shape=self._capacity, fill_value=-np.inf)
+
+    def __len__(self) -> int:
+
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+
+        return symbol in self.slots
+
+    def _grow(self) -> None:
+
+        # Double the arrays, existing slots keep their place.
+        self._capacity *= 2
+
+        for column in list(self.fields) + ['fetched_at']:
+
+            old = getattr(self, column)
+            new = np.full(
+                shape=self._capacity,
+                fill_value=-np.inf if column == 'fetched_at' else 0 if column == 'timestamp' else np.nan,
+                dtype=old.dtype
+            )
+            new[:old.shape[0]] = old
+            setattr(self, column, new)
+
+    def slot(self, symbol: str) -> int:
+
+        if symbol not in self.slots:
+
+            if len(self.symbols) == self._capacity:
+                self._grow()
+
+            self.slots[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+        return self.slots[symbol]
+
+    def slots_for(self, symbols: List[str]) -> np.ndarray:
+
+        return np.array([self.slot(symbol) for symbol in symbols], dtype='int64')
+
+    def update(self, quotes: Dict[str, dict], fetched_at: float) -> np.ndarray:
+
+        symbols = list(quotes)
+        slots = self.slots_for(symbols=symbols)
+
+        # Write each column in one go, fields a quote doesn't carry become NaN.
+        for column, field in self.fields.items():
+
+            if column == 'timestamp':
+                values = [quotes[symbol].get(field, 0) or 0 for symbol in symbols]
+            else:
+                values = [quotes[symbol].get(field, np.nan) for symbol in symbols]
+
+            getattr(self, column)[slots] = np.array(values, dtype=getattr(self, column).dtype)
+
+        self.fetched_at[slots] = fetched_at
+
+        return slots
+
+    def column(self, column: str, symbols: List[str] = None) -> np.ndarray:
+
+        if symbols is None:
+            return getattr(self, column)[:len(self.symbols)]
+
+        # Slots first, a new symbol may grow the arrays.
+        slots = self.slots_for(symbols=symbols)
+
+        return getattr(self, column)[slots]
+
+    def mid(self, symbols: List[str] = None) -> np.ndarray:
+
+        return (self.column(column='bid', symbols=symbols) + self.column(column='ask', symbols=symbols)) / 2.0
@@ -0,0 +1,210 @@
+import time
+import random
+import itertools
+import threading
+
+from typing import Any
+from typing import Dict
+from typing import Tuple
+from typing import Callable
+
+from td.client import TDClient
+from td.exceptions import ExdLmtError
+from td.exceptions import ServerError
+
+
+class TokenBucket():
+
+    def __init__(self, rate: float, capacity: float) -> None:
+
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def refill(self, now: float) -> None:
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+
+        if self.tokens >= tokens:
+            return 0.0
+
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens: float = 1.0) -> None:
+
+        self.tokens -= tokens
+
+
+class RequestScheduler():
+
+    # Lower runs first, orders jump ahead of everything else.
+    default_priorities = {
+        'place_order': 0,
+        'cancel_order': 0,
+        'modify_order': 0,
+        'get_orders': 1,
+        'get_orders_query': 1,
+        'get_quotes': 1,
+        'get_accounts': 1,
+        'get_price_history': 2
+    }
+
+    # Retrying these could send the same order twice.
+    no_retry = {'place_order', 'modify_order'}
+
+    # Throttling, server errors, and connection errors and timeouts (requests'
+    # are OSErrors too). Anything else fails the same way the next time.
+    retry_on = (ExdLmtError, ServerError, OSError)
+
+    def __init__(self, td_client: TDClient, rate: float = 2.0, capacity: float = 20.0,
+                 endpoint_budgets: Dict[str, Tuple[float, float]] = None, max_retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0) -> None:
+
+        self.td_client = td_client
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.priorities = dict(self.default_priorities)
+
+        # One bucket shared by every call, plus optional ones per endpoint.
+        self._bucket = TokenBucket(rate=rate, capacity=capacity)
+        self._endpoint_buckets = {
+            endpoint: TokenBucket(rate=endpoint_rate, capacity=endpoint_capacity)
+            for endpoint, (endpoint_rate, endpoint_capacity) in (endpoint_budgets or {}).items()
+        }
+
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._tickets = itertools.count()
+
+    def __getattr__(self, name: str) -> Any:
+
+        if name == 'td_client':
+            raise AttributeError(name)
+
+        attribute = getattr(self.td_client, name)
+
+        # Anything callable on the client goes through the scheduler.
+        if not callable(attribute):
+            return attribute
+
+        def scheduled_call(*args, **kwargs) -> Any:
+            return self.call(name, *args, **kwargs)
+
+        return scheduled_call
+
+    def set_endpoint_budget(self, endpoint: str, rate: float, capacity: float) -> None:
+
+        with self._condition:
+            self._endpoint_buckets[endpoint] = TokenBucket(rate=rate, capacity=capacity)
+
+    def endpoint_rate(self, endpoint: str) -> float:
+
+        # The sustained requests per second an endpoint gets, the shared rate or its own budget.
+        with self._condition:
+            bucket = self._endpoint_buckets.get(endpoint, None)
+
+            return min(self._bucket.rate, bucket.rate) if bucket else self._bucket.rate
+
+    def call(self, endpoint: str, *args, priority: int = None, on_acquire: Callable[[], None] = None,
+             **kwargs) -> Any:
+
+        if priority is None:
+            priority = self.priorities.get(endpoint, 1)
+
+        function: Callable = getattr(self.td_client, endpoint)
+        max_retries = 0 if endpoint in self.no_retry else self.max_retries
+
+        for attempt in range(max_retries + 1):
+
+            self._acquire(endpoint=endpoint, priority=priority)
+
+            # The request goes out now, whatever time came before was spent waiting on the rate.
+            if on_acquire is not None:
+                on_acquire()
+
+            try:
+                return function(*args, **kwargs)
+
+            except self.retry_on:
+
+                if attempt == max_retries:
+                    raise
+
+                # Full jitter, so throttled callers don't all come back at once.
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def _acquire(self, endpoint: str, priority: int) -> None:
+
+        with self._condition:
+
+            ticket = (priority, next(self._tickets), endpoint)
+            self._waiting.append(ticket)
+
+            try:
+
+                while True:
+
+                    timeout = None
+
+                    # A more urgent caller goes first, unless its own endpoint is out of
+                    # tokens. Then it can't use the shared ones, so it doesn't hold us up.
+                    now = time.monotonic()
+                    blocked = any(
+                        waiting < ticket and self._endpoint_ready(endpoint=waiting[2], now=now)
+                        for waiting in self._waiting
+                    )
+
+                    if not blocked:
+
+                        timeout = self._reserve(endpoint=endpoint)
+
+                        if timeout == 0.0:
+                            self._waiting.remove(ticket)
+                            self._condition.notify_all()
+                            return
+
+                    self._condition.wait(timeout=timeout)
+
+            except BaseException:
+
+                # Don't leave a dead ticket blocking the lane.
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._condition.notify_all()
+
+                raise
+
+    def _endpoint_ready(self, endpoint: str, now: float) -> bool:
+
+        bucket = self._endpoint_buckets.get(endpoint, None)
+
+        if bucket is None:
+            return True
+
+        bucket.refill(now=now)
+
+        return bucket.wait_time() == 0.0
+
+    def _reserve(self, endpoint: str) -> float:
+
+        now = time.monotonic()
+        buckets = [self._bucket]
+
+        if endpoint in self._endpoint_buckets:
+            buckets.append(self._endpoint_buckets[endpoint])
+
+        for bucket in buckets:
+            bucket.refill(now=now)
+
+        wait = max(bucket.wait_time() for bucket in buckets)
+
+        if wait == 0.0:
+            for bucket in buckets:
+                bucket.consume()
+
+        return wait
@@ -0,0 +1,156 @@
+import numpy as np
+
+from collections import deque
+from typing import List
+
+
+class RollingReturnStats():
+
+    def __init__(self, symbols: List[str], window: int = None) -> None:
+
+        self.symbols = list(symbols)
+        self.window = window
+
+        size = len(self.symbols)
+
+        # Welford state: running mean and the sum of co-moments.
+        self.count = 0
+        self._mean = np.zeros(shape=size)
+        self._comoment = np.zeros(shape=(size, size))
+
+        # The returns still in the window, so they can be taken back out.
+        self._returns = deque()
+        self._last_closes = None
+        self._previous_closes = None
+        self._last_added = False
+        self._last_evicted = None
+
+    @property
+    def mean(self) -> np.ndarray:
+
+        if self.count == 0:
+            return np.full(shape=len(self.symbols), fill_value=np.nan)
+
+        return self._mean.copy()
+
+    @property
+    def covariance(self) -> np.ndarray:
+
+        # Sample covariance, same as pandas.
+        if self.count < 2:
+            return np.full(shape=self._comoment.shape, fill_value=np.nan)
+
+        return self._comoment / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+
+        return np.sqrt(np.diag(self.covariance))
+
+    @property
+    def last_closes(self) -> np.ndarray:
+
+        return None if self._last_closes is None else self._last_closes.copy()
+
+    def seed(self, closes: np.ndarray) -> None:
+
+        # Bars by symbols, oldest first.
+        closes = np.asarray(closes, dtype='float64')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = closes[1:] / closes[:-1] - 1.0
+
+        # Rows with a gap in them are skipped, every symbol has to have a return.
+        has_gap = np.isnan(returns).any(axis=1)
+        returns = returns[~has_gap]
+
+        # What revise() needs to take the newest bar back out.
+        self._last_added = bool(has_gap.shape[0] > 0 and not has_gap[-1])
+        self._last_evicted = None
+
+        if self.window and returns.shape[0] > self.window:
+            if self._last_added:
+                self._last_evicted = returns[-self.window - 1].copy()
+            returns = returns[-self.window:]
+
+        self._returns = deque(returns)
+        self.count = returns.shape[0]
+
+        if self.count > 0:
+            self._mean = returns.mean(axis=0)
+            centered = returns - self._mean
+            self._comoment = centered.T @ centered
+        else:
+            self._mean = np.zeros(shape=len(self.symbols))
+            self._comoment = np.zeros(shape=(len(self.symbols), len(self.symbols)))
+
+        self._last_closes = closes[-1].copy() if closes.shape[0] > 0 else None
+        self._previous_closes = closes[-2].copy() if closes.shape[0] > 1 else None
+
+    def update(self, closes: np.ndarray) -> None:
+
+        # One new bar of closes, lined up with the symbols.
+        closes = np.asarray(closes, dtype='float64')
+
+        self._previous_closes = self._last_closes
+        self._last_closes = closes.copy()
+        self._last_added = False
+        self._last_evicted = None
+
+        if self._previous_closes is None:
+            return
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = closes / self._previous_closes - 1.0
+
+        if np.isnan(returns).any():
+            return
+
+        self._returns.append(returns)
+        self._add(returns=returns)
+        self._last_added = True
+
+        # Past the window, the oldest return drops out.
+        if self.window and self.count > self.window:
+            self._last_evicted = self._returns.popleft()
+            self._remove(returns=self._last_evicted)
+
+    def revise(self, closes: np.ndarray) -> None:
+
+        # The newest bar changed after we used it: take its return back out,
+        # put back whatever it pushed out of the window, and apply it again.
+        if self._last_closes is None:
+            return
+
+        if self._last_added:
+
+            self._remove(returns=self._returns.pop())
+
+            if self._last_evicted is not None:
+                self._returns.appendleft(self._last_evicted)
+                self._add(returns=self._last_evicted)
+
+        self._last_closes = self._previous_closes
+        self.update(closes=closes)
+
+    def _add(self, returns: np.ndarray) -> None:
+
+        self.count += 1
+
+        # Written as outer(delta, delta) so the matrix stays exactly symmetric.
+        delta = returns - self._mean
+        self._mean += delta / self.count
+        self._comoment += np.outer(delta, delta) * ((self.count - 1) / self.count)
+
+    def _remove(self, returns: np.ndarray) -> None:
+
+        self.count -= 1
+
+        if self.count == 0:
+            self._mean[:] = 0.0
+            self._comoment[:] = 0.0
+            return
+
+        delta = returns - self._mean
+        self._mean -= delta / self.count
+        self._comoment -= np.outer(delta, delta) * ((self.count + 1) / self.count)
@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+
+from typing import List
+from typing import Dict
+from typing import Tuple
+
+from pyrobot.stock_frame import StockFrame
+
+
+class RingBuffer():
+
+    def __init__(self, capacity: int, columns: List[str]) -> None:
+
+        if capacity < 1:
+            raise ValueError('The capacity of a RingBuffer must be at least 1.')
+
+        self.capacity = capacity
+        self.columns = columns
+
+        # One timestamp array (milliseconds) and one row per value column.
+        self._datetime = np.zeros(shape=capacity, dtype='int64')
+        self._values = np.zeros(shape=(len(columns), capacity), dtype='float64')
+
+        # Physical position of the oldest bar and the number of bars stored.
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+
+        return self._size
+
+    @property
+    def is_full(self) -> bool:
+
+        return self._size == self.capacity
+
+    @property
+    def last_timestamp(self) -> int:
+
+        if self._size == 0:
+            raise IndexError('The RingBuffer is empty.')
+
+        return int(self._datetime[self._physical_position(n=1)])
+
+    def _physical_position(self, n: int) -> int:
+
+        # Translate "n bars ago" (1 is the current bar) into a slot.
+        if n < 1 or n > self._size:
+            raise IndexError(
+                "Can't grab bar {n}, the buffer only holds {size} bars.".format(n=n, size=self._size)
+            )
+
+        return (self._head + self._size - n) % self.capacity
+
+    def _ordered_positions(self) -> np.ndarray:
+
+        return (self._head + np.arange(self._size)) % self.capacity
+
+    def append(self, timestamp: int, values: List[float]) -> None:
+
+        if self._size > 0:
+
+            last_timestamp = self.last_timestamp
+
+            # Same bar again, update it in place.
+            if timestamp == last_timestamp:
+                self._values[:, self._physical_position(n=1)] = values
+                return
+
+            # An older bar, take the slow path.
+            elif timestamp < last_timestamp:
+                self._insert(timestamp=timestamp, values=values)
+                return
+
+        # Write to the slot after the newest bar.
+        position = (self._head + self._size) % self.capacity
+        self._datetime[position] = timestamp
+        self._values[:, position] = values
+
+        # Once full, the oldest bar gets overwritten.
+        if self.is_full:
+            self._head = (self._head + 1) % self.capacity
+        else:
+            self._size += 1
+
+    def _insert(self, timestamp: int, values: List[float]) -> None:
+
+        datetimes, columns = self.ordered()
+        location = np.searchsorted(datetimes, timestamp)
+
+        # The bar already exists, so update it.
+        if location < self._size and datetimes[location] == timestamp:
+            self._values[:, self._ordered_positions()[location]] = values
+            return
+
+        # Older than anything we can hold, drop it.
+        if self.is_full and location == 0:
+            return
+
+        datetimes = np.insert(datetimes, location, timestamp)
+        columns = np.insert(columns, location, values, axis=1)
+
+        # Keep the newest bars and lay them out from the start again.
+        datetimes = datetimes[-self.capacity:]
+        columns = columns[:, -self.capacity:]
+
+        self._size = datetimes.shape[0]
+        self._head = 0
+        self._datetime[:self._size] = datetimes
+        self._values[:, :self._size] = columns
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+
+        positions = self._ordered_positions()
+
+        return self._datetime[positions], self._values[:, positions]
+
+    def bar(self, n: int = 1) -> Tuple[int, np.ndarray]:
+
+        position = self._physical_position(n=n)
+
+        return int(self._datetime[position]), self._values[:, position]
+
+
+class RingBufferFrame(StockFrame):
+
+    columns = ['open', 'close', 'high', 'low', 'volume']
+
+    def __init__(self, data: List[Dict], capacity: int = 10000) -> None:
+
+        self.capacity = capacity
+
+        self._buffers: Dict[str, RingBuffer] = {}
+        self._computed_columns: pd.DataFrame = None
+
+        super().__init__(data=data)
+
+    def _load_data(self, data: List[Dict]) -> None:
+
+        self.add_rows(data=data)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+
+        # Only build the pandas view when someone asks for it.
+        if self._frame is None:
+            self._frame = self.create_frame()
+
+        return self._frame
+
+    @property
+    def buffers(self) -> Dict[str, RingBuffer]:
+
+        return self._buffers
+
+    def create_frame(self) -> pd.DataFrame:
+
+        symbols = sorted(self._buffers)
+
+        datetimes = []
+        values = []
+
+        for symbol in symbols:
+            symbol_datetimes, symbol_values = self._buffers[symbol].ordered()
+            datetimes.append(symbol_datetimes)
+            values.append(symbol_values)
+
+        if symbols:
+            datetimes = np.concatenate(datetimes)
+            values = np.concatenate(values, axis=1).T
+        else:
+            datetimes = np.zeros(shape=0, dtype='int64')
+            values = np.zeros(shape=(0, len(self.columns)))
+
+        # Define the MultiIndex.
+        index = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(symbols, [len(self._buffers[symbol]) for symbol in symbols]),
+                pd.to_datetime(datetimes, unit='ms', origin='unix')
+            ],
+            names=['symbol', 'datetime']
+        )
+
+        price_df = pd.DataFrame(data=values, index=index, columns=self.columns)
+
+        # Indicator columns from the old view carry over, new bars start out empty.
+        if self._computed_columns is not None:
+            price_df = pd.concat([price_df, self._computed_columns.reindex(price_df.index)], axis=1)
+            self._computed_columns = None
+
+        return price_df
+
+    def add_rows(self, data: List[Dict]) -> None:
+
+        for quote in data:
+
+            symbol = quote['symbol']
+
+            # Create the buffer the first time we see the symbol.
+            if symbol not in self._buffers:
+                self._buffers[symbol] = RingBuffer(
+                    capacity=self.capacity,
+                    columns=self.columns
+                )
+
+            self._buffers[symbol].append(
+                timestamp=int(quote['datetime']),
+                values=[quote[column] for column in self.columns]
+            )
+
+        # The pandas view is stale now, hold on to anything computed on it.
+        if data:
+
+            if self._frame is not None:
+
+                computed_columns = [column for column in self._frame.columns if column not in self.columns]
+
+                if computed_columns:
+                    self._computed_columns = self._frame[computed_columns]
+
+            self._frame = None
+            self._mark_changed()
+
+    def grab_current_bar(self, symbol: str) -> pd.DataFrame:
+
+        if symbol not in self._buffers or len(self._buffers[symbol]) == 0:
+            return pd.DataFrame(columns=self.columns)
+
+        time_stamp, values = self._buffers[symbol].bar(n=1)
+
+        bars = pd.DataFrame(
+            data=[values],
+            index=pd.MultiIndex.from_tuples(
+                [(symbol, pd.to_datetime(time_stamp, unit='ms', origin='unix'))],
+                names=['symbol', 'datetime']
+            ),
+            columns=self.columns
+        )
+
+        return bars
+
+    def grab_n_bars_ago(self, symbol: str, n: int) -> pd.Series:
+
+        if symbol not in self._buffers:
+            raise IndexError("There are no bars for {symbol}.".format(symbol=symbol))
+
+        time_stamp, values = self._buffers[symbol].bar(n=n)
+
+        bars = pd.Series(
+            data=values,
+            index=self.columns,
+            name=(symbol, pd.to_datetime(time_stamp, unit='ms', origin='unix'))
+        )
+
+        return bars
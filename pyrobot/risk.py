@@ -0,0 +1,148 @@
+import numpy as np
+
+from typing import List
+from typing import Dict
+
+
+def covariance_factor(covariance: np.ndarray, tolerance: float = 1e-10) -> np.ndarray:
+
+    covariance = np.asarray(covariance, dtype='float64')
+
+    # A full rank covariance gets its Cholesky factor.
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        pass
+
+    # With more assets than days the sample covariance is singular, so factor
+    # it through its eigenvectors instead, keeping only the directions with
+    # variance. That's exact, and needs fewer draws per path.
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    keep = eigenvalues > tolerance * max(float(eigenvalues.max()), 0.0)
+
+    if not keep.any():
+        return np.zeros(shape=(covariance.shape[0], 1))
+
+    return eigenvectors[:, keep] * np.sqrt(eigenvalues[keep])
+
+
+class MonteCarloRisk():
+
+    def __init__(self, mean: np.ndarray, covariance: np.ndarray, paths: int = 1000000,
+                 chunk_size: int = 8192, seed: int = None, dtype: str = 'float64',
+                 antithetic: bool = True, degrees_of_freedom: float = None) -> None:
+
+        self.mean = np.asarray(mean, dtype='float64')
+        self.covariance = np.asarray(covariance, dtype='float64')
+        self.paths = paths
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+        self.seed = seed
+        self.antithetic = antithetic
+
+        # None draws normal returns, a number draws Student t ones with fatter tails.
+        if degrees_of_freedom is not None and degrees_of_freedom <= 2:
+            raise ValueError('The degrees of freedom must be above 2 for the covariance to exist.')
+
+        self.degrees_of_freedom = degrees_of_freedom
+
+        # Assets by factors, so that factor @ factor.T is the covariance.
+        self.factor = covariance_factor(covariance=self.covariance)
+        self._loadings = self.factor.T.astype(self.dtype)
+
+    def _shocks(self, generator: np.random.Generator, size: int) -> np.ndarray:
+
+        draws = generator.standard_normal(size=(size, self.factor.shape[1]), dtype=self.dtype)
+
+        # A multivariate t is a normal scaled by one chi-squared draw per path,
+        # shrunk so the covariance stays the one we were given.
+        if self.degrees_of_freedom is not None:
+            scale = np.sqrt((self.degrees_of_freedom - 2.0) / generator.chisquare(df=self.degrees_of_freedom, size=size))
+            draws *= scale[:, np.newaxis].astype(self.dtype)
+
+        return draws
+
+    def simulate_assets(self, size: int, generator: np.random.Generator = None) -> np.ndarray:
+
+        if generator is None:
+            generator = np.random.default_rng(self.seed)
+
+        # One day of returns for every asset on every path, paths by assets.
+        return self.mean + self._shocks(generator=generator, size=size) @ self._loadings
+
+    def simulate(self, weights: np.ndarray) -> np.ndarray:
+
+        weights = np.asarray(weights, dtype='float64')
+
+        generator = np.random.default_rng(self.seed)
+        returns = np.empty(shape=self.paths)
+
+        # A linear portfolio only needs the loadings projected on the weights, so
+        # each chunk is one matrix-vector product instead of paths x assets.
+        linear = type(self).portfolio_returns is MonteCarloRisk.portfolio_returns
+
+        if linear:
+            loadings = (self._loadings @ weights.astype(self.dtype))[:, np.newaxis]
+            drift = float(weights @ self.mean)
+        else:
+            loadings = self._loadings
+
+        # Chunks keep the draws at chunk_size x factors, whatever the number of paths.
+        for start in range(0, self.paths, self.chunk_size):
+
+            stop = min(start + self.chunk_size, self.paths)
+
+            # Antithetic pairs: every shock is also used flipped, halving the draws
+            # and cutting the variance of the estimate. Flipping keeps a t a t.
+            if self.antithetic:
+                middle = start + (stop - start + 1) // 2
+                shocks = self._shocks(generator=generator, size=middle - start) @ loadings
+                shocks = np.concatenate([shocks, -shocks[:stop - middle]])
+            else:
+                shocks = self._shocks(generator=generator, size=stop - start) @ loadings
+
+            if linear:
+                returns[start:stop] = drift + shocks[:, 0]
+            else:
+                # Every asset is simulated, the portfolio is valued from them.
+                returns[start:stop] = self.portfolio_returns(asset_returns=self.mean + shocks, weights=weights)
+
+        return returns
+
+    def portfolio_returns(self, asset_returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+
+        # Linear positions. Options or other non-linear payoffs would revalue here.
+        return asset_returns @ weights
+
+    def value_at_risk(self, weights: np.ndarray, confidence_levels: List[float] = (0.95, 0.99),
+                      horizons: List[int] = (1, 10), portfolio_value: float = 1.0) -> Dict:
+
+        weights = np.asarray(weights, dtype='float64')
+        one_day = self.simulate(weights=weights)
+
+        # Longer horizons reuse the same paths: the drift grows with h and the
+        # noise with the square root of h. Exact for normal returns, the usual
+        # approximation for t ones.
+        drift = float(weights @ self.mean)
+        noise = np.sort(one_day - drift)
+
+        risk = {}
+
+        for horizon in horizons:
+
+            # Scaling keeps the order, so one sort serves every horizon.
+            returns = drift * horizon + noise * np.sqrt(horizon)
+
+            risk[horizon] = {}
+
+            for confidence_level in confidence_levels:
+
+                # The losses past the cutoff are the worst (1 - confidence) share of paths.
+                tail_count = max(1, int(np.floor((1.0 - confidence_level) * returns.shape[0])))
+
+                risk[horizon][confidence_level] = {
+                    'value_at_risk': float(-returns[tail_count - 1] * portfolio_value),
+                    'conditional_value_at_risk': float(-returns[:tail_count].mean() * portfolio_value)
+                }
+
+        return risk
@@ -1,19 +1,32 @@
-import json
+import math
 import time as time_true
-import pathlib
 import pandas as pd
 
 from datetime import datetime
 from datetime import timezone
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
 
 from typing import List
 from typing import Dict
 from typing import Union
+from typing import Tuple
+from typing import Callable
 
 from pyrobot.trades import Trade
 from pyrobot.portfolio import Portfolio
 from pyrobot.stock_frame import StockFrame
+from pyrobot.ring_buffer import RingBufferFrame
+from pyrobot.candle_cache import CandleCache
+from pyrobot.request_scheduler import RequestScheduler
+from pyrobot.quote_cache import QuoteCache
+from pyrobot.order_journal import OrderJournal
+from pyrobot.order_staging import OrderStager
+from pyrobot.order_tracker import OrderTracker
+from pyrobot.bracket_engine import BracketEngine
 
 from td.client import TDClient
 from td.utils import TDUtilities
@@ -24,14 +37,23 @@ milliseconds_since_epoch = TDUtilities().milliseconds_since_epoch
 class PyRobot():
 
     def __init__(self, client_id: str, redirect_uri: str, paper_trading: bool = True, credentials_path: str = None,
-                 trading_account: str = None) -> None:
+                 trading_account: str = None, requests_per_second: float = 2.0, quote_ttl: float = 2.0,
+                 order_status_interval: float = 1.0) -> None:
 
 
         self.trading_account = trading_account
         self.client_id = client_id
         self.redirect_uri = redirect_uri
         self.credentials_path = credentials_path
-        self.session: TDClient = self._create_session()
+
+        # Every call to the broker goes through one rate limited, retrying scheduler.
+        self.session: RequestScheduler = RequestScheduler(
+            td_client=self._create_session(),
+            rate=requests_per_second
+        )
+
+        # One quote cache for the robot, the portfolio and every trade.
+        self.quote_cache: QuoteCache = QuoteCache(td_client=self.session, ttl=quote_ttl)
         self.trades = {}
         self.historical_prices = {}
         self.stock_frame: StockFrame = None
@@ -39,6 +61,32 @@ class PyRobot():
 
         self._bar_size = None
         self._bar_type = None
+        self._last_bars: Dict[str, dict] = {}
+        self.bar_gaps: Dict[str, int] = {}
+
+        # Set a CandleCache to keep history on disk between runs.
+        self.candle_cache: CandleCache = None
+        self._order_journal: OrderJournal = None
+
+        # Orders built ahead of their signal.
+        self.order_stager: OrderStager = OrderStager()
+
+        # Every open order's status, from one request per interval for the whole account.
+        self.order_tracker: OrderTracker = OrderTracker(
+            td_client=self.session,
+            account=self.trading_account,
+            poll_interval=order_status_interval
+        )
+
+        # Stops and take profits of every open trade, managed from the bars we already have.
+        self.bracket_engine: BracketEngine = BracketEngine(
+            td_client=self.session,
+            account=self.trading_account,
+            send_modifications=not paper_trading,
+            order_tracker=self.order_tracker
+        )
+
+        self.order_tracker.on_transition(callback=self._follow_brackets)
 
     def _create_session(self) -> TDClient:
 
@@ -130,6 +178,8 @@ class PyRobot():
 
         # Assign the Client
         self.portfolio.td_client = self.session
+        self.portfolio.candle_cache = self.candle_cache
+        self.portfolio.quote_cache = self.quote_cache
 
         return self.portfolio
 
@@ -152,6 +202,7 @@ class PyRobot():
         # Set the Client.
         trade.account = self.trading_account
         trade._td_client = self.session
+        trade._quote_cache = self.quote_cache
 
         self.trades[trade_id] = trade
 
@@ -170,12 +221,13 @@ class PyRobot():
         symbols = self.portfolio.positions.keys()
 
         # Grab the quotes.
-        quotes = self.session.get_quotes(instruments=list(symbols))
+        quotes = self.quote_cache.get_quotes(instruments=list(symbols))
 
         return quotes
 
     def grab_historical_prices(self, start: datetime, end: datetime, bar_size: int = 1,
-                               bar_type: str = 'minute', symbols: List[str] = None) -> List[dict]:
+                               bar_type: str = 'minute', symbols: List[str] = None,
+                               max_workers: int = None) -> List[dict]:
 
         self._bar_size = bar_size
         self._bar_type = bar_type
@@ -188,9 +240,33 @@ class PyRobot():
         if not symbols:
             symbols = self.portfolio.positions
 
-        for symbol in symbols:
+        symbols = list(symbols)
+
+        # By default, about as many requests in flight as the scheduler lets out
+        # each second: more would only queue up on the rate.
+        if max_workers is None:
+            if isinstance(self.session, RequestScheduler):
+                max_workers = max(1, min(8, math.ceil(self.session.endpoint_rate(endpoint='get_price_history'))))
+            else:
+                max_workers = 1
+
+        def grab_symbol(symbol: str) -> dict:
+
+            # With a cache, only the ranges it's missing go out to the broker.
+            if self.candle_cache:
+                return {
+                    'candles': self.candle_cache.grab(
+                        td_client=self.session,
+                        symbol=symbol,
+                        period_type='day',
+                        bar_size=bar_size,
+                        bar_type=bar_type,
+                        start=int(start),
+                        end=int(end)
+                    )
+                }
 
-            historical_prices_response = self.session.get_price_history(
+            return self.session.get_price_history(
                 symbol=symbol,
                 period_type='day',
                 start_date=start,
@@ -200,24 +276,51 @@ class PyRobot():
                 extended_hours=True
             )
 
+        # Fetch the symbols concurrently, `map` hands them back in the order we asked.
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                responses = list(executor.map(grab_symbol, symbols))
+        else:
+            responses = [grab_symbol(symbol) for symbol in symbols]
+
+        for symbol, historical_prices_response in zip(symbols, responses):
+
             self.historical_prices[symbol] = {}
             self.historical_prices[symbol]['candles'] = historical_prices_response['candles']
 
-            for candle in historical_prices_response['candles']:
-                new_price_mini_dict = {}
-                new_price_mini_dict['symbol'] = symbol
-                new_price_mini_dict['open'] = candle['open']
-                new_price_mini_dict['close'] = candle['close']
-                new_price_mini_dict['high'] = candle['high']
-                new_price_mini_dict['low'] = candle['low']
-                new_price_mini_dict['volume'] = candle['volume']
-                new_price_mini_dict['datetime'] = candle['datetime']
-                new_prices.append(new_price_mini_dict)
+            # Remember the newest bar, so polling only asks for it and what came after it.
+            if historical_prices_response['candles']:
+                self._last_bars[symbol] = max(
+                    historical_prices_response['candles'],
+                    key=lambda candle: candle['datetime']
+                )
+
+            new_prices += self._parse_candles(
+                symbol=symbol,
+                candles=historical_prices_response['candles']
+            )
 
         self.historical_prices['aggregated'] = new_prices
 
         return self.historical_prices
 
+    def _parse_candles(self, symbol: str, candles: List[dict]) -> List[dict]:
+
+        new_prices = []
+
+        for candle in candles:
+            new_price_mini_dict = {}
+            new_price_mini_dict['symbol'] = symbol
+            new_price_mini_dict['open'] = candle['open']
+            new_price_mini_dict['close'] = candle['close']
+            new_price_mini_dict['high'] = candle['high']
+            new_price_mini_dict['low'] = candle['low']
+            new_price_mini_dict['volume'] = candle['volume']
+            new_price_mini_dict['datetime'] = candle['datetime']
+            new_prices.append(new_price_mini_dict)
+
+        return new_prices
+
     def get_latest_bar(self) -> List[dict]:
 
 
@@ -225,10 +328,10 @@ class PyRobot():
         bar_size = self._bar_size
         bar_type = self._bar_type
 
-        # Define the start and end date.
+        # Define the end date, and the fallback start date for symbols we haven't seen.
         end_date = datetime.today()
         start_date = end_date - timedelta(days=1)
-        start = str(milliseconds_since_epoch(dt_object=start_date))
+        default_start = str(milliseconds_since_epoch(dt_object=start_date))
         end = str(milliseconds_since_epoch(dt_object=end_date))
 
         latest_prices = []
@@ -236,48 +339,94 @@ class PyRobot():
         # Loop through each symbol.
         for symbol in self.portfolio.positions:
 
-            try:
+            # Only ask for the window since the last bar we ingested.
+            last_bar = self._last_bars.get(symbol, None)
+            last_timestamp = last_bar['datetime'] if last_bar is not None else None
 
-                # Grab the request.
-                historical_prices_response = self.session.get_price_history(
-                    symbol=symbol,
-                    period_type='day',
-                    start_date=start,
-                    end_date=end,
-                    frequency_type=bar_type,
-                    frequency=bar_size,
-                    extended_hours=True
+            if last_timestamp is not None:
+                start = str(last_timestamp)
+            else:
+                start = default_start
+
+            historical_prices_response = self._get_price_history(
+                symbol=symbol,
+                period_type='day',
+                start_date=start,
+                end_date=end,
+                frequency_type=bar_type,
+                frequency=bar_size,
+                extended_hours=True
+            )
+
+            candles = historical_prices_response['candles']
+
+            # Without a last bar, keep the old behaviour of just the latest one.
+            if last_timestamp is None:
+                new_candles = candles[-1:]
+
+            # Otherwise every bar after it is new, including any we missed. The last
+            # bar may still have been forming, so it comes again if it was revised
+            # (`add_rows` updates it in place).
+            else:
+                new_candles = sorted(
+                    [
+                        candle for candle in candles
+                        if candle['datetime'] > last_timestamp
+                        or (candle['datetime'] == last_timestamp and candle != last_bar)
+                    ],
+                    key=lambda candle: candle['datetime']
                 )
 
-            except:
+            if not new_candles:
+                continue
 
-                time_true.sleep(2)
+            # Missed polls are backfilled above, this records any hole left
+            # over (bars the broker has no data for).
+            new_timestamps = [candle['datetime'] for candle in new_candles if candle['datetime'] != last_timestamp]
 
-                # Grab the request.
-                historical_prices_response = self.session.get_price_history(
-                    symbol=symbol,
-                    period_type='day',
-                    start_date=start,
-                    end_date=end,
-                    frequency_type=bar_type,
-                    frequency=bar_size,
-                    extended_hours=True
+            if new_timestamps:
+                self.bar_gaps[symbol] = self._count_missed_bars(
+                    last_timestamp=last_timestamp,
+                    new_timestamps=new_timestamps
                 )
 
+            self._last_bars[symbol] = new_candles[-1]
+
             # parse the candles.
-            for candle in historical_prices_response['candles'][-1:]:
-                new_price_mini_dict = {}
-                new_price_mini_dict['symbol'] = symbol
-                new_price_mini_dict['open'] = candle['open']
-                new_price_mini_dict['close'] = candle['close']
-                new_price_mini_dict['high'] = candle['high']
-                new_price_mini_dict['low'] = candle['low']
-                new_price_mini_dict['volume'] = candle['volume']
-                new_price_mini_dict['datetime'] = candle['datetime']
-                latest_prices.append(new_price_mini_dict)
+            latest_prices += self._parse_candles(
+                symbol=symbol,
+                candles=new_candles
+            )
+
+        # Keep the staged brackets in step with the latest closes.
+        self.order_stager.reprice(prices={price['symbol']: price['close'] for price in latest_prices})
 
         return latest_prices
 
+    def _get_price_history(self, **kwargs) -> dict:
+
+        # The scheduler retries throttling and dropped connections with backoff. A bare
+        # client set as the session doesn't, so it gets the one retry it always had.
+        if isinstance(self.session, RequestScheduler):
+            return self.session.get_price_history(**kwargs)
+
+        try:
+            return self.session.get_price_history(**kwargs)
+        except RequestScheduler.retry_on:
+            time_true.sleep(2)
+            return self.session.get_price_history(**kwargs)
+
+    def _count_missed_bars(self, last_timestamp: int, new_timestamps: List[int]) -> int:
+
+        # We only know the spacing of intraday bars.
+        if last_timestamp is None or self._bar_type != 'minute':
+            return 0
+
+        bar_length = 60000 * int(self._bar_size)
+        expected_bars = int((new_timestamps[-1] - last_timestamp) // bar_length)
+
+        return max(expected_bars - len(new_timestamps), 0)
+
     def wait_till_next_bar(self, last_bar_timestamp: pd.DatetimeIndex) -> None:
 
         last_bar_time = last_bar_timestamp.to_pydatetime()[0].replace(tzinfo=timezone.utc)
@@ -310,21 +459,26 @@ class PyRobot():
 
         time_true.sleep(time_to_wait_now)
 
-    def create_stock_frame(self, data: List[dict]) -> StockFrame:
+    def create_stock_frame(self, data: List[dict], buffer_size: int = None) -> StockFrame:
 
-        # Create the Frame.
-        self.stock_frame = StockFrame(data=data)
+        # Create the Frame, backed by ring buffers if we were given a size.
+        if buffer_size:
+            self.stock_frame = RingBufferFrame(data=data, capacity=buffer_size)
+        else:
+            self.stock_frame = StockFrame(data=data)
 
         return self.stock_frame
 
-    def execute_signals(self, signals: List[pd.Series], trades_to_execute: dict) -> List[dict]:
+    def execute_signals(self, signals: List[pd.Series], trades_to_execute: dict, max_workers: int = 8,
+                        order_timeout: float = 10.0) -> List[dict]:
 
 
         # Define the Buy and sells.
         buys: pd.Series = signals['buys']
         sells: pd.Series = signals['sells']
 
-        order_responses = []
+        # The trades to send, in signal order.
+        trade_objs: List[Trade] = []
 
         # If we have buys or sells continue.
         if not buys.empty:
@@ -346,32 +500,11 @@ class PyRobot():
 
                     # Set the Execution Flag.
                     trades_to_execute[symbol]['has_executed'] = True
-                    trade_obj: Trade = trades_to_execute[symbol]['buy']['trade_func']
-
-                    if not self.paper_trading:
-
-                        # Execute the order.
-                        order_response = self.execute_orders(
-                            trade_obj=trade_obj
-                        )
-
-                        order_response = {
-                            'order_id': order_response['order_id'],
-                            'request_body': order_response['request_body'],
-                            'timestamp': datetime.now().isoformat()
-                        }
-
-                        order_responses.append(order_response)
-
-                    else:
-
-                        order_response = {
-                            'order_id': trade_obj._generate_order_id(),
-                            'request_body': trade_obj.order,
-                            'timestamp': datetime.now().isoformat()
-                        }
-
-                        order_responses.append(order_response)
+                    trade_objs.append(self._trade_to_execute(
+                        symbol=symbol,
+                        signal='buy',
+                        trades_to_execute=trades_to_execute
+                    ))
 
         elif not sells.empty:
 
@@ -393,45 +526,187 @@ class PyRobot():
                             ownership=False
                         )
 
-                    trade_obj: Trade = trades_to_execute[symbol]['sell']['trade_func']
+                    trade_objs.append(self._trade_to_execute(
+                        symbol=symbol,
+                        signal='sell',
+                        trades_to_execute=trades_to_execute
+                    ))
 
-                    if not self.paper_trading:
+        if not self.paper_trading:
 
-                        # Execute the order.
-                        order_response = self.execute_orders(
-                            trade_obj=trade_obj
-                        )
+            # Execute the orders.
+            order_responses = self.execute_orders_concurrently(
+                trade_objs=trade_objs,
+                max_workers=max_workers,
+                order_timeout=order_timeout
+            )
 
-                        order_response = {
-                            'order_id': order_response['order_id'],
-                            'request_body': order_response['request_body'],
-                            'timestamp': datetime.now().isoformat()
-                        }
+        else:
 
-                        order_responses.append(order_response)
+            order_responses = [
+                {
+                    'order_id': trade_obj._generate_order_id(),
+                    'request_body': trade_obj.order,
+                    'timestamp': datetime.now().isoformat()
+                }
+                for trade_obj in trade_objs
+            ]
 
-                    else:
+        # Save the responses, orders still in flight journal themselves once they're answered.
+        self.save_orders(order_response_dict=[
+            order_response for order_response in order_responses
+            if not order_response.get('pending', False)
+        ])
+
+        # The orders are out, build the replacements for the staged ones we used.
+        self.order_stager.refill()
+
+        return order_responses
+
+    def _trade_to_execute(self, symbol: str, signal: str, trades_to_execute: dict) -> Trade:
+
+        trade_details = trades_to_execute[symbol][signal]
+
+        # A staged order only needs the signal's price and size filled in.
+        if (symbol, signal) in self.order_stager:
+            return self.order_stager.take(
+                symbol=symbol,
+                signal=signal,
+                quantity=trade_details.get('quantity', None),
+                price=self._signal_price(symbol=symbol)
+            )
+
+        return trade_details['trade_func']
+
+    def _signal_price(self, symbol: str) -> float:
+
+        # The close the signal fired on, or the latest quote without one.
+        if self.stock_frame is not None:
+
+            current_bar = self.stock_frame.grab_current_bar(symbol=symbol)
+
+            if not current_bar.empty:
+                return float(current_bar['close'].iloc[-1])
+
+        return self.quote_cache.last_price(symbol=symbol)
+
+    def stage_order(self, trade: Trade, signal: str = 'buy', stop_size: float = None,
+                    profit_size: float = None, percentage: bool = False) -> dict:
+
+        # Build the order now, so a signal only has to send it.
+        return self.order_stager.stage(
+            trade=trade,
+            signal=signal,
+            price=self.quote_cache.last_price(symbol=trade.symbol),
+            stop_size=stop_size,
+            profit_size=profit_size,
+            percentage=percentage
+        )
+
+    def execute_orders_concurrently(self, trade_objs: List[Trade], max_workers: int = 8,
+                                    order_timeout: float = 10.0) -> List[dict]:
+
+        if not trade_objs:
+            return []
+
+        # When each order actually went out, after any wait for a worker or the rate limit.
+        sent_at = {}
+
+        def submit_order(index: int, trade_obj: Trade) -> Tuple[dict, float, float]:
+
+            def mark_sent() -> None:
+                sent_at[index] = time_true.perf_counter()
+
+            order_response = self.execute_orders(trade_obj=trade_obj, on_sent=mark_sent)
+
+            return order_response, sent_at[index] - batch_start, time_true.perf_counter() - sent_at[index]
+
+        def order_record(trade_obj: Trade, future: Future) -> dict:
+
+            try:
+                order_response, sent_after, latency = future.result()
+            except Exception as error:
+                return {
+                    'order_id': None,
+                    'request_body': trade_obj.order,
+                    'timestamp': datetime.now().isoformat(),
+                    'error': repr(error)
+                }
+
+            return {
+                'order_id': order_response['order_id'],
+                'request_body': order_response['request_body'],
+                'timestamp': datetime.now().isoformat(),
+                'sent_after': sent_after,
+                'submit_latency': latency
+            }
+
+        def save_late_order(trade_obj: Trade, future: Future) -> None:
+
+            # The broker answered after we stopped waiting, journal what it really said.
+            self.save_orders(order_response_dict=[dict(order_record(trade_obj=trade_obj, future=future), late=True)])
+
+        order_responses = []
 
-                        order_response = {
-                            'order_id': trade_obj._generate_order_id(),
-                            'request_body': trade_obj.order,
-                            'timestamp': datetime.now().isoformat()
-                        }
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(trade_objs))))
+        batch_start = time_true.perf_counter()
 
-                        order_responses.append(order_response)
+        try:
 
-        # Save the response.
-        self.save_orders(order_response_dict=order_responses)
+            futures = []
+
+            for index, trade_obj in enumerate(trade_objs):
+                futures.append(executor.submit(submit_order, index, trade_obj))
+
+            # Collect in signal order, whatever order they finish in.
+            for index, (trade_obj, future) in enumerate(zip(trade_objs, futures)):
+
+                # Every order gets its own timeout, counted from when it was sent. Orders
+                # still waiting for a worker or the rate limit go out as soon as they can.
+                while not future.done():
+
+                    if index in sent_at:
+                        timeout = sent_at[index] + order_timeout - time_true.perf_counter()
+                    else:
+                        timeout = order_timeout
+
+                    try:
+                        future.result(timeout=max(0.0, timeout))
+                    except FutureTimeoutError:
+                        if index in sent_at and sent_at[index] + order_timeout <= time_true.perf_counter():
+                            break
+                    except Exception:
+                        break
+
+                if future.done():
+                    order_responses.append(order_record(trade_obj=trade_obj, future=future))
+
+                # Already with the broker: it may well be live, so we don't record a
+                # failure. The real response is journaled whenever it arrives.
+                else:
+                    order_responses.append({
+                        'order_id': None,
+                        'request_body': trade_obj.order,
+                        'timestamp': datetime.now().isoformat(),
+                        'pending': True
+                    })
+                    future.add_done_callback(partial(save_late_order, trade_obj))
+
+        finally:
+
+            # Don't hold the signal loop on orders still in flight, they finish in the background.
+            executor.shutdown(wait=False)
 
         return order_responses
 
-    def execute_orders(self, trade_obj: Trade) -> dict:
+    def execute_orders(self, trade_obj: Trade, on_sent: Callable[[], None] = None) -> dict:
 
 
-        # Execute the order.
+        # Execute the order, `on_sent` is called once the rate limit lets it go.
         order_dict = self.session.place_order(
             account=self.trading_account,
-            order=trade_obj.order
+            order=trade_obj.order,
+            on_acquire=on_sent
         )
 
         # Store the order.
@@ -440,41 +715,50 @@ class PyRobot():
         # Process the order response.
         trade_obj._process_order_response()
 
+        # From here on its status comes from the tracker.
+        self.order_tracker.track(trade=trade_obj)
+        self.order_tracker.start()
+
+        # Every placement starts a fresh row from the levels it was sent with,
+        # keeping any trail that was set up for the trade.
+        trail_size, percentage = self.bracket_engine.trail_settings(trade=trade_obj)
+        self.bracket_engine.register(trade=trade_obj, trail_size=trail_size, percentage=percentage)
+
         return order_dict
 
-    def save_orders(self, order_response_dict: dict) -> bool:
+    def _follow_brackets(self, trade: Trade, old_state: str, new_state: str, order_id: str) -> None:
 
+        # The brackets start working once the entry fills.
+        if order_id == str(trade.order_id) and new_state == 'FILLED':
+            self.bracket_engine.fill(trade=trade)
 
-        def default(obj):
+        # An entry that never fills never has a position to protect.
+        elif order_id == str(trade.order_id) and new_state in ['CANCELED', 'REJECTED', 'EXPIRED', 'REPLACED']:
+            self.bracket_engine.unregister(trade=trade)
 
-            if isinstance(obj, bytes):
-                return str(obj)
+        # The stop is done at the broker (filled, or canceled by its take profit).
+        elif order_id != str(trade.order_id) and new_state in ['FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'REPLACED']:
+            self.bracket_engine.unregister(trade=trade)
 
-        # Define the folder.
-        folder: pathlib.PurePath = pathlib.Path(
-            __file__
-        ).parents[1].joinpath("data")
+    def update_brackets(self) -> dict:
 
-        # See if it exist, if not create it.
-        if not folder.exists():
-            folder.mkdir()
+        # One step over the latest bars, call it after adding them to the frame.
+        return self.bracket_engine.update(stock_frame=self.stock_frame)
 
-        # Define the file path.
-        file_path = folder.joinpath('orders.json')
+    @property
+    def order_journal(self) -> OrderJournal:
 
-        # First check if the file alread exists.
-        if file_path.exists():
-            with open('data/orders.json', 'r') as order_json:
-                orders_list = json.load(order_json)
-        else:
-            orders_list = []
+        # Opened on first use, that's when the old orders.json gets migrated.
+        if self._order_journal is None:
+            self._order_journal = OrderJournal()
+
+        return self._order_journal
+
+    def save_orders(self, order_response_dict: dict) -> bool:
 
-        # Combine both lists.
-        orders_list = orders_list + order_response_dict
 
-        # Write the new data back.
-        with open(file='data/orders.json', mode='w+') as order_json:
-            json.dump(obj=orders_list, fp=order_json, indent=4, default=default)
+        # Append the new orders, the journal syncs them to disk in one batch.
+        self.order_journal.append(records=order_response_dict)
 
         return True
 
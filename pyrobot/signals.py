@@ -0,0 +1,168 @@
+import numpy as np
+
+from typing import Any
+from typing import List
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+
+class Threshold():
+
+    def __init__(self, column: str, operator: Any, target: float) -> None:
+
+        self.column = column
+        self.operator = operator
+        self.target = target
+
+    @property
+    def columns(self) -> List[str]:
+
+        return [self.column]
+
+    def bind(self, column_index: Dict[str, int]) -> None:
+
+        self._row = column_index[self.column]
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+
+        return self.operator(values[self._row], self.target)
+
+
+class Compare():
+
+    def __init__(self, column: str, operator: Any, other_column: str) -> None:
+
+        self.column = column
+        self.operator = operator
+        self.other_column = other_column
+
+    @property
+    def columns(self) -> List[str]:
+
+        return [self.column, self.other_column]
+
+    def bind(self, column_index: Dict[str, int]) -> None:
+
+        self._row = column_index[self.column]
+        self._other_row = column_index[self.other_column]
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+
+        return self.operator(values[self._row], values[self._other_row])
+
+
+class AllOf():
+
+    reduce = np.logical_and
+
+    def __init__(self, *rules: Union[Threshold, Compare, 'AllOf', 'AnyOf']) -> None:
+
+        self.rules = list(rules)
+
+    @property
+    def columns(self) -> List[str]:
+
+        return [column for rule in self.rules for column in rule.columns]
+
+    def bind(self, column_index: Dict[str, int]) -> None:
+
+        # Thresholds sharing an operator are folded into one 2D comparison,
+        # everything else is evaluated on its own.
+        self._blocks = []
+        self._others = []
+
+        thresholds_by_operator = {}
+
+        for rule in self.rules:
+            if isinstance(rule, Threshold):
+                thresholds_by_operator.setdefault(rule.operator, []).append(rule)
+            else:
+                rule.bind(column_index=column_index)
+                self._others.append(rule)
+
+        for operator, thresholds in thresholds_by_operator.items():
+            rows = np.array([column_index[threshold.column] for threshold in thresholds])
+            targets = np.array([threshold.target for threshold in thresholds], dtype='float64')
+            self._blocks.append((operator, rows, targets[:, None]))
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+
+        masks = [
+            self.reduce.reduce(operator(values[rows], targets), axis=0)
+            for operator, rows, targets in self._blocks
+        ]
+        masks += [rule.evaluate(values=values) for rule in self._others]
+
+        # An empty rule never fires.
+        if not masks:
+            return np.zeros(shape=values.shape[1], dtype=bool)
+
+        return self.reduce.reduce(masks, axis=0)
+
+
+class AnyOf(AllOf):
+
+    reduce = np.logical_or
+
+
+class SignalEngine():
+
+    def __init__(self, buy_rule: AllOf, sell_rule: AllOf) -> None:
+
+        self.buy_rule = buy_rule
+        self.sell_rule = sell_rule
+
+        # Every column the rules need, each fetched once per evaluation.
+        self.columns = list(dict.fromkeys(self.buy_rule.columns + self.sell_rule.columns))
+        column_index = {column: row for row, column in enumerate(self.columns)}
+
+        self.buy_rule.bind(column_index=column_index)
+        self.sell_rule.bind(column_index=column_index)
+
+    @classmethod
+    def compile(cls, indicator_signals: Dict, buy_logic: str = 'and', sell_logic: str = 'and') -> 'SignalEngine':
+
+        logic = {'and': AllOf, 'or': AnyOf}
+
+        if buy_logic not in logic or sell_logic not in logic:
+            raise ValueError("Invalid signal logic, choose either and or or.")
+
+        buy_rules = []
+        sell_rules = []
+
+        for indicator, signal in indicator_signals.items():
+
+            # Indicator against indicator.
+            if '_comp_' in indicator:
+
+                column, other_column = indicator.split('_comp_')
+
+                if signal.get('buy_operator', None):
+                    buy_rules.append(Compare(column, signal['buy_operator'], other_column))
+
+                if signal.get('sell_operator', None):
+                    sell_rules.append(Compare(column, signal['sell_operator'], other_column))
+
+            # Indicator against a threshold.
+            else:
+
+                if signal.get('buy_operator', None):
+                    buy_rules.append(Threshold(indicator, signal['buy_operator'], signal['buy']))
+
+                if signal.get('sell_operator', None):
+                    sell_rules.append(Threshold(indicator, signal['sell_operator'], signal['sell']))
+
+        return cls(
+            buy_rule=logic[buy_logic](*buy_rules),
+            sell_rule=logic[sell_logic](*sell_rules)
+        )
+
+    def evaluate(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+
+        # NaNs compare False, so symbols without enough history never fire.
+        with np.errstate(invalid='ignore'):
+            buys = np.flatnonzero(self.buy_rule.evaluate(values=values))
+            sells = np.flatnonzero(self.sell_rule.evaluate(values=values))
+
+        return buys, sells
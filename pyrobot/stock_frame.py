@@ -1,13 +1,18 @@
+import bisect
+import numpy as np
 import pandas as pd
 
 from typing import List
 from typing import Dict
+from typing import Tuple
 from typing import Union
 
 from pandas.core.groupby import DataFrameGroupBy
 from pandas.core.window import RollingGroupby
 from pandas.core.window import Window
 
+from pyrobot.signals import SignalEngine
+
 
 class StockFrame():
 
@@ -15,40 +20,93 @@ class StockFrame():
 
 
         self._data = data
-        self._frame: pd.DataFrame = self.create_frame()
-        self._symbol_groups = None
-        self._symbol_rolling_groups = None
+        self._frame: pd.DataFrame = None
+        self._version = 0
+        self._symbol_groups: DataFrameGroupBy = None
+        self._symbol_rolling_groups: Dict[int, RollingGroupby] = {}
+        self._symbol_slices: Dict[str, Tuple[int, int]] = None
+        self._last_row_positions: np.ndarray = None
+
+        self._load_data(data=data)
+
+    def _load_data(self, data: List[Dict]) -> None:
+
+        # Backends that store the bars elsewhere load them their own way.
+        self._frame = self.create_frame()
 
     @property
     def frame(self) -> pd.DataFrame:
 
         return self._frame
 
+    @property
+    def version(self) -> int:
+
+        return self._version
+
+    def _mark_changed(self) -> None:
+
+        # Bump the data version and drop everything derived from the old data.
+        self._version += 1
+        self._symbol_groups = None
+        self._symbol_rolling_groups = {}
+        self._symbol_slices = None
+        self._last_row_positions = None
+
     @property
     def symbol_groups(self) -> DataFrameGroupBy:
 
 
-        # Group by Symbol.
-        self._symbol_groups: DataFrameGroupBy = self._frame.groupby(
-            by='symbol',
-            as_index=False,
-            sort=True
-        )
+        # Group by Symbol, only if the data changed since the last time.
+        if self._symbol_groups is None:
+            self._symbol_groups: DataFrameGroupBy = self.frame.groupby(
+                by='symbol',
+                as_index=False,
+                sort=True
+            )
 
         return self._symbol_groups
 
-    def symbol_rolling_groups(self, size: int) -> RollingGroupby:
+    @property
+    def symbol_slices(self) -> Dict[str, Tuple[int, int]]:
 
+        # Build the (start, stop) positions of each symbol's block lazily.
+        if self._symbol_slices is None:
+            self._symbol_slices = self._build_symbol_slices()
 
-        # If we don't a symbols group, then create it.
-        if not self._symbol_groups:
-            self.symbol_groups
+        return self._symbol_slices
 
-        self._symbol_rolling_groups: RollingGroupby = self._symbol_groups.rolling(
-            size
-        )
+    def _build_symbol_slices(self) -> Dict[str, Tuple[int, int]]:
 
-        return self._symbol_rolling_groups
+        # Work on the integer codes, comparing the strings is much slower.
+        symbol_codes = np.asarray(self.frame.index.codes[0])
+
+        if symbol_codes.shape[0] == 0:
+            return {}
+
+        # The frame is sorted, so each symbol is one contiguous block.
+        boundaries = np.flatnonzero(symbol_codes[1:] != symbol_codes[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        stops = np.concatenate([boundaries, [symbol_codes.shape[0]]])
+        symbols = self.frame.index.levels[0][symbol_codes[starts]]
+
+        symbol_slices = {
+            symbol: (int(start), int(stop))
+            for symbol, start, stop in zip(symbols, starts, stops)
+        }
+
+        return symbol_slices
+
+    def symbol_rolling_groups(self, size: int) -> RollingGroupby:
+
+
+        # Reuse the rolling groups for this size if the data hasn't changed.
+        if size not in self._symbol_rolling_groups:
+            self._symbol_rolling_groups[size] = self.symbol_groups.rolling(
+                size
+            )
+
+        return self._symbol_rolling_groups[size]
 
     def create_frame(self) -> pd.DataFrame:
 
@@ -56,6 +114,10 @@ class StockFrame():
         price_df = pd.DataFrame(data=self._data)
         price_df = self._parse_datetime_column(price_df=price_df)
         price_df = self._set_multi_index(price_df=price_df)
+        price_df = price_df.sort_index(kind='mergesort')
+
+        # A repeated (symbol, datetime) keeps its last copy, like add_rows does.
+        price_df = price_df[~price_df.index.duplicated(keep='last')]
 
         return price_df
 
@@ -75,152 +137,188 @@ class StockFrame():
 
         return price_df
 
-    def add_rows(self, data: Dict) -> None:
+    def add_rows(self, data: List[Dict]) -> None:
 
 
         column_names = ['open', 'close', 'high', 'low', 'volume']
 
-        for quote in data:
-            # Parse the Timestamp.
-            time_stamp = pd.to_datetime(
-                quote['datetime'],
-                unit='ms',
-                origin='unix'
-            )
+        if not data:
+            return
 
-            # Define the Index Tuple.
-            row_id = (quote['symbol'], time_stamp)
-
-            # Define the values.
-            row_values = [
-                quote['open'],
-                quote['close'],
-                quote['high'],
-                quote['low'],
-                quote['volume']
-            ]
+        # Turn the quotes into columns once.
+        new_rows = pd.DataFrame(
+            data={
+                column: [quote[column] for quote in data]
+                for column in ['symbol', 'datetime'] + column_names
+            }
+        )
+        new_rows = self._parse_datetime_column(price_df=new_rows)
+        new_rows = self._set_multi_index(price_df=new_rows)
 
-            # Create a new row.
-            new_row = pd.Series(data=row_values)
+        # Sort the batch (not the frame), and keep the last copy of a repeated key.
+        if not new_rows.index.is_monotonic_increasing:
+            new_rows = new_rows.sort_index(kind='mergesort')
 
-            # Add the row.
-            self.frame.loc[row_id, column_names] = new_row.values
+        new_rows = new_rows[~new_rows.index.duplicated(keep='last')]
 
-            self.frame.sort_index(inplace=True)
+        # Keys we already have get updated in place, if their values changed.
+        positions = self._frame.index.get_indexer(new_rows.index)
+        existing = positions >= 0
+        has_changed = False
 
-    def do_indicator_exist(self, column_names: List[str]) -> bool:
+        if existing.any():
 
+            column_positions = self._frame.columns.get_indexer(column_names)
+            old_values = self._frame.iloc[positions[existing], column_positions].values
+            new_values = new_rows.loc[existing, column_names].values
+            changed_rows = (old_values != new_values).any(axis=1)
 
-        if set(column_names).issubset(self._frame.columns):
-            return True
-        else:
-            raise KeyError("The following indicator columns are missing from the StockFrame: {missing_columns}".format(
-                missing_columns=set(column_names).difference(
-                    self._frame.columns)
-            ))
+            if changed_rows.any():
+                self._frame.iloc[
+                    positions[existing][changed_rows],
+                    column_positions
+                ] = new_values[changed_rows]
+                has_changed = True
 
-    def _check_signals(self, indicators: dict, indciators_comp_key: List[str], indicators_key: List[str]) -> Union[
-        pd.DataFrame, None]:
+        # Everything else gets merged into the frame in one go.
+        new_rows = new_rows[~existing]
 
+        if not new_rows.empty:
+            self._merge_rows(new_rows=new_rows)
+            has_changed = True
 
-        # Grab the last rows.
-        last_rows = self._symbol_groups.tail(1)
+        if has_changed:
+            self._mark_changed()
 
-        # Define a list of conditions.
-        conditions = {}
+    def _merge_rows(self, new_rows: pd.DataFrame) -> None:
 
-        # Check to see if all the columns exist.
-        if self.do_indicator_exist(column_names=indicators_key):
+        number_of_rows = len(self._frame)
+        symbol_slices = self.symbol_slices
+        ordered_symbols = sorted(symbol_slices)
 
-            for indicator in indicators_key:
-                column = last_rows[indicator]
+        insert_at = []
+        is_monotonic = True
 
-                # Grab the Buy & Sell Condition.
-                buy_condition_target = indicators[indicator]['buy']
-                sell_condition_target = indicators[indicator]['sell']
+        for symbol, time_stamp in new_rows.index:
 
-                buy_condition_operator = indicators[indicator]['buy_operator']
-                sell_condition_operator = indicators[indicator]['sell_operator']
+            # Existing symbols get their bars added to the end of their block.
+            if symbol in symbol_slices:
+                start, stop = symbol_slices[symbol]
+                insert_at.append(stop)
 
-                condition_1: pd.Series = buy_condition_operator(
-                    column, buy_condition_target
-                )
-                condition_2: pd.Series = sell_condition_operator(
-                    column, sell_condition_target
-                )
+                if time_stamp <= self._frame.index[stop - 1][1]:
+                    is_monotonic = False
 
-                condition_1 = condition_1.where(lambda x: x == True).dropna()
-                condition_2 = condition_2.where(lambda x: x == True).dropna()
+            # New symbols go in front of the block that follows them.
+            else:
+                location = bisect.bisect_left(ordered_symbols, symbol)
 
-                conditions['buys'] = condition_1
-                conditions['sells'] = condition_2
+                if location < len(ordered_symbols):
+                    insert_at.append(symbol_slices[ordered_symbols[location]][0])
+                else:
+                    insert_at.append(number_of_rows)
 
-        # Store the indicators in a list.
-        check_indicators = []
+        combined_frame = pd.concat([self._frame, new_rows], sort=False)
 
-        # Split the name so we can check if the indicator exist.
-        for indicator in indciators_comp_key:
-            parts = indicator.split('_comp_')
-            check_indicators += parts
+        # If every new bar is newer than its symbol's last bar, we can slot
+        # them in without sorting.
+        if is_monotonic:
+            order = np.insert(
+                np.arange(number_of_rows),
+                insert_at,
+                np.arange(number_of_rows, len(combined_frame))
+            )
+            self._frame = combined_frame.take(order)
+        else:
+            self._frame = combined_frame.sort_index()
 
-        if self.do_indicator_exist(column_names=check_indicators):
+    def do_indicator_exist(self, column_names: List[str]) -> bool:
 
-            for indicator in indciators_comp_key:
 
-                # Split the indicators.
-                parts = indicator.split('_comp_')
+        if set(column_names).issubset(self.frame.columns):
+            return True
+        else:
+            raise KeyError("The following indicator columns are missing from the StockFrame: {missing_columns}".format(
+                missing_columns=set(column_names).difference(
+                    self.frame.columns)
+            ))
 
-                # Grab the indicators that need to be compared.
-                indicator_1 = last_rows[parts[0]]
-                indicator_2 = last_rows[parts[1]]
+    def _check_signals(self, indicators: dict, indciators_comp_key: List[str] = None,
+                       indicators_key: List[str] = None, signal_engine: SignalEngine = None) -> Union[
+        pd.DataFrame, None]:
 
-                # If we have a buy operator, grab it.
-                if indicators[indicator]['buy_operator']:
-                    # Grab the Buy Operator.
-                    buy_condition_operator = indicators[indicator]['buy_operator']
 
-                    # Grab the Condition.
-                    condition_1: pd.Series = buy_condition_operator(
-                        indicator_1, indicator_2
-                    )
+        # Compile the rules, unless we were handed an already compiled engine.
+        if signal_engine is None:
 
-                    # Keep the one's that aren't null.
-                    condition_1 = condition_1.where(lambda x: x == True).dropna()
+            if indciators_comp_key is not None or indicators_key is not None:
+                keys = (indicators_key or []) + (indciators_comp_key or [])
+                indicators = {key: indicators[key] for key in keys}
 
-                    # Add it as a buy signal.
-                    conditions['buys'] = condition_1
+            signal_engine = SignalEngine.compile(indicator_signals=indicators)
 
-                # If we have a sell operator, grab it.
-                if indicators[indicator]['sell_operator']:
-                    # Grab the Sell Operator.
-                    sell_condition_operator = indicators[indicator]['sell_operator']
+        # Check to see if all the columns exist.
+        self.do_indicator_exist(column_names=signal_engine.columns)
 
-                    # Store it in a Pd.Series.
-                    condition_2: pd.Series = sell_condition_operator(
-                        indicator_1, indicator_2
-                    )
+        # Grab the last row of every symbol, only for the columns we need.
+        last_positions = self.last_row_positions
+        values = np.stack([
+            self.frame[column].to_numpy(dtype='float64')[last_positions]
+            for column in signal_engine.columns
+        ]) if signal_engine.columns else np.zeros(shape=(0, last_positions.shape[0]))
 
-                    # keep the one's that aren't null.
-                    condition_2 = condition_2.where(lambda x: x == True).dropna()
+        buys, sells = signal_engine.evaluate(values=values)
 
-                    # Add it as a sell signal.
-                    conditions['sells'] = condition_2
+        # Hand back the symbol positions, and Series keyed like the last rows.
+        conditions = {
+            'buy_positions': buys,
+            'sell_positions': sells,
+            'buys': pd.Series(data=True, index=self.frame.index[last_positions[buys]], dtype=bool),
+            'sells': pd.Series(data=True, index=self.frame.index[last_positions[sells]], dtype=bool)
+        }
 
         return conditions
 
-    def grab_current_bar(self, symbol: str) -> pd.Series:
+    @property
+    def last_row_positions(self) -> np.ndarray:
+
+        # Position of the last bar of every symbol, in symbol order.
+        if self._last_row_positions is None:
+            self._last_row_positions = np.array(
+                [stop - 1 for start, stop in self.symbol_slices.values()],
+                dtype='int64'
+            )
+
+        return self._last_row_positions
+
+    def grab_current_bar(self, symbol: str) -> pd.DataFrame:
 
-        # Filter the Stock Frame.
-        bars_filtered = self._frame.filter(like=symbol, axis=0)
-        bars = bars_filtered.tail(1)
+        # Unknown symbols get an empty frame back.
+        if symbol not in self.symbol_slices:
+            return self.frame.iloc[0:0]
+
+        start, stop = self.symbol_slices[symbol]
+        bars = self.frame.iloc[stop - 1:stop]
 
         return bars
 
     def grab_n_bars_ago(self, symbol: str, n: int) -> pd.Series:
 
 
-        # Filter the Stock Frame.
-        bars_filtered = self._frame.filter(like=symbol, axis=0)
-        bars = bars_filtered.iloc[-n]
+        if symbol not in self.symbol_slices:
+            raise IndexError("There are no bars for {symbol}.".format(symbol=symbol))
+
+        start, stop = self.symbol_slices[symbol]
 
-        return bars
\ No newline at end of file
+        if n < 1 or n > stop - start:
+            raise IndexError(
+                "Can't grab bar {n} for {symbol}, there are only {count} bars.".format(
+                    n=n,
+                    symbol=symbol,
+                    count=stop - start
+                )
+            )
+
+        bars = self.frame.iloc[stop - n]
+
+        return bars
@@ -5,10 +5,30 @@ from typing import List
 from typing import Dict
 
 from td.client import TDClient
+from pyrobot.quote_cache import QuoteCache
 
 
 class Trade():
 
+    # Built once for every trade, not on every call to `new_trade`.
+    order_types = {
+        'mkt': 'MARKET',
+        'lmt': 'LIMIT',
+        'stop': 'STOP',
+        'stop_lmt': 'STOP_LIMIT',
+        'trailing_stop': 'TRAILING_STOP'
+    }
+
+    order_instructions = {
+        'enter': {
+            'long': 'BUY',
+            'short': 'SELL_SHORT'
+        },
+        'exit': {
+            'long': 'SELL',
+            'short': 'BUY_TO_COVER'
+        }
+    }
 
     def __init__(self):
 
@@ -28,6 +48,17 @@ class Trade():
         self._multi_leg = False
         self._one_cancels_other = False
         self._td_client: TDClient = None
+        self._quote_cache: QuoteCache = None
+        self._order_tracker = None
+        self._bracket_engine = None
+
+    @property
+    def quote_cache(self) -> QuoteCache:
+
+        if self._quote_cache is None:
+            self._quote_cache = QuoteCache(td_client=self._td_client)
+
+        return self._quote_cache
 
     def to_dict(self) -> dict:
 
@@ -47,25 +78,6 @@ class Trade():
 
         self.trade_id = trade_id
 
-        self.order_types = {
-            'mkt': 'MARKET',
-            'lmt': 'LIMIT',
-            'stop': 'STOP',
-            'stop_lmt': 'STOP_LIMIT',
-            'trailing_stop': 'TRAILING_STOP'
-        }
-
-        self.order_instructions = {
-            'enter': {
-                'long': 'BUY',
-                'short': 'SELL_SHORT'
-            },
-            'exit': {
-                'long': 'SELL',
-                'short': 'BUY_TO_COVER'
-            }
-        }
-
         self.order = {
             "orderStrategyType": "SINGLE",
             "orderType": self.order_types[order_type],
@@ -223,13 +235,15 @@ class Trade():
 
         self.is_box_range = True
 
-    def add_stop_loss(self, stop_size: float, percentage: bool = False) -> bool:
+    def add_stop_loss(self, stop_size: float, percentage: bool = False, price: float = None) -> bool:
 
 
         if not self._triggered_added:
             self._convert_to_trigger()
 
-        price = self.grab_price()
+        # Without a price to work from, go get one.
+        if price is None:
+            price = self.grab_price()
 
         if percentage:
             adjustment = 1.0 - stop_size
@@ -270,14 +284,16 @@ class Trade():
         return True
 
     def add_stop_limit(self, stop_size: float, limit_size: float, stop_percentage: bool = False,
-                       limit_percentage: bool = False):
+                       limit_percentage: bool = False, price: float = None):
 
 
         # Check to see if there is a trigger.
         if not self._triggered_added:
             self._convert_to_trigger()
 
-        price = self.grab_price()
+        # Without a price to work from, go get one.
+        if price is None:
+            price = self.grab_price()
 
         # Calculate the Stop Price.
         if stop_percentage:
@@ -359,31 +375,29 @@ class Trade():
         # We need to basis to calculate off of. Use the price.
         if self.order_type == 'mkt':
 
-            quote = self._td_client.get_quotes(instruments=[self.symbol])
-
-            # Have to make a call to Get Quotes.
-            price = quote[self.symbol]['lastPrice']
+            # Have to make a call to Get Quotes, the cache shares it with everyone else.
+            price = self.quote_cache.last_price(symbol=self.symbol)
 
         elif self.order_type == 'lmt':
             price = self.price
 
         else:
 
-            quote = self._td_client.get_quotes(instruments=[self.symbol])
-
-            # Have to make a call to Get Quotes.
-            price = quote[self.symbol]['lastPrice']
+            # Have to make a call to Get Quotes, the cache shares it with everyone else.
+            price = self.quote_cache.last_price(symbol=self.symbol)
 
         return round(price, 2)
 
-    def add_take_profit(self, profit_size: float, percentage: bool = False) -> bool:
+    def add_take_profit(self, profit_size: float, percentage: bool = False, price: float = None) -> bool:
 
 
         # Check to see if we have a trigger order.
         if not self._triggered_added:
             self._convert_to_trigger()
 
-        price = self.grab_price()
+        # Without a price to work from, go get one.
+        if price is None:
+            price = self.grab_price()
 
         # Calculate the new price.
         if percentage:
@@ -598,7 +612,11 @@ class Trade():
 
     def _update_order_status(self) -> None:
 
-        if self.order_id != "":
+        # A tracked trade is refreshed by the tracker's one request for the whole account.
+        if self._order_tracker is not None:
+            self._order_tracker.poll()
+
+        elif self.order_id != "":
             order_response = self._td_client.get_orders(
                 account=self.account,
                 order_id=self.order_id
@@ -616,16 +634,20 @@ class Trade():
 
     def update_children(self) -> None:
 
+        # The bracket engine already tracks the levels from the bars, no quotes needed.
+        if self._bracket_engine is not None:
+            self._bracket_engine.apply_levels(trade=self)
+            return
+
         # Grab the children.
         children = self.order['childOrderStrategies'][0]['childOrderStrategies']
 
+        # Get the latest price, once for all the children.
+        last_price = self.quote_cache.last_price(symbol=self.symbol)
+
         # Loop through each child.
         for order in children:
 
-            # Get the latest price.
-            quote = self._td_client.get_quotes(instruments=[self.symbol])
-            last_price = quote[self.symbol]['lastPrice']
-
             # Update the price.
             if order['orderType'] == 'STOP':
                 order['stopPrice'] = round(order['stopPrice'] + last_price, 2)
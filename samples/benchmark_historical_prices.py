@@ -0,0 +1,78 @@
+import time
+
+from datetime import datetime
+from datetime import timedelta
+
+from pyrobot.robot import PyRobot
+
+NUMBER_OF_SYMBOLS = 300
+LATENCY = 0.05
+
+
+class FakeTDClient():
+
+    def __init__(self, latency: float) -> None:
+
+        self.latency = latency
+
+    def get_price_history(self, symbol: str, start_date: str, end_date: str, frequency: int = 1, **kwargs) -> dict:
+
+        # Pretend to be a round trip to the broker.
+        time.sleep(self.latency)
+
+        step = 60000 * int(frequency)
+        candles = [
+            {
+                'open': 100.0,
+                'close': 100.0,
+                'high': 100.0,
+                'low': 100.0,
+                'volume': 100,
+                'datetime': time_stamp
+            }
+            for time_stamp in range(int(start_date), int(end_date), step)
+        ]
+
+        return {'symbol': symbol, 'candles': candles, 'empty': not candles}
+
+
+class FakePyRobot(PyRobot):
+
+    def _create_session(self) -> FakeTDClient:
+
+        return FakeTDClient(latency=LATENCY)
+
+
+if __name__ == '__main__':
+
+    trading_robot = FakePyRobot(
+        client_id='FAKE_CLIENT_ID',
+        redirect_uri='FAKE_REDIRECT_URI',
+        requests_per_second=10000.0
+    )
+
+    symbols = ['SYM{:03d}'.format(i) for i in range(NUMBER_OF_SYMBOLS)]
+    end = datetime(year=2020, month=1, day=2)
+    start = end - timedelta(hours=1)
+
+    timings = {}
+    aggregated = {}
+
+    # One at a time, then the default pool sized to the scheduler's rate.
+    for max_workers in [1, None]:
+
+        begin = time.perf_counter()
+        historical_prices = trading_robot.grab_historical_prices(
+            start=start,
+            end=end,
+            symbols=symbols,
+            max_workers=max_workers
+        )
+        timings[max_workers] = time.perf_counter() - begin
+        aggregated[max_workers] = historical_prices['aggregated']
+
+    print("Symbols: {count}, latency per request: {latency}s".format(count=NUMBER_OF_SYMBOLS, latency=LATENCY))
+    print("Same aggregated prices: {same}".format(same=aggregated[1] == aggregated[None]))
+    print("Serial:              {seconds:.2f}s".format(seconds=timings[1]))
+    print("Default pool:        {seconds:.2f}s".format(seconds=timings[None]))
+    print("Speedup:             {speedup:.1f}x".format(speedup=timings[1] / timings[None]))
@@ -0,0 +1,103 @@
+import time
+import numpy as np
+import pandas as pd
+
+from pyrobot.stock_frame import StockFrame
+from pyrobot.indicators import Indicators
+
+NUMBER_OF_SYMBOLS = 1000
+NUMBER_OF_BARS = 10000
+PERIOD = 14
+
+
+def build_stock_frame(number_of_symbols: int, number_of_bars: int) -> StockFrame:
+
+    random_state = np.random.RandomState(seed=1)
+
+    # Random walks, so prices move both ways.
+    closes = 100.0 + np.cumsum(
+        random_state.normal(size=(number_of_symbols, number_of_bars)),
+        axis=1
+    )
+
+    # Hand pandas the columns directly, a list of 10M dicts won't fit in memory.
+    price_columns = {
+        'symbol': np.repeat(['SYM{:04d}'.format(i) for i in range(number_of_symbols)], number_of_bars),
+        'open': closes.ravel(),
+        'close': closes.ravel(),
+        'high': closes.ravel(),
+        'low': closes.ravel(),
+        'volume': np.full(shape=closes.size, fill_value=100),
+        'datetime': np.tile(1577836800000 + np.arange(number_of_bars) * 60000, number_of_symbols)
+    }
+
+    return StockFrame(data=price_columns)
+
+
+def legacy_indicators(price_groups, frame: pd.DataFrame, period: int) -> pd.DataFrame:
+
+    # The groupby/transform version the kernels replaced.
+    results = pd.DataFrame(index=frame.index)
+
+    results['sma'] = price_groups['close'].transform(
+        lambda x: x.rolling(window=period).mean()
+    )
+
+    results['ema'] = price_groups['close'].transform(
+        lambda x: x.ewm(span=period).mean()
+    )
+
+    change_in_price = price_groups['close'].transform(lambda x: x.diff())
+    up_day = np.where(change_in_price >= 0, change_in_price, 0)
+    down_day = np.where(change_in_price < 0, np.abs(change_in_price), 0)
+
+    ewma_up = pd.Series(up_day, index=frame.index).groupby(level=0).transform(
+        lambda x: x.ewm(span=period).mean()
+    )
+    ewma_down = pd.Series(down_day, index=frame.index).groupby(level=0).transform(
+        lambda x: x.ewm(span=period).mean()
+    )
+
+    relative_strength = ewma_up / ewma_down
+    relative_strength_index = 100.0 - (100.0 / (1.0 + relative_strength))
+    results['rsi'] = np.where(relative_strength_index == 0, 100, relative_strength_index)
+
+    return results
+
+
+if __name__ == '__main__':
+
+    stock_frame = build_stock_frame(
+        number_of_symbols=NUMBER_OF_SYMBOLS,
+        number_of_bars=NUMBER_OF_BARS
+    )
+
+    print("Rows: {rows:,}".format(rows=len(stock_frame.frame)))
+
+    start = time.perf_counter()
+    legacy = legacy_indicators(
+        price_groups=stock_frame.symbol_groups,
+        frame=stock_frame.frame,
+        period=PERIOD
+    )
+    legacy_time = time.perf_counter() - start
+
+    indicators = Indicators(price_data_frame=stock_frame)
+
+    start = time.perf_counter()
+    indicators.sma(period=PERIOD, column_name='sma')
+    indicators.ema(period=PERIOD, column_name='ema')
+    indicators.rsi(period=PERIOD, column_name='rsi')
+    kernel_time = time.perf_counter() - start
+
+    for column in ['sma', 'ema', 'rsi']:
+        matches = np.allclose(
+            legacy[column].to_numpy(),
+            stock_frame.frame[column].to_numpy(),
+            equal_nan=True
+        )
+        print("{column}: matches groupby version: {matches}".format(column=column, matches=matches))
+
+    print("Groupby/transform: {seconds:.2f}s".format(seconds=legacy_time))
+    print("Kernels:           {seconds:.2f}s".format(seconds=kernel_time))
+    print("Speedup:           {speedup:.1f}x".format(speedup=legacy_time / kernel_time))
@@ -0,0 +1,59 @@
+import time
+import numpy as np
+
+from pyrobot.risk import MonteCarloRisk
+
+NUMBER_OF_ASSETS = 500
+NUMBER_OF_PATHS = 1000000
+NUMBER_OF_DAYS = 252
+
+
+if __name__ == '__main__':
+
+    generator = np.random.default_rng(42)
+
+    # A year of correlated daily returns: a market factor plus noise.
+    market = generator.normal(loc=0.0004, scale=0.01, size=(NUMBER_OF_DAYS, 1))
+    betas = generator.uniform(low=0.5, high=1.5, size=(1, NUMBER_OF_ASSETS))
+    returns = market * betas + generator.normal(loc=0.0, scale=0.015, size=(NUMBER_OF_DAYS, NUMBER_OF_ASSETS))
+
+    mean = returns.mean(axis=0)
+    covariance = np.cov(returns, rowvar=False)
+    weights = np.full(shape=NUMBER_OF_ASSETS, fill_value=1.0 / NUMBER_OF_ASSETS)
+
+    # Normal returns with and without antithetic draws, then fat tailed ones.
+    for antithetic, degrees_of_freedom in [(False, None), (True, None), (True, 5)]:
+
+        begin = time.perf_counter()
+        risk_engine = MonteCarloRisk(
+            mean=mean,
+            covariance=covariance,
+            paths=NUMBER_OF_PATHS,
+            seed=7,
+            antithetic=antithetic,
+            degrees_of_freedom=degrees_of_freedom
+        )
+        risk = risk_engine.value_at_risk(weights=weights, portfolio_value=1000000.0)
+        seconds = time.perf_counter() - begin
+
+        print("Antithetic {antithetic}, t {degrees_of_freedom}: {paths} paths x {assets} assets in {seconds:.2f}s".format(
+            antithetic=antithetic,
+            degrees_of_freedom=degrees_of_freedom,
+            paths=NUMBER_OF_PATHS,
+            assets=NUMBER_OF_ASSETS,
+            seconds=seconds
+        ))
+
+        for horizon in risk:
+            for confidence_level, values in risk[horizon].items():
+                print("  {horizon:>2} day {confidence:.0%}: VaR {var:>12,.0f}  CVaR {cvar:>12,.0f}".format(
+                    horizon=horizon,
+                    confidence=confidence_level,
+                    var=values['value_at_risk'],
+                    cvar=values['conditional_value_at_risk']
+                ))
+
+    # The closed form answer for a normal portfolio, as a sanity check.
+    portfolio_std = float(np.sqrt(weights @ covariance @ weights))
+    portfolio_mean = float(weights @ mean)
+    print("Analytic 1 day 99% VaR: {var:,.0f}".format(var=-(portfolio_mean - 2.3263 * portfolio_std) * 1000000.0))
@@ -0,0 +1,165 @@
+import unittest
+import numpy as np
+
+from pyrobot.bracket_engine import BracketEngine
+from pyrobot.order_tracker import OrderTracker
+
+
+class FakeTDClient():
+
+    def __init__(self) -> None:
+
+        self.modified = []
+
+    def modify_order(self, account: str, order: dict, order_id: str) -> dict:
+
+        self.modified.append((order_id, order['stopPrice']))
+
+        return {'order_id': str(int(order_id) + 1)}
+
+
+class FakeTrade():
+
+    def __init__(self, side: str = 'long', stop: float = 95.0, profit: float = 110.0) -> None:
+
+        self.symbol = 'AAPL'
+        self.side = side
+        self.order_id = '1'
+        self.order_status = 'QUEUED'
+        self._bracket_engine = None
+        self.order = {
+            'orderType': 'LIMIT',
+            'childOrderStrategies': [
+                {
+                    'orderStrategyType': 'OCO',
+                    'childOrderStrategies': [
+                        {'orderType': 'STOP', 'stopPrice': stop},
+                        {'orderType': 'LIMIT', 'price': profit}
+                    ]
+                }
+            ]
+        }
+        self.order_response = {
+            'orderId': 1,
+            'childOrderStrategies': [
+                {'childOrderStrategies': [{'orderId': 10, 'orderType': 'STOP', 'status': 'WORKING'}]}
+            ]
+        }
+
+
+class BracketEngineTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.td_client = FakeTDClient()
+        self.order_tracker = OrderTracker(td_client=None, account='123')
+        self.bracket_engine = BracketEngine(
+            td_client=self.td_client,
+            account='123',
+            order_tracker=self.order_tracker
+        )
+
+        self.triggers = []
+        self.bracket_engine.on_trigger(callback=lambda *trigger: self.triggers.append(trigger))
+
+    def step(self, high: float, low: float) -> dict:
+
+        return self.bracket_engine.step(high=np.array([high]), low=np.array([low]))
+
+    def test_unfilled_entry_is_left_alone(self):
+
+        trade = FakeTrade()
+        self.bracket_engine.register(trade=trade, trail_size=1.0)
+
+        # Through both levels, but the entry hasn't filled.
+        results = self.step(high=120.0, low=90.0)
+
+        self.assertEqual(results, {'triggered': [], 'modified': []})
+        self.assertEqual(self.td_client.modified, [])
+        self.assertEqual(len(self.bracket_engine), 1)
+
+        self.bracket_engine.fill(trade=trade)
+        self.step(high=100.0, low=99.0)
+
+        self.assertEqual(self.bracket_engine.levels(trade=trade)['stop'], 99.0)
+
+    def test_stop_trigger_drops_the_row(self):
+
+        trade = FakeTrade()
+        self.bracket_engine.register(trade=trade)
+        self.bracket_engine.fill(trade=trade)
+
+        results = self.step(high=100.0, low=94.0)
+
+        self.assertEqual(results['triggered'], [(trade, 'stop', 95.0)])
+        self.assertEqual(self.triggers, [(trade, 'stop', 95.0)])
+        self.assertEqual(len(self.bracket_engine), 0)
+        self.assertIsNone(trade._bracket_engine)
+
+        # Gone, so it can't fire again.
+        self.assertEqual(self.step(high=100.0, low=90.0)['triggered'], [])
+
+    def test_profit_trigger_short(self):
+
+        trade = FakeTrade(side='short', stop=105.0, profit=90.0)
+        trade.order_status = 'FILLED'
+        self.bracket_engine.register(trade=trade)
+
+        self.assertEqual(self.step(high=100.0, low=95.0)['triggered'], [])
+        self.assertEqual(self.step(high=100.0, low=89.0)['triggered'], [(trade, 'profit', 90.0)])
+
+    def test_trailing_stop_only_tightens(self):
+
+        trade = FakeTrade()
+        self.bracket_engine.register(trade=trade, trail_size=2.0)
+        self.bracket_engine.fill(trade=trade)
+
+        self.step(high=100.0, low=99.0)
+        self.step(high=104.0, low=103.0)
+        self.step(high=101.0, low=102.5)
+
+        self.assertEqual(self.bracket_engine.levels(trade=trade)['stop'], 102.0)
+        self.assertEqual(trade.order['childOrderStrategies'][0]['childOrderStrategies'][0]['stopPrice'], 102.0)
+
+        # Each move replaced the stop, the tracker follows the replacement.
+        self.assertEqual(self.td_client.modified, [('10', 98.0), ('11', 102.0)])
+        self.assertTrue(self.order_tracker.is_tracked(order_id='12'))
+        self.assertFalse(self.order_tracker.is_tracked(order_id='10'))
+
+    def test_percentage_trail_short(self):
+
+        trade = FakeTrade(side='short', stop=110.0, profit=80.0)
+        self.bracket_engine.register(trade=trade, trail_size=0.05, percentage=True)
+        self.bracket_engine.fill(trade=trade)
+
+        self.step(high=101.0, low=100.0)
+
+        self.assertEqual(self.bracket_engine.levels(trade=trade)['stop'], 105.0)
+
+    def test_change_waits_for_the_stop_id(self):
+
+        trade = FakeTrade()
+        trade.order_response = {}
+        self.bracket_engine.register(trade=trade, trail_size=1.0)
+        self.bracket_engine.fill(trade=trade)
+
+        self.assertEqual(self.step(high=100.0, low=99.0)['modified'], [])
+
+        trade.order_response = {'childOrderStrategies': [{'orderId': 10, 'orderType': 'STOP'}]}
+
+        self.assertEqual(self.step(high=100.0, low=99.5)['modified'], [(trade, 99.0)])
+
+    def test_register_replaces_the_row(self):
+
+        trade = FakeTrade()
+        self.bracket_engine.register(trade=trade, trail_size=1.0)
+
+        trade.order['childOrderStrategies'][0]['childOrderStrategies'][0]['stopPrice'] = 97.0
+        self.bracket_engine.register(trade=trade, trail_size=1.0)
+
+        self.assertEqual(len(self.bracket_engine), 1)
+        self.assertEqual(self.bracket_engine.levels(trade=trade), {'stop': 97.0, 'profit': 110.0, 'filled': False})
+
+
+if __name__ == '__main__':
+    unittest.main()
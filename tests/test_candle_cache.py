@@ -0,0 +1,99 @@
+import time
+import tempfile
+import unittest
+
+from pyrobot.candle_cache import CandleCache
+
+
+class FakeTDClient():
+
+    def __init__(self, empty: bool = False) -> None:
+
+        self.empty = empty
+        self.calls = []
+
+    def get_price_history(self, symbol: str, start_date: str, end_date: str, **kwargs) -> dict:
+
+        self.calls.append((symbol, int(start_date), int(end_date)))
+
+        # Bars on the minute, starting a little after the range does.
+        candles = [] if self.empty else [
+            {'open': 1.0, 'close': 1.0, 'high': 1.0, 'low': 1.0, 'volume': 1.0, 'datetime': time_stamp}
+            for time_stamp in range(int(start_date) + 120000, int(end_date) - 120000, 60000)
+        ]
+
+        return {'symbol': symbol, 'candles': candles, 'empty': not candles}
+
+
+class CandleCacheTest(unittest.TestCase):
+
+    start = 1600000000000
+    end = 1600000000000 + 60 * 60000
+
+    def setUp(self) -> None:
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.candle_cache = CandleCache(folder=self.folder.name)
+
+    def tearDown(self) -> None:
+
+        self.folder.cleanup()
+
+    def grab(self, td_client: FakeTDClient, start: int, end: int) -> list:
+
+        return self.candle_cache.grab(
+            td_client=td_client,
+            symbol='AAPL',
+            period_type='day',
+            bar_size=1,
+            bar_type='minute',
+            start=start,
+            end=end
+        )
+
+    def test_warm_cache_makes_no_calls(self):
+
+        td_client = FakeTDClient()
+
+        first = self.grab(td_client=td_client, start=self.start, end=self.end)
+        self.assertEqual(len(td_client.calls), 1)
+
+        second = self.grab(td_client=td_client, start=self.start, end=self.end)
+        self.assertEqual(len(td_client.calls), 1)
+        self.assertEqual(first, second)
+
+    def test_empty_range_is_covered(self):
+
+        td_client = FakeTDClient(empty=True)
+
+        self.assertEqual(self.grab(td_client=td_client, start=self.start, end=self.end), [])
+        self.assertEqual(self.grab(td_client=td_client, start=self.start, end=self.end), [])
+        self.assertEqual(len(td_client.calls), 1)
+
+    def test_only_missing_ranges_are_fetched(self):
+
+        td_client = FakeTDClient()
+
+        self.grab(td_client=td_client, start=self.start, end=self.end)
+        self.grab(td_client=td_client, start=self.start - 30 * 60000, end=self.end + 30 * 60000)
+
+        self.assertEqual(td_client.calls[1:], [
+            ('AAPL', self.start - 30 * 60000, self.start),
+            ('AAPL', self.end, self.end + 30 * 60000)
+        ])
+
+    def test_unsettled_bars_are_fetched_again(self):
+
+        td_client = FakeTDClient()
+        now = int(time.time() * 1000)
+
+        self.grab(td_client=td_client, start=now - 60 * 60000, end=now)
+        self.grab(td_client=td_client, start=now - 60 * 60000, end=now)
+
+        # The last bar may still be forming, so the second grab asks for it again.
+        self.assertEqual(len(td_client.calls), 2)
+        self.assertGreaterEqual(td_client.calls[1][1], now - 2 * 60000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import time
+import threading
+import unittest
+
+from pyrobot.robot import PyRobot
+from pyrobot.request_scheduler import RequestScheduler
+
+
+class FakeTDClient():
+
+    def __init__(self) -> None:
+
+        self.delays = {}
+        self.failures = {}
+        self._order_ids = iter(range(1, 1000))
+        self._lock = threading.Lock()
+
+    def place_order(self, account: str, order: dict) -> dict:
+
+        symbol = order['orderLegCollection'][0]['instrument']['symbol']
+        time.sleep(self.delays.get(symbol, 0.0))
+
+        if symbol in self.failures:
+            raise self.failures[symbol]
+
+        with self._lock:
+            order_id = next(self._order_ids)
+
+        return {'order_id': order_id, 'request_body': order}
+
+    def get_orders_query(self, **kwargs) -> list:
+
+        return []
+
+
+class FakePyRobot(PyRobot):
+
+    def _create_session(self) -> FakeTDClient:
+
+        return FakeTDClient()
+
+    def save_orders(self, order_response_dict: list) -> bool:
+
+        self.saved += order_response_dict
+
+        return True
+
+
+class ExecuteOrdersConcurrentlyTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.trading_robot = FakePyRobot(client_id='FAKE', redirect_uri='FAKE', trading_account='123')
+        self.trading_robot.saved = []
+        self.td_client = self.trading_robot.session.td_client
+
+    def tearDown(self) -> None:
+
+        self.trading_robot.order_tracker.stop()
+
+    def trades(self, symbols: list) -> list:
+
+        trades = []
+
+        for symbol in symbols:
+            trade = self.trading_robot.create_trade(trade_id=symbol, enter_or_exit='enter', long_or_short='long')
+            trade.instrument(symbol=symbol, quantity=1, asset_type='EQUITY')
+            trades.append(trade)
+
+        return trades
+
+    def test_responses_come_back_in_signal_order(self):
+
+        self.td_client.delays = {'AAPL': 0.05}
+        self.td_client.failures = {'TSLA': KeyError('order_id')}
+
+        responses = self.trading_robot.execute_orders_concurrently(trade_objs=self.trades(['AAPL', 'MSFT', 'TSLA']))
+
+        self.assertEqual(
+            [response['request_body']['orderLegCollection'][0]['instrument']['symbol'] for response in responses],
+            ['AAPL', 'MSFT', 'TSLA']
+        )
+        self.assertIsNotNone(responses[0]['order_id'])
+        self.assertIn('submit_latency', responses[1])
+        self.assertIn('KeyError', responses[2]['error'])
+
+    def test_rate_limit_wait_doesnt_count(self):
+
+        # One order every 100ms, the last one goes out well after the timeout.
+        self.trading_robot.session = RequestScheduler(td_client=self.td_client, rate=10.0, capacity=1.0)
+
+        responses = self.trading_robot.execute_orders_concurrently(
+            trade_objs=self.trades(['AAPL', 'MSFT', 'TSLA', 'AMZN']),
+            order_timeout=0.15
+        )
+
+        self.assertTrue(all(response['order_id'] is not None for response in responses))
+        self.assertGreater(responses[-1]['sent_after'], 0.25)
+        self.assertLess(responses[-1]['submit_latency'], 0.15)
+
+    def test_late_answer_is_pending_then_journaled(self):
+
+        self.td_client.delays = {'AAPL': 0.3}
+
+        responses = self.trading_robot.execute_orders_concurrently(
+            trade_objs=self.trades(['AAPL', 'MSFT']),
+            order_timeout=0.1
+        )
+
+        self.assertTrue(responses[0]['pending'])
+        self.assertIsNone(responses[0]['order_id'])
+        self.assertNotIn('pending', responses[1])
+        self.assertEqual(self.trading_robot.saved, [])
+
+        time.sleep(0.4)
+
+        self.assertEqual(len(self.trading_robot.saved), 1)
+        self.assertTrue(self.trading_robot.saved[0]['late'])
+        self.assertIsNotNone(self.trading_robot.saved[0]['order_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from pyrobot.stock_frame import StockFrame
+from pyrobot.indicators import Indicators
+
+
+class IndicatorColumnsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        generator = np.random.default_rng(0)
+
+        self.stock_frame = StockFrame(data=[
+            {
+                'symbol': symbol,
+                'datetime': 1600000000000 + minute * 60000,
+                'open': 100.0,
+                'close': 100.0 + generator.standard_normal(),
+                'high': 101.0,
+                'low': 99.0,
+                'volume': 100
+            }
+            for symbol in ['AAPL', 'MSFT']
+            for minute in range(40)
+        ])
+        self.indicators = Indicators(price_data_frame=self.stock_frame)
+
+    def test_first_parameters_keep_the_plain_name(self):
+
+        self.indicators.rsi(period=14)
+        self.indicators.sma(period=5)
+        self.indicators.sma(period=10)
+        self.indicators.ema(period=8)
+
+        # Refreshing keeps every indicator in its own column.
+        self.indicators.refresh()
+
+        self.assertEqual(
+            [column for column in self.stock_frame.frame.columns if column not in ['open', 'close', 'high', 'low', 'volume']],
+            ['rsi', 'sma', 'sma_10', 'ema']
+        )
+        self.assertEqual(self.indicators.indicator_column('sma', period=10), 'sma_10')
+
+        closes = self.stock_frame.frame['close'].groupby(level=0)
+        pd.testing.assert_series_equal(
+            self.stock_frame.frame['sma'],
+            closes.transform(lambda close: close.rolling(5).mean()),
+            check_names=False
+        )
+
+    def test_ema_alpha(self):
+
+        self.indicators.ema(period=8)
+        self.indicators.ema(period=8, alpha=0.3)
+
+        closes = self.stock_frame.frame['close'].groupby(level=0)
+        pd.testing.assert_series_equal(
+            self.stock_frame.frame['ema_alpha_0.3'],
+            closes.transform(lambda close: close.ewm(alpha=0.3).mean()),
+            check_names=False
+        )
+
+        with self.assertRaises(ValueError):
+            self.indicators.ema(period=8, alpha=1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
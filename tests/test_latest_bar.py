@@ -0,0 +1,93 @@
+import time
+import unittest
+
+from datetime import datetime
+from datetime import timedelta
+
+from pyrobot.robot import PyRobot
+
+
+class FakeTDClient():
+
+    def __init__(self) -> None:
+
+        self.candles = []
+        self.calls = []
+
+    def get_price_history(self, symbol: str, start_date: str, end_date: str, **kwargs) -> dict:
+
+        self.calls.append(int(start_date))
+
+        candles = [dict(candle) for candle in self.candles if candle['datetime'] >= int(start_date)]
+
+        return {'symbol': symbol, 'candles': candles, 'empty': not candles}
+
+
+class FakePyRobot(PyRobot):
+
+    def _create_session(self) -> FakeTDClient:
+
+        return FakeTDClient()
+
+
+# An hour ago, on the minute, so the bars fall inside the last day we ask for.
+START = (int(time.time() * 1000) // 60000 - 60) * 60000
+
+
+def candle(minute: int, close: float, volume: int = 100) -> dict:
+
+    return {
+        'open': 100.0,
+        'close': close,
+        'high': max(100.0, close),
+        'low': min(100.0, close),
+        'volume': volume,
+        'datetime': START + minute * 60000
+    }
+
+
+class LatestBarTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.trading_robot = FakePyRobot(client_id='FAKE', redirect_uri='FAKE', trading_account='123')
+        self.trading_robot.create_portfolio()
+        self.trading_robot.portfolio.add_position(symbol='AAPL', asset_type='equity')
+
+        self.td_client = self.trading_robot.session.td_client
+        self.td_client.candles = [candle(minute=minute, close=100.0) for minute in range(3)]
+
+        end = datetime.now()
+        self.trading_robot.grab_historical_prices(start=end - timedelta(days=1), end=end, symbols=['AAPL'])
+
+    def test_only_new_bars(self):
+
+        self.td_client.candles += [candle(minute=3, close=101.0), candle(minute=4, close=102.0)]
+
+        latest_prices = self.trading_robot.get_latest_bar()
+
+        self.assertEqual([price['close'] for price in latest_prices], [101.0, 102.0])
+        self.assertEqual(self.td_client.calls[-1], candle(minute=2, close=0.0)['datetime'])
+        self.assertEqual(self.trading_robot.get_latest_bar(), [])
+
+    def test_revised_last_bar_comes_again(self):
+
+        # The last bar was still forming when we fetched it.
+        self.td_client.candles[-1] = candle(minute=2, close=99.0, volume=250)
+
+        latest_prices = self.trading_robot.get_latest_bar()
+
+        self.assertEqual([(price['close'], price['volume']) for price in latest_prices], [(99.0, 250)])
+        self.assertEqual(self.trading_robot.get_latest_bar(), [])
+
+    def test_revision_doesnt_count_as_a_gap(self):
+
+        self.td_client.candles[-1] = candle(minute=2, close=99.0)
+        self.td_client.candles += [candle(minute=3, close=101.0)]
+
+        self.assertEqual(len(self.trading_robot.get_latest_bar()), 2)
+        self.assertEqual(self.trading_robot.bar_gaps['AAPL'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
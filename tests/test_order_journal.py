@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+from pyrobot.order_journal import OrderJournal
+
+
+def order_record(order_id: int, symbol: str = 'AAPL') -> dict:
+
+    return {
+        'order_id': order_id,
+        'request_body': {'orderLegCollection': [{'instrument': {'symbol': symbol}}]},
+        'timestamp': '2020-01-02T10:{minute:02d}:00'.format(minute=order_id % 60)
+    }
+
+
+class OrderJournalTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+
+        self.folder.cleanup()
+
+    def test_group_commit(self):
+
+        order_journal = OrderJournal(folder=self.folder.name)
+        real_fsync = os.fsync
+        syncs = []
+
+        def slow_fsync(file_descriptor: int) -> None:
+
+            # Slow disks are where the batching pays off.
+            syncs.append(file_descriptor)
+            time.sleep(0.02)
+            real_fsync(file_descriptor)
+
+        with mock.patch('pyrobot.order_journal.os.fsync', side_effect=slow_fsync):
+
+            threads = [
+                threading.Thread(target=order_journal.append, args=([order_record(order_id=order_id)],))
+                for order_id in range(20)
+            ]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        self.assertLess(len(syncs), 20)
+        self.assertEqual(len(order_journal.records()), 20)
+        self.assertEqual(order_journal.get(order_id=7)['order_id'], 7)
+
+        order_journal.close()
+
+    def test_rotation_and_reopen(self):
+
+        order_journal = OrderJournal(folder=self.folder.name, max_bytes=300)
+
+        for order_id in range(10):
+            order_journal.append(records=[order_record(order_id=order_id, symbol=['AAPL', 'MSFT'][order_id % 2])])
+
+        order_journal.close()
+
+        segments = order_journal.segments()
+        self.assertGreater(len(segments), 2)
+
+        # A crash halfway through the last write.
+        with open(file=order_journal._segment_path(segment=segments[-1]), mode='ab') as journal_file:
+            journal_file.write(b'{"order_id": 99, "times')
+
+        # Sealed segments come back from their saved index, only the live one is read.
+        with mock.patch.object(OrderJournal, '_scan', autospec=True, side_effect=OrderJournal._scan) as scan:
+            reopened = OrderJournal(folder=self.folder.name, max_bytes=300)
+
+        self.assertEqual([call[1]['segment'] for call in scan.call_args_list], [segments[-1]])
+
+        self.assertEqual(reopened.get(order_id=3)['order_id'], 3)
+        self.assertIsNone(reopened.get(order_id=99))
+        self.assertEqual([record['order_id'] for record in reopened.by_symbol(symbol='MSFT')], [1, 3, 5, 7, 9])
+        self.assertEqual(
+            [record['order_id'] for record in reopened.between(start='2020-01-02T10:02:00', end='2020-01-02T10:04:00')],
+            [2, 3, 4]
+        )
+
+        reopened.append(records=[order_record(order_id=10)])
+        self.assertEqual(len(reopened.records()), 11)
+
+        reopened.close()
+
+    def test_retention(self):
+
+        order_journal = OrderJournal(folder=self.folder.name, max_bytes=300, max_segments=2)
+
+        for order_id in range(10):
+            order_journal.append(records=[order_record(order_id=order_id)])
+
+        self.assertEqual(len(order_journal.segments()), 2)
+        self.assertIsNone(order_journal.get(order_id=0))
+        self.assertEqual(order_journal.get(order_id=9)['order_id'], 9)
+        self.assertEqual(
+            [record['order_id'] for record in order_journal.by_symbol(symbol='AAPL')],
+            [record['order_id'] for record in order_journal.records()]
+        )
+
+        order_journal.close()
+
+    def test_migration(self):
+
+        with open(file=os.path.join(self.folder.name, 'orders.json'), mode='w') as orders_json:
+            json.dump(obj=[order_record(order_id=1), order_record(order_id=2, symbol='MSFT')], fp=orders_json)
+
+        order_journal = OrderJournal(folder=self.folder.name)
+
+        self.assertEqual([record['order_id'] for record in order_journal.records()], [1, 2])
+        self.assertEqual(order_journal.by_symbol(symbol='MSFT')[0]['order_id'], 2)
+        self.assertFalse(os.path.exists(os.path.join(self.folder.name, 'orders.json')))
+        self.assertTrue(os.path.exists(os.path.join(self.folder.name, 'orders.json.migrated')))
+
+        order_journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+
+from pyrobot.trades import Trade
+from pyrobot.order_staging import OrderStager
+
+
+class OrderStagerTest(unittest.TestCase):
+
+    def new_trade(self, order_type: str = 'mkt', price: float = 0.0) -> Trade:
+
+        trade = Trade()
+        trade.new_trade(trade_id='long_aapl', order_type=order_type, side='long', enter_or_exit='enter', price=price)
+        trade.instrument(symbol='AAPL', quantity=10, asset_type='EQUITY')
+
+        return trade
+
+    def children(self, trade: Trade) -> dict:
+
+        orders = list(trade.order.get('childOrderStrategies', []))
+        children = {}
+
+        while orders:
+            order = orders.pop()
+            orders += order.get('childOrderStrategies', [])
+            if 'orderType' in order:
+                children[order['orderType']] = order
+
+        return children
+
+    def test_market_entry_brackets_follow_the_price(self):
+
+        order_stager = OrderStager()
+        order_stager.stage(trade=self.new_trade(), price=100.0, stop_size=2.0, profit_size=3.0)
+        order_stager.reprice(prices={'AAPL': 110.0})
+
+        trade = order_stager.take(symbol='AAPL', quantity=5)
+        children = self.children(trade=trade)
+
+        self.assertEqual(children['STOP']['stopPrice'], 108.0)
+        self.assertEqual(children['LIMIT']['price'], 113.0)
+        self.assertEqual(children['STOP']['orderLegCollection'][0]['quantity'], 5)
+        self.assertEqual(trade.order['orderLegCollection'][0]['quantity'], 5)
+
+    def test_limit_entry_keeps_its_offset(self):
+
+        order_stager = OrderStager()
+        order_stager.stage(trade=self.new_trade(order_type='lmt', price=99.5), price=100.0, stop_size=0.02,
+                           profit_size=0.05, percentage=True)
+
+        order_stager.reprice(prices={'AAPL': 120.0})
+        trade = order_stager.take(symbol='AAPL', price=110.0)
+
+        self.assertEqual(trade.order['price'], 109.5)
+        self.assertEqual(trade.price, 109.5)
+        self.assertEqual(self.children(trade=trade)['STOP']['stopPrice'], 107.8)
+
+    def test_limit_entry_without_a_price_sits_on_it(self):
+
+        order_stager = OrderStager()
+        order_stager.stage(trade=self.new_trade(order_type='lmt'), price=100.0)
+
+        self.assertEqual(order_stager.take(symbol='AAPL', price=101.25).order['price'], 101.25)
+
+    def test_stop_limit_keeps_its_limit_below_the_stop(self):
+
+        trade = self.new_trade()
+        trade.add_stop_limit(stop_size=2.0, limit_size=2.5, price=100.0)
+
+        order_stager = OrderStager()
+        order_stager.stage(trade=trade, price=100.0, stop_size=2.0)
+        order_stager.reprice(prices={'AAPL': 90.0})
+
+        stop_limit = self.children(trade=order_stager.take(symbol='AAPL'))['STOP_LIMIT']
+
+        self.assertEqual(stop_limit['stopPrice'], 88.0)
+        self.assertEqual(stop_limit['price'], 87.5)
+
+    def test_take_hands_out_a_fresh_payload(self):
+
+        order_stager = OrderStager()
+        order_stager.stage(trade=self.new_trade(), price=100.0, stop_size=2.0)
+
+        first = order_stager.take(symbol='AAPL').order
+        order_stager.refill()
+        second = order_stager.take(symbol='AAPL').order
+
+        self.assertIsNot(first, second)
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
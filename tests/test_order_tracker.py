@@ -0,0 +1,139 @@
+import unittest
+
+from pyrobot.order_tracker import OrderTracker
+from pyrobot.order_tracker import OrderStateMachine
+
+
+class FakeTrade():
+
+    def __init__(self, order_id: str) -> None:
+
+        self.order_id = order_id
+        self.order_status = 'QUEUED'
+        self.order_response = {}
+
+
+class OrderStateMachineTest(unittest.TestCase):
+
+    def test_moves_forward(self):
+
+        machine = OrderStateMachine(state='QUEUED')
+
+        self.assertTrue(machine.advance(new_state='WORKING'))
+        self.assertTrue(machine.advance(new_state='PENDING_CANCEL'))
+        self.assertTrue(machine.advance(new_state='CANCELED'))
+        self.assertEqual([state for state, _ in machine.history], ['QUEUED', 'WORKING', 'PENDING_CANCEL', 'CANCELED'])
+
+    def test_skips_states_a_poll_missed(self):
+
+        machine = OrderStateMachine()
+
+        self.assertTrue(machine.advance(new_state='FILLED'))
+
+    def test_never_moves_back(self):
+
+        machine = OrderStateMachine(state='WORKING')
+
+        self.assertFalse(machine.advance(new_state='QUEUED'))
+        self.assertFalse(machine.advance(new_state='ACCEPTED'))
+        self.assertFalse(machine.advance(new_state='NOT_PLACED'))
+        self.assertEqual(machine.state, 'WORKING')
+
+    def test_refused_cancel_goes_back_to_working(self):
+
+        machine = OrderStateMachine(state='WORKING')
+
+        self.assertTrue(machine.advance(new_state='PENDING_REPLACE'))
+        self.assertTrue(machine.advance(new_state='WORKING'))
+
+    def test_terminal_states_are_final(self):
+
+        for state in ['FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'REPLACED']:
+
+            machine = OrderStateMachine(state=state)
+
+            self.assertTrue(machine.is_terminal)
+            self.assertFalse(machine.advance(new_state='WORKING'))
+            self.assertFalse(machine.advance(new_state='FILLED'))
+
+    def test_repeated_and_unknown_states(self):
+
+        machine = OrderStateMachine(state='QUEUED')
+
+        self.assertFalse(machine.advance(new_state='QUEUED'))
+        self.assertFalse(machine.advance(new_state='PLACED'))
+        self.assertEqual(len(machine.history), 1)
+
+
+class OrderTrackerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.tracker = OrderTracker(td_client=None, account='123')
+        self.transitions = []
+        self.tracker.on_transition(callback=lambda *transition: self.transitions.append(transition))
+
+    def test_apply_nested_orders(self):
+
+        trade = FakeTrade(order_id='1')
+        self.tracker.track(trade=trade)
+        self.tracker.track(trade=trade, order_id='2')
+
+        orders = [{'orderId': 1, 'status': 'FILLED', 'childOrderStrategies': [{'orderId': 2, 'status': 'WORKING'}]}]
+
+        self.assertEqual(self.tracker.apply(orders=orders), 2)
+        self.assertEqual(self.tracker.status(trade=trade), 'FILLED')
+        self.assertEqual(sorted(self.transitions, key=lambda transition: transition[3]), [
+            (trade, 'QUEUED', 'FILLED', '1'),
+            (trade, 'NOT_PLACED', 'WORKING', '2')
+        ])
+
+        # The child's status doesn't leak into the trade's.
+        self.assertEqual(trade.order_status, 'FILLED')
+        self.assertEqual(self.tracker.open_orders, [trade])
+
+    def test_late_poll_is_ignored(self):
+
+        trade = FakeTrade(order_id='1')
+        self.tracker.track(trade=trade)
+
+        self.tracker.apply(orders=[{'orderId': 1, 'status': 'WORKING'}])
+        self.tracker.apply(orders=[{'orderId': 1, 'status': 'QUEUED'}])
+
+        self.assertEqual(self.tracker.status(trade=trade), 'WORKING')
+        self.assertEqual(len(self.transitions), 1)
+
+    def test_replace(self):
+
+        trade = FakeTrade(order_id='1')
+        self.tracker.track(trade=trade)
+        self.tracker.track(trade=trade, order_id='2', state='WORKING')
+
+        self.assertTrue(self.tracker.replace(old_order_id='2', new_order_id='3'))
+        self.assertFalse(self.tracker.replace(old_order_id='2', new_order_id='4'))
+
+        # The old id only reports its end, the new one carries on.
+        self.tracker.apply(orders=[{'orderId': 2, 'status': 'REPLACED'}, {'orderId': 3, 'status': 'WORKING'}])
+
+        self.assertFalse(self.tracker.is_tracked(order_id='2'))
+        self.assertEqual(self.transitions, [(trade, 'NOT_PLACED', 'WORKING', '3')])
+
+        # Replacing the trade's own order moves the trade to the new id.
+        self.tracker.replace(old_order_id='1', new_order_id='5')
+
+        self.assertEqual(trade.order_id, '5')
+        self.assertEqual(self.tracker.status(trade=trade), 'NOT_PLACED')
+
+    def test_untrack_drops_children(self):
+
+        trade = FakeTrade(order_id='1')
+        self.tracker.track(trade=trade)
+        self.tracker.track(trade=trade, order_id='2')
+        self.tracker.untrack(trade=trade)
+
+        self.assertFalse(self.tracker.is_tracked(order_id='1'))
+        self.assertFalse(self.tracker.is_tracked(order_id='2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+
+from pyrobot.position_store import PositionStore
+
+
+class PositionStoreTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.positions = PositionStore(capacity=2)
+
+        for symbol, asset_type, quantity in [('AAPL', 'equity', 10), ('MSFT', 'equity', 5), ('SPY', 'etf', 3)]:
+            self.positions.add(symbol=symbol, asset_type=asset_type, quantity=quantity, purchase_price=100.0)
+
+    def test_quantity_stays_an_int(self):
+
+        self.positions['AAPL']['quantity'] = 12
+
+        self.assertEqual(self.positions['AAPL']['quantity'], 12)
+        self.assertIsInstance(self.positions['AAPL']['quantity'], int)
+        self.assertEqual(dict(self.positions['MSFT'])['quantity'], 5)
+
+    def test_delete_keeps_the_rows_lined_up(self):
+
+        del self.positions['AAPL']
+
+        self.assertNotIn('AAPL', self.positions)
+        self.assertEqual(sorted(self.positions), ['MSFT', 'SPY'])
+
+        for symbol, quantity, asset_type in [('MSFT', 5, 'equity'), ('SPY', 3, 'etf')]:
+            self.assertEqual(self.positions[symbol]['quantity'], quantity)
+            self.assertEqual(self.positions[symbol]['asset_type'], asset_type)
+            self.assertEqual(self.positions.symbols[self.positions.index[symbol]], symbol)
+
+        # The last row, then the only one left.
+        del self.positions['SPY']
+        del self.positions['MSFT']
+
+        self.assertEqual(len(self.positions), 0)
+
+    def test_exposure_by_asset_type(self):
+
+        # Prices lined up with the rows.
+        prices = np.array([10.0, 20.0, 30.0])
+
+        self.assertEqual(self.positions.exposure_by_asset_type(prices=prices), {'equity': 200.0, 'etf': 90.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
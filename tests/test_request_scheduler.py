@@ -0,0 +1,147 @@
+import time
+import threading
+import unittest
+
+from td.exceptions import ExdLmtError
+from td.exceptions import NotNulError
+
+from pyrobot.request_scheduler import RequestScheduler
+
+
+class FakeTDClient():
+
+    def __init__(self, failures: list = None) -> None:
+
+        self.failures = list(failures or [])
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, value: str = None) -> str:
+
+        with self._lock:
+            self.calls.append((name, value))
+
+        if self.failures:
+            raise self.failures.pop(0)
+
+        return value
+
+    def get_quotes(self, instruments: list = None) -> str:
+
+        return self._record(name='get_quotes', value=instruments)
+
+    def get_price_history(self, symbol: str = None) -> str:
+
+        return self._record(name='get_price_history', value=symbol)
+
+    def place_order(self, order: str = None) -> str:
+
+        return self._record(name='place_order', value=order)
+
+
+class RequestSchedulerTest(unittest.TestCase):
+
+    def scheduler(self, td_client: FakeTDClient, **kwargs) -> RequestScheduler:
+
+        return RequestScheduler(td_client=td_client, base_delay=0.001, max_delay=0.001, **kwargs)
+
+    def test_retries_throttling_and_connection_errors(self):
+
+        td_client = FakeTDClient(failures=[ExdLmtError('429'), ConnectionError('reset')])
+
+        self.assertEqual(self.scheduler(td_client=td_client).get_quotes(instruments='AAPL'), 'AAPL')
+        self.assertEqual(len(td_client.calls), 3)
+
+    def test_other_errors_are_raised_at_once(self):
+
+        for error in [KeyError('candles'), NotNulError('400')]:
+
+            td_client = FakeTDClient(failures=[error])
+
+            with self.assertRaises(type(error)):
+                self.scheduler(td_client=td_client).get_quotes(instruments='AAPL')
+
+            self.assertEqual(len(td_client.calls), 1)
+
+    def test_orders_are_never_retried(self):
+
+        td_client = FakeTDClient(failures=[ExdLmtError('429')])
+
+        with self.assertRaises(ExdLmtError):
+            self.scheduler(td_client=td_client).place_order(order='BUY')
+
+        self.assertEqual(len(td_client.calls), 1)
+
+    def test_rate(self):
+
+        td_client = FakeTDClient()
+        scheduler = self.scheduler(td_client=td_client, rate=20.0, capacity=1.0)
+
+        start = time.monotonic()
+
+        for _ in range(6):
+            scheduler.get_quotes()
+
+        # One from the full bucket, then one every 50ms.
+        self.assertGreaterEqual(time.monotonic() - start, 0.24)
+
+    def test_endpoint_rate(self):
+
+        scheduler = self.scheduler(
+            td_client=FakeTDClient(),
+            rate=10.0,
+            endpoint_budgets={'get_price_history': (2.0, 5.0)}
+        )
+
+        self.assertEqual(scheduler.endpoint_rate(endpoint='get_price_history'), 2.0)
+        self.assertEqual(scheduler.endpoint_rate(endpoint='get_quotes'), 10.0)
+
+    def test_priority_order(self):
+
+        td_client = FakeTDClient()
+        scheduler = self.scheduler(td_client=td_client, rate=10.0, capacity=1.0)
+        scheduler.get_quotes()
+
+        # Queue the history requests first, the order still goes out before them.
+        threads = [
+            threading.Thread(target=scheduler.get_price_history, kwargs={'symbol': symbol})
+            for symbol in ['AAPL', 'MSFT']
+        ]
+        threads.append(threading.Thread(target=scheduler.place_order, kwargs={'order': 'BUY'}))
+
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([name for name, _ in td_client.calls[1:]], ['place_order', 'get_price_history', 'get_price_history'])
+
+    def test_empty_endpoint_does_not_block_others(self):
+
+        td_client = FakeTDClient()
+        scheduler = self.scheduler(
+            td_client=td_client,
+            rate=100.0,
+            capacity=10.0,
+            endpoint_budgets={'get_price_history': (1.0, 1.0)}
+        )
+        scheduler.get_price_history(symbol='AAPL')
+
+        # Parked on its empty bucket, at the front of the line.
+        history = threading.Thread(target=scheduler.call, args=('get_price_history',), kwargs={'priority': 0})
+        history.start()
+        time.sleep(0.05)
+
+        start = time.monotonic()
+        scheduler.get_quotes()
+
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(td_client.calls[-1][0], 'get_quotes')
+
+        history.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+import numpy as np
+
+from pandas import DataFrame
+
+from pyrobot.portfolio import Portfolio
+from pyrobot.return_stats import RollingReturnStats
+
+SYMBOLS = ['AAPL', 'MSFT', 'SPY']
+
+
+def random_closes(days: int, seed: int = 0) -> np.ndarray:
+
+    generator = np.random.default_rng(seed)
+    returns = generator.normal(loc=0.0005, scale=0.01, size=(days, len(SYMBOLS)))
+
+    return 100.0 * np.cumprod(1.0 + returns, axis=0)
+
+
+class FakeTDClient():
+
+    def __init__(self, closes: np.ndarray, quoted: list) -> None:
+
+        self.closes = closes
+        self.quoted = quoted
+
+    def get_price_history(self, symbol: str, **kwargs) -> dict:
+
+        column = SYMBOLS.index(symbol)
+        candles = [
+            {
+                'open': close,
+                'close': close,
+                'high': close,
+                'low': close,
+                'volume': 100,
+                'datetime': 1577836800000 + day * 86400000
+            }
+            for day, close in enumerate(self.closes[:, column].tolist())
+        ]
+
+        return {'symbol': symbol, 'candles': candles, 'empty': False}
+
+    def get_quotes(self, instruments: list) -> dict:
+
+        return {symbol: {'lastPrice': 100.0} for symbol in instruments if symbol in self.quoted}
+
+
+class RollingReturnStatsTest(unittest.TestCase):
+
+    def expected(self, closes: np.ndarray, window: int = None) -> DataFrame:
+
+        returns = DataFrame(data=closes, columns=SYMBOLS).pct_change().iloc[1:]
+
+        if window:
+            returns = returns.iloc[-window:]
+
+        return returns
+
+    def assert_matches(self, return_stats: RollingReturnStats, returns: DataFrame) -> None:
+
+        self.assertEqual(return_stats.count, returns.shape[0])
+        self.assertTrue(np.allclose(return_stats.mean, returns.mean().to_numpy()))
+        self.assertTrue(np.allclose(return_stats.covariance, returns.cov().to_numpy()))
+        self.assertTrue(np.allclose(return_stats.std, returns.std().to_numpy()))
+
+    def test_seed(self):
+
+        closes = random_closes(days=60)
+
+        return_stats = RollingReturnStats(symbols=SYMBOLS)
+        return_stats.seed(closes=closes)
+
+        self.assert_matches(return_stats=return_stats, returns=self.expected(closes=closes))
+
+    def test_add(self):
+
+        closes = random_closes(days=60)
+
+        return_stats = RollingReturnStats(symbols=SYMBOLS)
+        return_stats.seed(closes=closes[:30])
+
+        for row in closes[30:]:
+            return_stats.update(closes=row)
+
+        self.assert_matches(return_stats=return_stats, returns=self.expected(closes=closes))
+
+    def test_downdate(self):
+
+        closes = random_closes(days=60)
+
+        return_stats = RollingReturnStats(symbols=SYMBOLS, window=20)
+        return_stats.seed(closes=closes[:30])
+
+        for row in closes[30:]:
+            return_stats.update(closes=row)
+
+        self.assert_matches(return_stats=return_stats, returns=self.expected(closes=closes, window=20))
+
+    def test_revise(self):
+
+        closes = random_closes(days=60)
+
+        # Seeded with a last bar that was still forming, then updated and revised.
+        for window in [None, 20]:
+
+            return_stats = RollingReturnStats(symbols=SYMBOLS, window=window)
+            return_stats.seed(closes=np.vstack([closes[:39], closes[39] * 1.05]))
+            return_stats.revise(closes=closes[39])
+
+            self.assert_matches(return_stats=return_stats, returns=self.expected(closes=closes[:40], window=window))
+
+            return_stats.update(closes=closes[40] * 0.97)
+            return_stats.revise(closes=closes[40])
+
+            self.assert_matches(return_stats=return_stats, returns=self.expected(closes=closes[:41], window=window))
+
+    def test_gaps_are_skipped(self):
+
+        closes = random_closes(days=30)
+        closes[10, 1] = np.nan
+
+        return_stats = RollingReturnStats(symbols=SYMBOLS)
+        return_stats.seed(closes=closes)
+
+        self.assert_matches(return_stats=return_stats, returns=self.expected(closes=closes).dropna())
+
+
+class PortfolioMetricsTest(unittest.TestCase):
+
+    def test_unquoted_symbol_is_left_out(self):
+
+        portfolio = Portfolio(account_number='123')
+        portfolio.td_client = FakeTDClient(closes=random_closes(days=40), quoted=['AAPL', 'SPY'])
+
+        for symbol in SYMBOLS:
+            portfolio.add_position(symbol=symbol, asset_type='equity', quantity=10, purchase_price=100.0)
+
+        metrics = portfolio.portfolio_metrics()
+
+        self.assertEqual(sorted(metrics), ['AAPL', 'SPY', 'portfolio'])
+        self.assertEqual(metrics['portfolio']['excluded_symbols'], ['MSFT'])
+        self.assertAlmostEqual(metrics['AAPL']['weight'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import numpy as np
+
+from statistics import NormalDist
+
+from pyrobot.risk import MonteCarloRisk
+from pyrobot.risk import covariance_factor
+
+
+class NonLinearRisk(MonteCarloRisk):
+
+    def portfolio_returns(self, asset_returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+
+        return asset_returns @ weights
+
+
+class MonteCarloRiskTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.mean = np.array([0.0005, 0.0002, 0.0008])
+        self.covariance = np.array([
+            [0.00040, 0.00012, 0.00008],
+            [0.00012, 0.00025, 0.00005],
+            [0.00008, 0.00005, 0.00090]
+        ])
+        self.weights = np.array([0.5, 0.3, 0.2])
+
+    def closed_form(self, confidence_level: float, horizon: int) -> tuple:
+
+        mean = float(self.weights @ self.mean) * horizon
+        std = float(np.sqrt(self.weights @ self.covariance @ self.weights * horizon))
+        cutoff = NormalDist().inv_cdf(1.0 - confidence_level)
+
+        value_at_risk = -(mean + cutoff * std)
+        conditional_value_at_risk = -(mean - std * NormalDist().pdf(cutoff) / (1.0 - confidence_level))
+
+        return value_at_risk, conditional_value_at_risk
+
+    def test_matches_the_gaussian_closed_form(self):
+
+        risk_engine = MonteCarloRisk(mean=self.mean, covariance=self.covariance, paths=400000, seed=1)
+        risk = risk_engine.value_at_risk(weights=self.weights, confidence_levels=[0.95, 0.99], horizons=[1, 10])
+
+        for horizon in [1, 10]:
+            for confidence_level in [0.95, 0.99]:
+
+                value_at_risk, conditional_value_at_risk = self.closed_form(
+                    confidence_level=confidence_level,
+                    horizon=horizon
+                )
+
+                self.assertAlmostEqual(risk[horizon][confidence_level]['value_at_risk'] / value_at_risk, 1.0, delta=0.01)
+                self.assertAlmostEqual(
+                    risk[horizon][confidence_level]['conditional_value_at_risk'] / conditional_value_at_risk,
+                    1.0,
+                    delta=0.01
+                )
+
+    def test_portfolio_value_scales_the_losses(self):
+
+        risk_engine = MonteCarloRisk(mean=self.mean, covariance=self.covariance, paths=10000, seed=1)
+
+        unit = risk_engine.value_at_risk(weights=self.weights, horizons=[1])
+        scaled = risk_engine.value_at_risk(weights=self.weights, horizons=[1], portfolio_value=250.0)
+
+        self.assertAlmostEqual(scaled[1][0.99]['value_at_risk'], unit[1][0.99]['value_at_risk'] * 250.0)
+
+    def test_antithetic_paths_come_in_pairs(self):
+
+        risk_engine = MonteCarloRisk(mean=self.mean, covariance=self.covariance, paths=1000, chunk_size=100, seed=1)
+        returns = risk_engine.simulate(weights=self.weights)
+
+        drift = float(self.weights @ self.mean)
+        chunk = returns[:100] - drift
+
+        self.assertTrue(np.allclose(chunk[:50], -chunk[50:]))
+
+    def test_non_linear_portfolios_simulate_every_asset(self):
+
+        linear = MonteCarloRisk(mean=self.mean, covariance=self.covariance, paths=5000, chunk_size=1000, seed=3)
+        per_asset = NonLinearRisk(mean=self.mean, covariance=self.covariance, paths=5000, chunk_size=1000, seed=3)
+
+        self.assertTrue(np.allclose(linear.simulate(weights=self.weights), per_asset.simulate(weights=self.weights)))
+
+    def test_fat_tails(self):
+
+        with self.assertRaises(ValueError):
+            MonteCarloRisk(mean=self.mean, covariance=self.covariance, degrees_of_freedom=2)
+
+        normal = MonteCarloRisk(mean=self.mean, covariance=self.covariance, paths=200000, seed=1)
+        fat = MonteCarloRisk(mean=self.mean, covariance=self.covariance, paths=200000, seed=1, degrees_of_freedom=4)
+
+        # Same variance, but more of it in the far tail.
+        normal_risk = normal.value_at_risk(weights=self.weights, confidence_levels=[0.999], horizons=[1])
+        fat_risk = fat.value_at_risk(weights=self.weights, confidence_levels=[0.999], horizons=[1])
+
+        self.assertGreater(fat_risk[1][0.999]['value_at_risk'], normal_risk[1][0.999]['value_at_risk'])
+        self.assertAlmostEqual(np.std(fat.simulate(weights=self.weights)) / np.std(normal.simulate(weights=self.weights)),
+                               1.0, delta=0.05)
+
+    def test_singular_covariance(self):
+
+        # Two assets that always move together, and one that never moves.
+        covariance = np.array([
+            [0.0004, 0.0004, 0.0],
+            [0.0004, 0.0004, 0.0],
+            [0.0, 0.0, 0.0]
+        ])
+
+        factor = covariance_factor(covariance=covariance)
+
+        self.assertEqual(factor.shape, (3, 1))
+        self.assertTrue(np.allclose(factor @ factor.T, covariance))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import operator
+import unittest
+import numpy as np
+import pandas as pd
+
+from pyrobot.signals import Threshold
+from pyrobot.signals import Compare
+from pyrobot.signals import AllOf
+from pyrobot.signals import AnyOf
+from pyrobot.signals import SignalEngine
+from pyrobot.stock_frame import StockFrame
+from pyrobot.indicators import Indicators
+
+
+class SignalEngineTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        # Columns by symbols, the way the stock frame hands them over.
+        self.values = np.array([
+            [10.0, 50.0, 90.0, np.nan],
+            [20.0, 20.0, 20.0, 20.0]
+        ])
+        self.column_index = {'rsi': 0, 'sma': 1}
+
+    def evaluate(self, rule) -> list:
+
+        rule.bind(column_index=self.column_index)
+
+        with np.errstate(invalid='ignore'):
+            return rule.evaluate(values=self.values).tolist()
+
+    def test_threshold(self):
+
+        self.assertEqual(self.evaluate(Threshold('rsi', operator.lt, 30.0)), [True, False, False, False])
+        self.assertEqual(self.evaluate(Threshold('rsi', operator.ge, 50.0)), [False, True, True, False])
+
+    def test_compare(self):
+
+        self.assertEqual(self.evaluate(Compare('rsi', operator.gt, 'sma')), [False, True, True, False])
+
+    def test_all_of_and_any_of(self):
+
+        oversold = Threshold('rsi', operator.lt, 60.0)
+        above = Compare('rsi', operator.gt, 'sma')
+
+        self.assertEqual(self.evaluate(AllOf(oversold, Threshold('rsi', operator.gt, 20.0), above)), [False, True, False, False])
+        self.assertEqual(self.evaluate(AnyOf(Threshold('rsi', operator.lt, 20.0), Threshold('rsi', operator.gt, 80.0))),
+                         [True, False, True, False])
+        self.assertEqual(self.evaluate(AllOf(AnyOf(Threshold('rsi', operator.lt, 20.0), above), oversold)),
+                         [True, True, False, False])
+
+    def test_empty_rule_never_fires(self):
+
+        self.assertEqual(self.evaluate(AllOf()), [False, False, False, False])
+        self.assertEqual(self.evaluate(AnyOf()), [False, False, False, False])
+
+    def test_compile_defaults_to_and(self):
+
+        indicator_signals = {
+            'rsi': {'buy': 60.0, 'sell': 80.0, 'buy_operator': operator.lt, 'sell_operator': operator.gt},
+            'rsi_comp_sma': {'buy_operator': operator.gt, 'sell_operator': None}
+        }
+
+        signal_engine = SignalEngine.compile(indicator_signals=indicator_signals)
+
+        self.assertEqual(signal_engine.columns, ['rsi', 'sma'])
+
+        buys, sells = signal_engine.evaluate(values=self.values)
+
+        self.assertEqual(buys.tolist(), [1])
+        self.assertEqual(sells.tolist(), [2])
+
+        buys, _ = SignalEngine.compile(indicator_signals=indicator_signals, buy_logic='or').evaluate(values=self.values)
+
+        self.assertEqual(buys.tolist(), [0, 1, 2])
+
+        with self.assertRaises(ValueError):
+            SignalEngine.compile(indicator_signals=indicator_signals, buy_logic='xor')
+
+
+class CheckSignalsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+
+        self.stock_frame = StockFrame(data=[
+            {
+                'symbol': symbol,
+                'datetime': 1600000000000 + minute * 60000,
+                'open': 100.0,
+                'close': close + minute,
+                'high': 110.0,
+                'low': 90.0,
+                'volume': 100
+            }
+            for symbol, close in [('AAPL', 100.0), ('MSFT', 90.0), ('TSLA', 80.0)]
+            for minute in range(3)
+        ])
+        self.indicators = Indicators(price_data_frame=self.stock_frame)
+
+    def test_new_indicator_signals(self):
+
+        # The first signal for an indicator used to raise a KeyError.
+        self.indicators.set_indicator_signals(
+            indicator='close',
+            buy=100.0,
+            sell=85.0,
+            condition_buy=operator.gt,
+            condition_sell=operator.lt
+        )
+
+        self.assertEqual(self.indicators.get_indicator_signals(indicator='close')['buy'], 100.0)
+
+    def test_check_signals_shape(self):
+
+        self.indicators.set_indicator_signals(
+            indicator='close',
+            buy=100.0,
+            sell=85.0,
+            condition_buy=operator.gt,
+            condition_sell=operator.lt
+        )
+
+        signals = self.indicators.check_signals()
+        last_bar = pd.Timestamp(1600000120000, unit='ms')
+
+        self.assertEqual(signals['buy_positions'].tolist(), [0])
+        self.assertEqual(signals['sell_positions'].tolist(), [2])
+
+        for key, symbol in [('buys', 'AAPL'), ('sells', 'TSLA')]:
+            self.assertIsInstance(signals[key], pd.Series)
+            self.assertEqual(signals[key].dtype, bool)
+            self.assertEqual(list(signals[key].index), [(symbol, last_bar)])
+            self.assertTrue(signals[key].all())
+
+        # The rules are compiled again once they change.
+        self.indicators.set_indicator_signals(
+            indicator='close',
+            buy=80.0,
+            sell=0.0,
+            condition_buy=operator.gt,
+            condition_sell=operator.lt
+        )
+
+        signals = self.indicators.check_signals()
+
+        self.assertEqual(signals['buy_positions'].tolist(), [0, 1, 2])
+        self.assertTrue(signals['sells'].empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import pandas as pd
+
+from pyrobot.stock_frame import StockFrame
+
+
+class StockFrameAddRowsTest(unittest.TestCase):
+
+    def bar(self, symbol: str, minute: int, close: float = 100.0) -> dict:
+
+        return {
+            'symbol': symbol,
+            'datetime': 1600000000000 + minute * 60000,
+            'open': 100.0,
+            'close': close,
+            'high': max(100.0, close),
+            'low': min(100.0, close),
+            'volume': 100
+        }
+
+    def bars(self, symbols: list, start: int, stop: int) -> list:
+
+        return [self.bar(symbol=symbol, minute=minute) for symbol in symbols for minute in range(start, stop)]
+
+    def assert_same_as_fresh(self, stock_frame: StockFrame, data: list) -> None:
+
+        # The frame built from scratch out of every bar, last copy of a key wins.
+        pd.testing.assert_frame_equal(stock_frame.frame, StockFrame(data=data).frame, check_dtype=False)
+
+        for symbol, (start, stop) in stock_frame.symbol_slices.items():
+            self.assertTrue((stock_frame.frame.index.get_level_values(0)[start:stop] == symbol).all())
+
+    def test_duplicates_in_the_first_batch(self):
+
+        data = self.bars(['AAPL', 'MSFT'], 0, 5) + [self.bar(symbol='AAPL', minute=2, close=105.0)]
+        stock_frame = StockFrame(data=data)
+
+        self.assertEqual(len(stock_frame.frame), 10)
+        self.assertEqual(stock_frame.frame.loc[('AAPL', pd.Timestamp(1600000120000, unit='ms')), 'close'], 105.0)
+
+        # Which the merge can look up without tripping on the repeated key.
+        stock_frame.add_rows(data=[self.bar(symbol='AAPL', minute=2, close=99.0), self.bar(symbol='AAPL', minute=5)])
+
+        self.assertEqual(stock_frame.frame.loc[('AAPL', pd.Timestamp(1600000120000, unit='ms')), 'close'], 99.0)
+        self.assertEqual(len(stock_frame.frame), 11)
+
+    def test_appends_without_sorting(self):
+
+        data = self.bars(['AAPL', 'MSFT', 'TSLA'], 0, 5)
+        stock_frame = StockFrame(data=data)
+
+        for minute in range(5, 8):
+            new_bars = self.bars(['TSLA', 'AAPL', 'MSFT'], minute, minute + 1)
+            stock_frame.add_rows(data=new_bars)
+            data += new_bars
+
+        self.assert_same_as_fresh(stock_frame=stock_frame, data=data)
+
+    def test_new_symbols_slot_in_between(self):
+
+        data = self.bars(['AAPL', 'TSLA'], 0, 5)
+        stock_frame = StockFrame(data=data)
+
+        new_bars = self.bars(['MSFT', 'ZM', 'A'], 0, 3) + self.bars(['AAPL'], 5, 6)
+        stock_frame.add_rows(data=new_bars)
+
+        self.assert_same_as_fresh(stock_frame=stock_frame, data=data + new_bars)
+        self.assertEqual(list(stock_frame.symbol_slices), ['A', 'AAPL', 'MSFT', 'TSLA', 'ZM'])
+
+    def test_backfill_and_updates_in_one_batch(self):
+
+        data = self.bars(['AAPL', 'MSFT'], 5, 10)
+        stock_frame = StockFrame(data=data)
+
+        new_bars = (
+            self.bars(['AAPL'], 0, 5) +
+            [self.bar(symbol='MSFT', minute=7, close=110.0), self.bar(symbol='MSFT', minute=7, close=111.0)] +
+            self.bars(['MSFT'], 10, 12)
+        )
+        stock_frame.add_rows(data=new_bars)
+
+        self.assert_same_as_fresh(stock_frame=stock_frame, data=data + new_bars)
+        self.assertEqual(stock_frame.frame.loc[('MSFT', pd.Timestamp(1600000420000, unit='ms')), 'close'], 111.0)
+
+    def test_unchanged_bars_keep_the_version(self):
+
+        data = self.bars(['AAPL'], 0, 5)
+        stock_frame = StockFrame(data=data)
+        version = stock_frame.version
+
+        stock_frame.add_rows(data=data[-2:])
+        self.assertEqual(stock_frame.version, version)
+
+        stock_frame.add_rows(data=[self.bar(symbol='AAPL', minute=4, close=101.0)])
+        self.assertGreater(stock_frame.version, version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from pyrobot.stock_frame import StockFrame
+from pyrobot.ring_buffer import RingBufferFrame
+from pyrobot.indicators import Indicators
+
+
+class StreamingIndicatorsTest(unittest.TestCase):
+
+    columns = ['sma', 'ema', 'rsi']
+
+    def bars(self, symbols: list, start: int, stop: int, seed: int = 0) -> list:
+
+        generator = np.random.default_rng(seed)
+        bars = []
+
+        for symbol in symbols:
+            for minute in range(start, stop):
+                close = 100.0 + generator.standard_normal()
+                bars.append({
+                    'symbol': symbol,
+                    'datetime': 1600000000000 + minute * 60000,
+                    'open': close,
+                    'close': close,
+                    'high': close + 0.5,
+                    'low': close - 0.5,
+                    'volume': 100
+                })
+
+        return bars
+
+    def add_indicators(self, indicators: Indicators) -> None:
+
+        indicators.sma(period=5)
+        indicators.ema(period=8)
+        indicators.rsi(period=14)
+
+    def assert_matches_batch(self, stock_frame: StockFrame, streaming: Indicators) -> None:
+
+        # The batch result over the same bars, on a fresh frame.
+        batch_frame = StockFrame(data=stock_frame.frame[['open', 'close', 'high', 'low', 'volume']].reset_index().assign(
+            datetime=lambda frame: frame['datetime'].astype('datetime64[ns]').astype('int64') // 1000000
+        ).to_dict('records'))
+
+        batch = Indicators(price_data_frame=batch_frame)
+        self.add_indicators(indicators=batch)
+
+        for column in self.columns:
+            pd.testing.assert_series_equal(
+                stock_frame.frame[column].reset_index(drop=True),
+                batch_frame.frame[column].reset_index(drop=True),
+                check_names=False,
+                rtol=1e-12
+            )
+
+    def run_streaming(self, stock_frame: StockFrame, batches) -> None:
+
+        streaming = Indicators(price_data_frame=stock_frame, mode='streaming')
+        self.add_indicators(indicators=streaming)
+
+        # Seed the states, like a live loop does before the first new bar.
+        streaming.refresh()
+
+        for bars in batches:
+            stock_frame.add_rows(data=bars)
+            streaming.refresh()
+            self.assert_matches_batch(stock_frame=stock_frame, streaming=streaming)
+
+    def test_stock_frame_appends(self):
+
+        stock_frame = StockFrame(data=self.bars(['AAPL', 'MSFT'], 0, 30))
+        batches = [self.bars(['AAPL', 'MSFT'], minute, minute + 1, seed=minute) for minute in range(30, 40)]
+
+        self.run_streaming(stock_frame=stock_frame, batches=batches)
+
+    def test_stock_frame_backfill(self):
+
+        stock_frame = StockFrame(data=self.bars(['AAPL'], 0, 30)[5:])
+        batches = [self.bars(['AAPL'], 30, 31, seed=1), self.bars(['AAPL'], 0, 30)[:5]]
+
+        self.run_streaming(stock_frame=stock_frame, batches=batches)
+
+    def test_revised_bar_in_the_middle(self):
+
+        stock_frame = StockFrame(data=self.bars(['AAPL', 'MSFT'], 0, 30))
+        revised = dict(self.bars(['AAPL'], 12, 13)[0], close=150.0)
+
+        self.run_streaming(stock_frame=stock_frame, batches=[self.bars(['AAPL', 'MSFT'], 30, 31), [revised]])
+
+    def test_ring_buffer_appends(self):
+
+        stock_frame = RingBufferFrame(data=self.bars(['AAPL', 'MSFT'], 0, 30), capacity=100)
+        batches = [self.bars(['AAPL', 'MSFT'], minute, minute + 1, seed=minute) for minute in range(30, 40)]
+
+        self.run_streaming(stock_frame=stock_frame, batches=batches)
+
+    def test_ring_buffer_full(self):
+
+        # Once full, every new bar pushes the oldest one out.
+        stock_frame = RingBufferFrame(data=self.bars(['AAPL'], 0, 30), capacity=30)
+        batches = [self.bars(['AAPL'], minute, minute + 1, seed=minute) for minute in range(30, 35)]
+
+        self.run_streaming(stock_frame=stock_frame, batches=batches)
+
+    def test_ring_buffer_same_close(self):
+
+        stock_frame = RingBufferFrame(data=self.bars(['AAPL'], 0, 30), capacity=30)
+        repeated = dict(self.bars(['AAPL'], 30, 31)[0], close=stock_frame.frame['close'].iloc[-1])
+
+        self.run_streaming(stock_frame=stock_frame, batches=[[repeated]])
+
+    def test_ring_buffer_backfill(self):
+
+        stock_frame = RingBufferFrame(data=self.bars(['AAPL'], 0, 30)[5:], capacity=100)
+        batches = [self.bars(['AAPL'], 30, 31, seed=1), self.bars(['AAPL'], 0, 30)[:5]]
+
+        self.run_streaming(stock_frame=stock_frame, batches=batches)
+
+
+if __name__ == '__main__':
+    unittest.main()